@@ -0,0 +1,104 @@
+"""
+Общий слой кэширования поверх settings.CACHES.
+
+Namespace — именованная область кэша со своей версией и TTL. Ключи строятся
+детерминированно (sha1 от JSON частей ключа), поэтому совпадают во всех
+процессах и подходят для общего бэкенда (Redis/memcached); увеличение версии
+области сбрасывает все её ключи. TTL можно переопределить в settings.CACHE_TTLS.
+Для каждой области считаются попадания и промахи (в пределах процесса).
+"""
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.views.decorators.cache import cache_page
+
+from .instrumentation import record_cache
+
+_MISSING = object()
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_namespaces: Dict[str, 'Namespace'] = {}
+
+
+def _count(name: str, hit: bool) -> None:
+    with _stats_lock:
+        _stats[name]['hits' if hit else 'misses'] += 1
+    record_cache(hit)
+
+
+class Namespace:
+    def __init__(self, name: str, timeout: Optional[int], version: int = 1, alias: str = 'default'):
+        self.name = name
+        self.version = version
+        self.alias = alias
+        self._timeout = timeout
+        _namespaces[name] = self
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def timeout(self) -> Optional[int]:
+        return getattr(settings, 'CACHE_TTLS', {}).get(self.name, self._timeout)
+
+    @property
+    def prefix(self) -> str:
+        return f"{self.name}:v{self.version}"
+
+    def key(self, *parts) -> str:
+        """Стабильный между процессами ключ (в отличие от hash(), который солится на процесс)."""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return f"{self.prefix}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.cache.get(key, _MISSING)
+        _count(self.name, value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        self.cache.set(key, value, self.timeout if timeout is None else timeout)
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        """Записывает значение, только если ключа ещё нет; True — если записано."""
+        return self.cache.add(key, value, self.timeout if timeout is None else timeout)
+
+    def delete(self, key: str) -> None:
+        self.cache.delete(key)
+
+    def delete_many(self, keys) -> None:
+        self.cache.delete_many(list(keys))
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        value = await self.cache.aget(key, _MISSING)
+        _count(self.name, value is not _MISSING)
+        return default if value is _MISSING else value
+
+    async def aset(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        await self.cache.aset(key, value, self.timeout if timeout is None else timeout)
+
+    def cache_page(self):
+        """Декоратор кэширования view в этой области (тот же бэкенд, TTL и версия)."""
+        return cache_page(self.timeout, cache=self.alias, key_prefix=self.prefix)
+
+
+def get_stats() -> Dict[str, Dict]:
+    """Попадания, промахи и доля попаданий по областям кэша (в текущем процессе)."""
+    with _stats_lock:
+        snapshot = {name: dict(counts) for name, counts in _stats.items()}
+    for name in _namespaces:
+        snapshot.setdefault(name, {'hits': 0, 'misses': 0})
+    for counts in snapshot.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / total, 4) if total else 0.0
+    return snapshot
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,46 @@
+"""
+Проверка живости для балансировщика и docker healthcheck.
+
+Отвечает 200, если доступны база и кэш, иначе 503 с указанием упавшей части.
+Не требует входа, не пишет сессию и не кэшируется.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CACHE_KEY = 'healthz'
+
+
+def _check_database() -> bool:
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return True
+    except DatabaseError:
+        logger.exception("Проверка живости: база недоступна")
+        return False
+
+
+def _check_cache() -> bool:
+    try:
+        cache.set(HEALTH_CACHE_KEY, 1, 10)
+        return cache.get(HEALTH_CACHE_KEY) == 1
+    except Exception:
+        # Бэкенды кэша бросают свои исключения (redis.ConnectionError и т. п.)
+        logger.exception("Проверка живости: кэш недоступен")
+        return False
+
+
+@never_cache
+def health_check(request):
+    checks = {'database': _check_database(), 'cache': _check_cache()}
+    healthy = all(checks.values())
+    return JsonResponse(
+        {'status': 'ok' if healthy else 'error', **{name: 'ok' if ok else 'error' for name, ok in checks.items()}},
+        status=200 if healthy else 503,
+    )
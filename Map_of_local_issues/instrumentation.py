@@ -0,0 +1,177 @@
+"""
+Метрики запроса: число SQL-запросов и время в БД, попадания и промахи кэша,
+время обращений к Nominatim.
+
+RequestMetricsMiddleware собирает их для каждого запроса, пишет одной
+JSON-строкой в лог request_metrics и, если включён settings.SERVER_TIMING,
+отдаёт в заголовке Server-Timing (видно во вкладке Timing DevTools).
+Модули сообщают о своих событиях через record_cache() и geocoding_timer();
+метрики текущего запроса лежат в contextvar и доступны из sync_to_async/async_to_sync.
+SQL считает query_timer — он ставится на каждое соединение при его создании
+(connection_created), в каком бы потоке оно ни открылось: под ASGI sync views
+работают в потоке sync_to_async со своими соединениями.
+
+Бюджеты SQL-запросов по имени view — settings.QUERY_BUDGETS: превышение
+пишется в лог предупреждением, в тестах его ловит QueryBudgetMixin
+(tests/query_budget.py).
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('request_metrics')
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'cache_hits', 'cache_misses', 'geocoding_calls', 'geocoding_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.geocoding_calls = 0
+        self.geocoding_time = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'geocoding_calls': self.geocoding_calls,
+            'geocoding_ms': round(self.geocoding_time * 1000, 1),
+        }
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar('request_metrics', default=None)
+
+
+def current() -> Optional[RequestMetrics]:
+    """Метрики обрабатываемого запроса (None вне запроса: воркер, команды)."""
+    return _current.get()
+
+
+def record_cache(hit: bool) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+@contextmanager
+def geocoding_timer():
+    """Учитывает обращение к Nominatim, включая ожидание в очереди лимитера."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.geocoding_calls += 1
+            metrics.geocoding_time += time.perf_counter() - start
+
+
+def query_timer(execute, sql, params, many, context):
+    """execute_wrapper: считает запросы и время их выполнения для текущего запроса."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Сигнал приходит и при переподключении — обёртка уже стоит
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+def get_query_budget(view_name: str) -> Optional[int]:
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+def server_timing(metrics: RequestMetrics, total: float) -> str:
+    parts = [
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+        f'cache;desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+    ]
+    if metrics.geocoding_calls:
+        parts.append(
+            f'geocoding;dur={metrics.geocoding_time * 1000:.1f};desc="{metrics.geocoding_calls} calls"'
+        )
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+class RequestMetricsMiddleware:
+    # Гибридный: под ASGI цепочка ниже остаётся асинхронной, и async views
+    # (API геокодирования) не уходят в поток через async_to_sync
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    def finish(self, request, response, metrics: RequestMetrics, start: float):
+        total = time.perf_counter() - start
+        self.report(request, response, metrics, total)
+        if getattr(settings, 'SERVER_TIMING', False):
+            response['Server-Timing'] = server_timing(metrics, total)
+        return response
+
+    def report(self, request, response, metrics: RequestMetrics, total: float) -> None:
+        view_name = getattr(request.resolver_match, 'view_name', None) or ''
+        record = {
+            'view': view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            **metrics.as_dict(),
+        }
+        budget = get_query_budget(view_name)
+        if budget is not None and metrics.queries > budget:
+            logger.warning(json.dumps({**record, 'query_budget': budget}, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
@@ -26,16 +26,16 @@ if not SECRET_KEY:
     raise ValueError("SECRET_KEY environment variable not set")
 
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test' or 'pytest' in sys.modules
 if DEBUG:
     ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0']
 else:
     ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1,0.0.0.0').split(',')
 
 STATIC_URL = '/static/'
-if DEBUG:
-    STATICFILES_DIRS = [BASE_DIR / 'static']
-else:
-    STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+# collectstatic собирает сюда; в продакшне файлы отдаёт WhiteNoise (см. STORAGES)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # Application definition
 INSTALLED_APPS = [
@@ -47,12 +47,19 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis',
+    'django.contrib.postgres',
     'users',
     'issues',
+    'jobs',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # WhiteNoiseMiddleware, не переводящий цепочку в sync под ASGI
+    'Map_of_local_issues.static_middleware.HybridWhiteNoiseMiddleware',
+    # До сессий и аутентификации: их запросы тоже входят в счёт
+    'Map_of_local_issues.instrumentation.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -63,6 +70,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'Map_of_local_issues.urls'
 
+# wsgi или asgi — как в gunicorn.conf.py. Под ASGI асинхронные API геокодирования
+# ходят в Nominatim через httpx.AsyncClient, под WSGI — через синхронную сессию
+SERVER_INTERFACE = os.getenv('SERVER_INTERFACE', 'wsgi').lower()
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -89,7 +100,8 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST', 'db'),
         'PORT': os.getenv('DB_PORT', '5432'),
-        'CONN_MAX_AGE': 600,
+        # Под ASGI (SERVER_INTERFACE=asgi в gunicorn.conf.py) задайте DB_CONN_MAX_AGE=0
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
         'CONN_HEALTH_CHECKS': True,
     }
 }
@@ -136,6 +148,8 @@ if not DEBUG:
     CSRF_TRUSTED_ORIGINS = os.getenv('CSRF_TRUSTED_ORIGINS', '').split(',')
 
     SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+    # Проверка живости идёт по HTTP внутри docker-сети, мимо TLS
+    SECURE_REDIRECT_EXEMPT = [r'^healthz/$']
 
     X_FRAME_OPTIONS = 'DENY'
     SECURE_REFERRER_POLICY = 'same-origin'
@@ -185,11 +199,78 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # JSON-строка на запрос (Map_of_local_issues/instrumentation.py); в тестах — только превышения бюджета
+        'request_metrics': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_METRICS_LOG_LEVEL', 'WARNING' if TESTING else 'INFO'),
+            'propagate': False,
+        },
     },
 }
 
-CACHES = {
-    'default': {
+# Общий кэш для всех воркеров: Redis (CACHE_URL=redis://host:6379/0) или memcached
+# (CACHE_URL=memcached://host:11211). Без CACHE_URL и в тестах — LocMemCache процесса.
+# При нескольких воркерах CACHE_URL обязателен: версия набора данных для ETag
+# (issues/modules/conditional.py) в LocMemCache у каждого процесса своя, и воркер,
+# не видевший записи, до LOCAL_VERSION_TTL секунд отвечает 304 на устаревший ETag.
+# Области кэша, их версии и TTL — Map_of_local_issues/cache.py; TTL можно
+# переопределить в CACHE_TTLS = {'geocode.search': 3600, ...}.
+CACHE_URL = '' if TESTING else os.getenv('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHE_BACKEND = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    }
+elif CACHE_URL.startswith('memcached://'):
+    CACHE_BACKEND = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': CACHE_URL.removeprefix('memcached://'),
+    }
+else:
+    CACHE_BACKEND = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
+
+CACHES = {
+    'default': {**CACHE_BACKEND, 'KEY_PREFIX': 'mli'},
+    # {% cache %} в шаблонах использует этот алиас, если он задан
+    'template_fragments': {**CACHE_BACKEND, 'KEY_PREFIX': 'mli_fragments'},
 }
+
+# Статика: в продакшне — имена с хэшем содержимого (кэш браузера «навсегда»)
+# и заранее сжатые gzip/brotli копии. Манифест появляется только после
+# collectstatic, поэтому в DEBUG и тестах — обычное хранилище.
+# Медиа (фото обращений) отдаёт nginx из общего тома, минуя Python.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG or TESTING
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Заголовок Server-Timing с временем БД, кэшем и геокодированием (раскрывает
+# детали работы сервера, поэтому по умолчанию только в DEBUG)
+SERVER_TIMING = os.getenv('SERVER_TIMING', str(DEBUG)).lower() == 'true'
+
+# Предел SQL-запросов на запрос по имени view (включая сессию и пользователя).
+# Превышение — предупреждение в логе request_metrics и падение теста
+# с QueryBudgetMixin (tests/query_budget.py): число запросов не должно расти
+# с количеством обращений, фото или комментариев.
+QUERY_BUDGETS = {
+    'home': 4,
+    'issues:map': 8,
+    'issues:map_geojson': 5,
+    'issues:issue_detail': 10,
+    'issues:vote_issue': 14,
+    'issues:analytics_api': 5,
+    'users:my_issues': 10,
+}
+
+# Сериализация map/geojson: 'database' — FeatureCollection собирает PostgreSQL
+# (json_agg), 'python' — словари в Python (issues/modules/geojson.py)
+MAP_GEOJSON_ENGINE = os.getenv('MAP_GEOJSON_ENGINE', 'database')
@@ -0,0 +1,35 @@
+"""
+WhiteNoise с поддержкой ASGI.
+
+WhiteNoiseMiddleware 6.x только синхронный: стоя в начале MIDDLEWARE, он
+переводил бы под ASGI всю цепочку ниже в поток (async_to_sync), и async views
+занимали бы поток на всё время ожидания. Здесь тот же поиск файла, а запрос
+к приложению передаётся дальше без смены режима.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class HybridWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -4,14 +4,17 @@ from home_page.views import home_view, about_site
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .health import health_check
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('users.urls', namespace='users')),
     path('issues/', include('issues.urls', namespace='issues')),
     path('', home_view, name='home'),
     path('about/', about_site, name='about_site'),
+    path('healthz/', health_check, name='health_check'),
 ]
 
-# Добавляем обработку media файлов для разработки
+# Добавляем обработку media файлов для разработки (в docker-compose их отдаёт nginx)
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
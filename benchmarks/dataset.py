@@ -0,0 +1,284 @@
+"""
+Синтетический набор данных для нагрузочных замеров (команда bench_seed).
+
+Пользователи, обращения, голоса и фото генерируются детерминированно из seed,
+поэтому прогоны на разных коммитах работают с одинаковыми данными.
+Все сгенерированные пользователи имеют адреса @bench.local, обращения созданы
+ими — reset() удаляет только этот набор. Вставка идёт bulk_create пачками,
+в обход сигналов: счётчики голосов считаются сразу при генерации, сводка
+аналитики пересобирается в конце.
+"""
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from issues.constants import ISSUE_CATEGORY_CHOICES
+from issues.models import Comment, Issue, IssuePhoto, Vote
+from issues.modules.analytics import rebuild_rollups
+from issues.modules.conditional import bump_dataset_version
+from issues.modules.photos import MEDIUM_SIZE, THUMBNAIL_SIZE
+from users.models import CustomUser
+
+# === КОНСТАНТЫ ===
+BENCH_EMAIL_DOMAIN = 'bench.local'
+BENCH_PASSWORD = 'bench-password-123'
+# Ханты-Мансийск: west, south, east, north
+BBOX = (68.95, 60.97, 69.10, 61.04)
+# Обращения кучкуются вокруг «горячих» мест, как настоящие
+HOTSPOTS = 40
+HOTSPOT_SPREAD = 0.004
+STREETS = [
+    'Ленина', 'Мира', 'Чехова', 'Энгельса', 'Гагарина', 'Калинина', 'Дзержинского',
+    'Пионерская', 'Рознина', 'Комсомольская', 'Красноармейская', 'Свердлова',
+    'Объездная', 'Сургутская', 'Студенческая', 'Шевченко', 'Конева', 'Механизаторов',
+]
+STATUS_WEIGHTS = (
+    (Issue.STATUS_OPEN, 0.6),
+    (Issue.STATUS_IN_PROGRESS, 0.15),
+    (Issue.STATUS_RESOLVED, 0.25),
+)
+UPVOTE_SHARE = 0.8
+MAX_PHOTOS_PER_ISSUE = 5
+BATCH_SIZE = 5000
+PHOTO_DIR = 'issue_photos/bench'
+
+
+def bench_users():
+    return CustomUser.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+
+
+def bench_issues():
+    return Issue.objects.filter(reporter__email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+
+
+@contextmanager
+def explicit_timestamps(model, *field_names):
+    """Временно отключает auto_now/auto_now_add, чтобы сохранить сгенерированные даты."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _write(log, message: str) -> None:
+    if log is not None:
+        log(message)
+
+
+def _create_users(rng: random.Random, citizens: int, officials: int) -> Dict[str, List[int]]:
+    password = make_password(BENCH_PASSWORD)
+    users = [
+        CustomUser(
+            email=f'{role}{n}@{BENCH_EMAIL_DOMAIN}', password=password, role=role,
+            first_name=rng.choice(['Анна', 'Иван', 'Мария', 'Пётр', 'Ольга']),
+            last_name=rng.choice(['Иванов', 'Петрова', 'Сидоров', 'Кузнецова']),
+            email_verified=True,
+        )
+        for role, count in (('citizen', citizens), ('official', officials))
+        for n in range(count)
+    ]
+    CustomUser.objects.bulk_create(users, batch_size=BATCH_SIZE)
+    ids = {'citizen': [], 'official': []}
+    for pk, role in bench_users().order_by('pk').values_list('pk', 'role'):
+        ids[role].append(pk)
+    return ids
+
+
+def _random_point(rng: random.Random, hotspots) -> Point:
+    west, south, east, north = BBOX
+    lon, lat = rng.choice(hotspots)
+    lon = min(max(rng.gauss(lon, HOTSPOT_SPREAD), west), east)
+    lat = min(max(rng.gauss(lat, HOTSPOT_SPREAD), south), north)
+    return Point(round(lon, 6), round(lat, 6), srid=4326)
+
+
+def _build_issues(rng: random.Random, count: int, users: Dict[str, List[int]]) -> List[Issue]:
+    west, south, east, north = BBOX
+    hotspots = [(rng.uniform(west, east), rng.uniform(south, north)) for _ in range(HOTSPOTS)]
+    labels = dict(ISSUE_CATEGORY_CHOICES)
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    now = timezone.now()
+
+    issues = []
+    for _ in range(count):
+        category = rng.choice(list(labels))
+        street = rng.choice(STREETS)
+        house = rng.randint(1, 120)
+        status = rng.choices(statuses, weights)[0]
+        created_at = now - timedelta(seconds=rng.uniform(0, 365 * 24 * 3600))
+        resolved_at = None
+        if status == Issue.STATUS_RESOLVED:
+            # Время решения — от часов до недель, медиана около трёх суток
+            resolved_at = min(created_at + timedelta(hours=rng.lognormvariate(4.3, 1.2)), now)
+        issues.append(Issue(
+            title=f"{labels[category]}: ул. {street}, {house}",
+            description=f"Сгенерированное обращение для нагрузочного теста ({street}, {house}).",
+            location=_random_point(rng, hotspots),
+            address=f"ул. {street}, {house}, Ханты-Мансийск",
+            category=category,
+            status=status,
+            reporter_id=rng.choice(users['citizen']),
+            assigned_to_id=rng.choice(users['official']) if status != Issue.STATUS_OPEN else None,
+            created_at=created_at,
+            updated_at=resolved_at or created_at,
+            resolved_at=resolved_at,
+        ))
+    return issues
+
+
+def _build_votes(rng: random.Random, count: int, issues: List[Issue], citizens: List[int]):
+    """Пары (пользователь, индекс обращения, голос); популярность обращений неравномерна."""
+    count = min(count, len(issues) * len(citizens))
+    seen = set()
+    votes = []
+    while len(votes) < count:
+        # Квадрат равномерного числа смещает голоса к «популярной» части списка
+        index = int(len(issues) * rng.random() ** 2)
+        user_id = rng.choice(citizens)
+        if (user_id, index) in seen:
+            continue
+        seen.add((user_id, index))
+        value = Vote.VOTE_UP if rng.random() < UPVOTE_SHARE else Vote.VOTE_DOWN
+        votes.append((user_id, index, value))
+
+        issue = issues[index]
+        if value == Vote.VOTE_UP:
+            issue.upvotes += 1
+        else:
+            issue.downvotes += 1
+        issue.rating += value
+    return votes
+
+
+def _sample_image(size, color) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color=color).save(buffer, format='JPEG', quality=80)
+    return buffer.getvalue()
+
+
+def _photo_files() -> Dict[str, str]:
+    """Три файла на все фото набора: оригинал, миниатюра и средняя копия."""
+    sizes = {'image': (1600, 1200), 'thumbnail': THUMBNAIL_SIZE, 'medium': (MEDIUM_SIZE[0], 960)}
+    names = {}
+    for kind, size in sizes.items():
+        name = f'{PHOTO_DIR}/{kind}.jpg'
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(_sample_image(size, 'gray')))
+        names[kind] = name
+    return names
+
+
+def _build_photos(rng: random.Random, count: int, issues: List[Issue]) -> List[IssuePhoto]:
+    count = min(count, len(issues) * MAX_PHOTOS_PER_ISSUE)
+    files = _photo_files()
+    per_issue = {}
+    photos = []
+    while len(photos) < count:
+        issue = rng.choice(issues)
+        if per_issue.get(issue.pk, 0) >= MAX_PHOTOS_PER_ISSUE:
+            continue
+        per_issue[issue.pk] = per_issue.get(issue.pk, 0) + 1
+        photos.append(IssuePhoto(
+            issue_id=issue.pk,
+            image=files['image'], thumbnail=files['thumbnail'], medium=files['medium'],
+            width=1600, height=1200,
+            thumbnail_width=THUMBNAIL_SIZE[0], thumbnail_height=THUMBNAIL_SIZE[1],
+            medium_width=MEDIUM_SIZE[0], medium_height=960,
+        ))
+    return photos
+
+
+def seed(issues: int = 100_000, votes: int = 1_000_000, photos: int = 20_000,
+         citizens: int = 2000, officials: int = 20, seed_value: int = 42, log=None) -> Dict[str, int]:
+    """Создаёт набор данных; существующий набор нужно сначала удалить (reset)."""
+    rng = random.Random(seed_value)
+
+    _write(log, f"Пользователи: {citizens} граждан, {officials} должностных лиц")
+    users = _create_users(rng, citizens, officials)
+
+    issue_objects = _build_issues(rng, issues, users)
+    vote_rows = _build_votes(rng, votes, issue_objects, users['citizen'])
+
+    _write(log, f"Обращения: {len(issue_objects)}")
+    with explicit_timestamps(Issue, 'created_at', 'updated_at'):
+        for start in range(0, len(issue_objects), BATCH_SIZE):
+            Issue.objects.bulk_create(issue_objects[start:start + BATCH_SIZE])
+
+    _write(log, f"Голоса: {len(vote_rows)}")
+    for start in range(0, len(vote_rows), BATCH_SIZE):
+        Vote.objects.bulk_create([
+            Vote(user_id=user_id, issue_id=issue_objects[index].pk, value=value)
+            for user_id, index, value in vote_rows[start:start + BATCH_SIZE]
+        ])
+        if start and start % (BATCH_SIZE * 40) == 0:
+            _write(log, f"  … {start}")
+
+    photo_objects = _build_photos(rng, photos, issue_objects)
+    _write(log, f"Фото: {len(photo_objects)}")
+    IssuePhoto.objects.bulk_create(photo_objects, batch_size=BATCH_SIZE)
+
+    _write(log, "Сводка аналитики и статистика планировщика")
+    rebuild_rollups()
+    bump_dataset_version()
+    analyze()
+    return summary()
+
+
+def analyze() -> None:
+    """Обновляет статистику планировщика PostgreSQL после массовой вставки."""
+    tables = [model._meta.db_table for model in (CustomUser, Issue, Vote, IssuePhoto)]
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {', '.join(tables)}")
+
+
+def reset() -> int:
+    """Удаляет набор данных. Возвращает число удалённых обращений."""
+    issues = bench_issues()
+    users = bench_users()
+    # _raw_delete — одним DELETE, без загрузки объектов и сигналов на каждую строку
+    Vote.objects.filter(Q(issue__in=issues) | Q(user__in=users))._raw_delete(Vote.objects.db)
+    IssuePhoto.objects.filter(issue__in=issues)._raw_delete(IssuePhoto.objects.db)
+    Comment.objects.filter(Q(issue__in=issues) | Q(author__in=users))._raw_delete(Comment.objects.db)
+    Issue.objects.filter(assigned_to__in=users).exclude(pk__in=issues).update(assigned_to=None)
+    deleted = issues.count()
+    issues._raw_delete(Issue.objects.db)
+    users.delete()
+    rebuild_rollups()
+    bump_dataset_version()
+    return deleted
+
+
+def summary() -> Dict[str, int]:
+    return {
+        'users': bench_users().count(),
+        'issues': bench_issues().count(),
+        'votes': Vote.objects.filter(issue__in=bench_issues()).count(),
+        'photos': IssuePhoto.objects.filter(issue__in=bench_issues()).count(),
+    }
+
+
+def sample_issue_ids(limit: int = 5000, seed_value: int = 42) -> List[int]:
+    ids = list(bench_issues().values_list('pk', flat=True))
+    rng = random.Random(seed_value)
+    return rng.sample(ids, min(limit, len(ids)))
+
+
+def first_citizen() -> Optional[CustomUser]:
+    return bench_users().filter(role='citizen').order_by('pk').first()
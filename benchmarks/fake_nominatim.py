@@ -0,0 +1,76 @@
+"""
+Локальный фейковый Nominatim для замеров геокодирования.
+
+Отвечает на /search и /reverse правдоподобными ответами с заданной задержкой,
+чтобы замер показывал работу кэшей, лимитера и пула соединений, а не сеть
+и загрузку публичного сервера.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CENTER = (61.0066, 69.0223)
+
+
+class FakeNominatimHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if self.latency:
+            time.sleep(self.latency)
+
+        if url.path == '/search':
+            query = params.get('q', '')
+            body = [
+                {
+                    "lat": str(CENTER[0] + n * 0.001),
+                    "lon": str(CENTER[1] + n * 0.001),
+                    "display_name": f"{query}, {n + 1}, Ханты-Мансийск, Россия",
+                    "address": {"road": query, "house_number": str(n + 1), "city": "Ханты-Мансийск"},
+                    "osm_id": n + 1,
+                    "osm_type": "node",
+                }
+                for n in range(min(int(params.get('limit', 1)), 5))
+            ]
+        elif url.path == '/reverse':
+            body = {
+                "display_name": f"ул. Мира, {abs(hash(self.path)) % 100 + 1}, Ханты-Мансийск, Россия",
+                "address": {"road": "Мира", "city": "Ханты-Мансийск"},
+            }
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        payload = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def running_fake_nominatim(latency: float = 0.05):
+    """Запускает сервер на свободном порту; возвращает его базовый URL."""
+    handler = type('BenchNominatimHandler', (FakeNominatimHandler,), {'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        server.shutdown()
+        server.server_close()
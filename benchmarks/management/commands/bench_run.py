@@ -0,0 +1,71 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from benchmarks import dataset, runner
+from benchmarks.fake_nominatim import running_fake_nominatim
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон карты, GeoJSON, карточки обращения, голосования и API геокодирования "
+        "(с фейковым Nominatim) по набору bench_seed. Печатает p50/p95/p99, запросы в секунду "
+        "и число SQL-запросов на запрос, сохраняет JSON для сравнения между коммитами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help="Запросов на сценарий.")
+        parser.add_argument('--concurrency', type=int, default=1, help="Параллельных клиентов (потоков).")
+        parser.add_argument(
+            '--scenarios',
+            default=','.join(runner.SCENARIOS),
+            help=f"Через запятую: {', '.join(runner.SCENARIOS)}.",
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--nominatim-latency',
+            type=float,
+            default=0.05,
+            help="Задержка ответа фейкового Nominatim, секунды.",
+        )
+        parser.add_argument('--cold', action='store_true', help="Очистить кэш перед прогоном.")
+        parser.add_argument('--output', help="Куда сохранить JSON (по умолчанию bench_results/<коммит>.json).")
+        parser.add_argument('--compare', help="JSON прошлого прогона для сравнения.")
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(runner.SCENARIOS)
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError("--requests и --concurrency должны быть положительными")
+
+        user = dataset.first_citizen()
+        if user is None:
+            raise CommandError("Набор данных не найден — сначала выполните bench_seed.")
+        ctx = {'issue_ids': dataset.sample_issue_ids(seed_value=options['seed'])}
+
+        if options['cold']:
+            for alias in settings.CACHES:
+                caches[alias].clear()
+
+        config = {'nominatim_latency': options['nominatim_latency'], 'cold': options['cold']}
+        self.stdout.write(runner.format_header())
+        with running_fake_nominatim(options['nominatim_latency']) as base_url:
+            # Лимитер 1 запрос/с нужен публичному Nominatim, а не фейковому
+            with override_settings(NOMINATIM_BASE_URL=base_url, NOMINATIM_RATE_LIMIT=1000, NOMINATIM_RATE_BURST=1000):
+                report = runner.run(
+                    user, ctx, scenarios, options['requests'], options['concurrency'], options['seed'],
+                    dataset=dataset.summary(), config=config, log=self.stdout.write,
+                )
+
+        output = Path(options['output'] or settings.BASE_DIR / 'bench_results' / f"{report['commit']}.json")
+        runner.save(report, output)
+        self.stdout.write(self.style.SUCCESS(f"Результаты: {output}"))
+
+        if options['compare']:
+            for line in runner.compare(report, runner.load(options['compare'])):
+                self.stdout.write(line)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическим набором для нагрузочных замеров (пользователи @bench.local, "
+        "обращения, голоса, фото). Запускайте на отдельной базе: DB_NAME=map_of_local_issues_bench."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issues', type=int, default=100_000)
+        parser.add_argument('--votes', type=int, default=1_000_000)
+        parser.add_argument('--photos', type=int, default=20_000)
+        parser.add_argument('--citizens', type=int, default=2000)
+        parser.add_argument('--officials', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42, help="Одинаковый seed — одинаковые данные.")
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help="Удалить существующий набор перед генерацией.",
+        )
+
+    def handle(self, *args, **options):
+        if dataset.bench_users().exists():
+            if not options['reset']:
+                raise CommandError("Набор уже создан. Используйте --reset, чтобы пересоздать его.")
+            self.stdout.write(f"Удалено обращений прежнего набора: {dataset.reset()}")
+
+        counts = dataset.seed(
+            issues=options['issues'],
+            votes=options['votes'],
+            photos=options['photos'],
+            citizens=options['citizens'],
+            officials=options['officials'],
+            seed_value=options['seed'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "Набор создан: " + ", ".join(f"{name} {count}" for name, count in counts.items())
+        ))
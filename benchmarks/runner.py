@@ -0,0 +1,281 @@
+"""
+Прогон сценариев нагрузки (команда bench_run).
+
+Запросы выполняются в процессе через django.test.Client: замер включает
+middleware, view, ORM и шаблоны, но не сеть и не gunicorn, поэтому цифры
+сравнимы между коммитами на одной машине. Каждый поток — отдельный клиент
+со своим соединением с БД. Число SQL-запросов снимается отдельным проходом
+(CaptureQueriesContext), чтобы запись запросов не искажала задержки.
+Сценарии *_revalidate повторяют запросы с If-None-Match, как браузер с HTTP-кэшем;
+hit_rate — доля ответов 304 Not Modified.
+Результат — JSON с коммитом, размером набора и p50/p95/p99 по сценариям.
+"""
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .dataset import BBOX, STREETS
+
+# === КОНСТАНТЫ ===
+QUERY_SAMPLE = 20
+VIEWPORT_ZOOMS = (11, 13, 15)
+# Повторные запросы: столько разных видов карты, столько голосов среди запросов
+REVALIDATE_VIEWS = 5
+REVALIDATE_WRITE_SHARE = 0.05
+XHR = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+# (метод, URL, параметры[, заголовки])
+Request = Tuple
+
+
+def _viewport(rng: random.Random) -> Dict:
+    west, south, east, north = BBOX
+    zoom = rng.choice(VIEWPORT_ZOOMS)
+    half_width = 0.3 / 2 ** (zoom - 10)
+    half_height = half_width / 2
+    lon, lat = rng.uniform(west, east), rng.uniform(south, north)
+    bbox = (lon - half_width, lat - half_height, lon + half_width, lat + half_height)
+    return {'bbox': ','.join(f'{value:.5f}' for value in bbox), 'zoom': zoom}
+
+
+def _map(rng, ctx) -> Request:
+    params = {}
+    if rng.random() < 0.3:
+        params['category'] = rng.choice(['roads', 'lighting', 'garbage', 'parks', 'water'])
+    return 'get', reverse('issues:map'), params
+
+
+def _map_geojson(rng, ctx) -> Request:
+    return 'get', reverse('issues:map_geojson'), _viewport(rng)
+
+
+def _issue_detail(rng, ctx) -> Request:
+    return 'get', reverse('issues:issue_detail', args=[rng.choice(ctx['issue_ids'])]), {}
+
+
+def _vote_issue(rng, ctx) -> Request:
+    url = reverse('issues:vote_issue', args=[rng.choice(ctx['issue_ids'])])
+    return 'post', url, {'vote': rng.choice(['1', '1', '-1', '0'])}
+
+
+def _geocode(rng, ctx) -> Request:
+    # Номера домов дают и промахи кэша (поход в фейковый Nominatim), и попадания
+    return 'get', reverse('issues:geocode_api'), {'q': f"ул. {rng.choice(STREETS)}, {rng.randint(1, 60)}"}
+
+
+def _search_address(rng, ctx) -> Request:
+    street = rng.choice(STREETS)
+    return 'get', reverse('issues:search_address_api'), {'q': street[:rng.randint(3, len(street))]}
+
+
+def _reverse_geocode(rng, ctx) -> Request:
+    west, south, east, north = BBOX
+    params = {'lat': f'{rng.uniform(south, north):.5f}', 'lon': f'{rng.uniform(west, east):.5f}'}
+    return 'get', reverse('issues:reverse_geocode_api'), params
+
+
+def _geojson_revalidate(rng, ctx) -> Request:
+    # Опрос и возврат к прежнему виду карты; голоса сдвигают версию данных
+    if rng.random() < REVALIDATE_WRITE_SHARE:
+        return _vote_issue(rng, ctx)
+    return _map_geojson(random.Random(rng.randrange(REVALIDATE_VIEWS)), ctx)
+
+
+def _list_revalidate(rng, ctx) -> Request:
+    if rng.random() < REVALIDATE_WRITE_SHARE:
+        return _vote_issue(rng, ctx)
+    method, url, params = _map(random.Random(rng.randrange(REVALIDATE_VIEWS)), ctx)
+    return method, url, params, XHR
+
+
+SCENARIOS: Dict[str, Callable[[random.Random, Dict], Request]] = {
+    'map': _map,
+    'map_geojson': _map_geojson,
+    'issue_detail': _issue_detail,
+    'vote_issue': _vote_issue,
+    'geocode_api': _geocode,
+    'search_address_api': _search_address,
+    'reverse_geocode_api': _reverse_geocode,
+    'geojson_revalidate': _geojson_revalidate,
+    'list_revalidate': _list_revalidate,
+}
+REVALIDATE_SCENARIOS = {'geojson_revalidate', 'list_revalidate'}
+
+
+def make_client(user) -> Client:
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(user)
+    return client
+
+
+def send(client: Client, request: Request, etags: Optional[Dict] = None) -> int:
+    """Выполняет запрос; с etags — условный GET с запомненным для этого URL ETag."""
+    method, url, params, *extra = request
+    headers = dict(extra[0]) if extra else {}
+    key = (url, tuple(sorted(params.items())), tuple(sorted(headers.items())))
+    if etags is not None and method == 'get' and key in etags:
+        headers['HTTP_IF_NONE_MATCH'] = etags[key]
+    # secure=True: без DEBUG включён SECURE_SSL_REDIRECT
+    response = getattr(client, method)(url, params, secure=True, **headers)
+    if etags is not None and response.has_header('ETag'):
+        etags[key] = response['ETag']
+    return response.status_code
+
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(share * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def count_queries(user, requests: List[Request], revalidate: bool = False) -> List[int]:
+    client = make_client(user)
+    etags = {} if revalidate else None
+    counts = []
+    for request in requests:
+        with CaptureQueriesContext(connection) as queries:
+            send(client, request, etags)
+        counts.append(len(queries))
+    return counts
+
+
+def _worker(user, requests: List[Request], revalidate: bool = False) -> Tuple[List[float], int, int]:
+    client = make_client(user)
+    etags = {} if revalidate else None
+    durations, errors, not_modified = [], 0, 0
+    for request in requests:
+        start = time.perf_counter()
+        status = send(client, request, etags)
+        durations.append(time.perf_counter() - start)
+        if status >= 400:
+            errors += 1
+        elif status == 304:
+            not_modified += 1
+    return durations, errors, not_modified
+
+
+def _thread_worker(user, requests: List[Request], revalidate: bool) -> Tuple[List[float], int, int]:
+    try:
+        return _worker(user, requests, revalidate)
+    finally:
+        # Соединения потока пула иначе остались бы открытыми до конца процесса
+        connections.close_all()
+
+
+def run_scenario(name: str, user, ctx: Dict, total: int, concurrency: int, seed_value: int) -> Dict:
+    rng = random.Random(f"{seed_value}:{name}")
+    build = SCENARIOS[name]
+    requests = [build(rng, ctx) for _ in range(total)]
+    revalidate = name in REVALIDATE_SCENARIOS
+
+    queries = count_queries(user, requests[:QUERY_SAMPLE], revalidate)
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        results = [_worker(user, requests, revalidate)]
+    else:
+        shares = [requests[offset::concurrency] for offset in range(concurrency)]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda share: _thread_worker(user, share, revalidate), shares))
+    elapsed = time.perf_counter() - started
+
+    durations = sorted(value for worker_durations, _, _ in results for value in worker_durations)
+    not_modified = sum(count for _, _, count in results)
+    return {
+        'requests': len(durations),
+        'errors': sum(errors for _, errors, _ in results),
+        'hit_rate': round(not_modified / len(durations), 3) if durations else 0.0,
+        'rps': round(len(durations) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(statistics.fmean(durations) * 1000, 2) if durations else 0.0,
+        'p50_ms': round(percentile(durations, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(durations, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 2),
+        'queries_median': statistics.median(queries) if queries else 0,
+        'queries_max': max(queries, default=0),
+    }
+
+
+def git_revision() -> Dict:
+    def git(*args) -> str:
+        return subprocess.run(
+            ['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    # В образе Docker нет .git — коммит можно передать переменной окружения
+    if os.getenv('GIT_COMMIT'):
+        return {'commit': os.environ['GIT_COMMIT'], 'dirty': None}
+    try:
+        return {'commit': git('rev-parse', '--short', 'HEAD'), 'dirty': bool(git('status', '--porcelain'))}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': 'unknown', 'dirty': None}
+
+
+def run(user, ctx: Dict, scenarios: List[str], total: int, concurrency: int,
+        seed_value: int, dataset: Dict, config: Dict, log=None) -> Dict:
+    report = {
+        **git_revision(),
+        'created_at': timezone.now().isoformat(),
+        'dataset': dataset,
+        'config': {'requests': total, 'concurrency': concurrency, 'seed': seed_value, **config},
+        'scenarios': {},
+    }
+    for name in scenarios:
+        result = run_scenario(name, user, ctx, total, concurrency, seed_value)
+        report['scenarios'][name] = result
+        if log is not None:
+            log(format_row(name, result))
+    return report
+
+
+# === ОТЧЁТ ===
+COLUMNS = ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_median', 'hit_rate', 'errors')
+
+
+def format_header() -> str:
+    return f"{'сценарий':<22}" + ''.join(f"{column:>16}" for column in COLUMNS)
+
+
+def format_row(name: str, result: Dict, baseline: Optional[Dict] = None) -> str:
+    cells = []
+    for column in COLUMNS:
+        cell = f"{result[column]}"
+        if baseline and baseline.get(column):
+            change = (result[column] - baseline[column]) / baseline[column] * 100
+            cell += f" ({change:+.0f}%)"
+        cells.append(f"{cell:>16}")
+    return f"{name:<22}" + ''.join(cells)
+
+
+def compare(report: Dict, baseline: Dict) -> List[str]:
+    lines = [
+        f"Сравнение с {baseline.get('commit')} ({baseline.get('created_at', '')[:19]})",
+        format_header(),
+    ]
+    for name, result in report['scenarios'].items():
+        lines.append(format_row(name, result, baseline.get('scenarios', {}).get(name)))
+    if baseline.get('dataset') != report['dataset']:
+        lines.append("Внимание: наборы данных различаются, сравнение неточно")
+    return lines
+
+
+def save(report: Dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def load(path: Path) -> Dict:
+    return json.loads(Path(path).read_text(encoding='utf-8'))
@@ -0,0 +1,38 @@
+"""
+Конфигурация gunicorn для продакшн-запуска (Dockerfile, docker-compose.yml).
+
+SERVER_INTERFACE=wsgi (по умолчанию) — воркеры gthread: WEB_CONCURRENCY процессов
+по GUNICORN_THREADS потоков. SERVER_INTERFACE=asgi — воркеры uvicorn: асинхронные
+API геокодирования ждут Nominatim, не занимая поток; потоки при этом не используются,
+а постоянные соединения с БД лучше отключить (DB_CONN_MAX_AGE=0).
+"""
+import multiprocessing
+import os
+
+SERVER_INTERFACE = os.getenv('SERVER_INTERFACE', 'wsgi').lower()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+if SERVER_INTERFACE == 'asgi':
+    wsgi_app = 'Map_of_local_issues.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'Map_of_local_issues.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+# Перезапуск воркеров после N запросов ограничивает рост памяти (Pillow, GDAL)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+# Приложение загружается до fork: воркеры делят память и стартуют быстрее
+preload_app = True
+# Заголовок X-Forwarded-* от nginx в соседнем контейнере
+forwarded_allow_ips = os.getenv('FORWARDED_ALLOW_IPS', '*')
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
@@ -1,14 +1,15 @@
 from django.shortcuts import render
 from issues.models import Issue
+from issues.modules.stats import get_issue_stats
 
 def home_view(request):
-    issues_in_progress = Issue.objects.filter(status=Issue.STATUS_IN_PROGRESS).count()
+    # Счётчики из кэша; сбрасываются сигналами сохранения/удаления обращений
+    stats = get_issue_stats()
 
-    issues_resolved = Issue.objects.filter(status=Issue.STATUS_RESOLVED).count()
-    
     context = {
-        'issues_in_progress': issues_in_progress,
-        'issues_resolved': issues_resolved,
+        'issues_in_progress': stats['by_status'][Issue.STATUS_IN_PROGRESS],
+        'issues_resolved': stats['by_status'][Issue.STATUS_RESOLVED],
+        'stats': stats,
     }
     
     return render(request, 'home_page/home.html', context)
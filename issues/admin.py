@@ -1,6 +1,7 @@
 from django.contrib.gis.admin import GISModelAdmin
 from django.contrib import admin
-from .models import Issue, Category, IssuePhoto
+from .models import Issue, Category, GazetteerAddress, GeocodeCacheEntry, IssueDailyStats, IssuePhoto
+from .modules.search import search_issues
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -11,9 +12,9 @@ class CategoryAdmin(admin.ModelAdmin):
 class IssueAdmin(GISModelAdmin):
     list_display = ('title', 'status', 'category', 'reporter', 'assigned_to')
     list_filter = ('status', 'category', 'created_at')
-    search_fields = ('title', 'description')
+    search_fields = ('title', 'description', 'address')
     date_hierarchy = 'created_at'
-    readonly_fields = ('created_at', 'updated_at', 'resolved_at')
+    readonly_fields = ('created_at', 'updated_at', 'resolved_at', 'upvotes', 'downvotes', 'rating')
     raw_id_fields = ('reporter', 'assigned_to')
 
     map_template = 'gis/admin/openlayers.html'
@@ -21,7 +22,32 @@ class IssueAdmin(GISModelAdmin):
     default_lon = 69.0223  # долгота Ханты-Мансийска
     default_zoom = 12
 
+    def get_search_results(self, request, queryset, search_term):
+        # Тот же полнотекстовый поиск (tsvector + триграммы), что и на карте
+        if not search_term.strip():
+            return queryset, False
+        return search_issues(queryset, search_term), False
+
 @admin.register(IssuePhoto)
 class IssuePhotoAdmin(admin.ModelAdmin):
     list_display = ('issue', 'caption', 'uploaded_at')
-    raw_id_fields = ('issue',)
\ No newline at end of file
+    raw_id_fields = ('issue',)
+@admin.register(GeocodeCacheEntry)
+class GeocodeCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'key', 'hits', 'last_used_at', 'expires_at')
+    list_filter = ('kind',)
+    search_fields = ('key',)
+    readonly_fields = ('created_at',)
+
+@admin.register(GazetteerAddress)
+class GazetteerAddressAdmin(GISModelAdmin):
+    list_display = ('street', 'housenumber', 'city', 'osm_type', 'osm_id')
+    list_filter = ('city',)
+    search_fields = ('search_name',)
+
+@admin.register(IssueDailyStats)
+class IssueDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'category', 'opened', 'resolved', 'refreshed_at')
+    list_filter = ('category',)
+    date_hierarchy = 'date'
+    readonly_fields = ('refreshed_at',)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class IssuesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'issues'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Счётчик SQL для метрик запроса ставится на соединения при их создании —
+        # приёмник должен быть подключён до первого соединения с БД
+        from Map_of_local_issues import instrumentation  # noqa: F401
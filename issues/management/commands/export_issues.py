@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from issues.models import Issue
+from issues.modules.export import FORMAT_GEOJSONSEQ, FORMATS, stream_export
+from issues.modules.search import apply_issue_filters
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает обращения для открытых данных (GeoJSON Text Sequences, NDJSON или CSV) "
+        "потоком через серверный курсор — память не зависит от числа обращений."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(FORMATS), default=FORMAT_GEOJSONSEQ)
+        parser.add_argument('--output', help="Файл для записи (по умолчанию stdout).")
+        parser.add_argument('--category')
+        parser.add_argument('--status')
+        parser.add_argument('--search', default='')
+
+    def handle(self, *args, **options):
+        issues = apply_issue_filters(
+            Issue.objects.all(), options['category'], options['status'], options['search'].strip()
+        )
+        chunks = stream_export(issues, options['format'])
+
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        # newline='': переводы строк CSV и NDJSON пишутся как есть
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Выгрузка записана в {options['output']}"))
@@ -0,0 +1,72 @@
+import json
+import time
+from itertools import islice
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from issues.models import GazetteerAddress
+from issues.modules.gazetteer import build_entries, overpass_query, parse_extract
+from issues.modules.geocoding import HEADERS, HMAO_VIEWBOX
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+DOWNLOAD_TIMEOUT = 1200
+UPDATE_FIELDS = ['street', 'housenumber', 'city', 'search_name', 'location']
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает справочник адресов и улиц для автодополнения из выгрузки OSM "
+        "(Overpass JSON или GeoJSON). Без файла выгрузка скачивается из Overpass API "
+        "для HMAO_VIEWBOX."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="Файл выгрузки (.json / .geojson)")
+        parser.add_argument('--viewbox', default=HMAO_VIEWBOX, help="мин.долгота,мин.широта,макс.долгота,макс.широта")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--replace', action='store_true', help="Удалить текущий справочник перед загрузкой")
+
+    def handle(self, *args, **options):
+        data = self._load(options['path'], options['viewbox'])
+        entries = build_entries(parse_extract(data), options['viewbox'])
+
+        start = time.time()
+        total = 0
+        with transaction.atomic():
+            if options['replace']:
+                GazetteerAddress.objects.all().delete()
+            while batch := list(islice(entries, options['batch_size'])):
+                GazetteerAddress.objects.bulk_create(
+                    batch,
+                    update_conflicts=True,
+                    unique_fields=['osm_type', 'osm_id'],
+                    update_fields=UPDATE_FIELDS,
+                )
+                total += len(batch)
+                self.stdout.write(f"Загружено записей: {total}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Справочник обновлён: {total} записей за {time.time() - start:.1f}с"
+        ))
+
+    def _load(self, path, viewbox):
+        if path:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Не удалось прочитать {path}: {e}")
+
+        url = getattr(settings, 'OVERPASS_URL', OVERPASS_URL)
+        self.stdout.write(f"Скачиваем выгрузку из {url}…")
+        try:
+            resp = requests.post(
+                url, data={'data': overpass_query(viewbox)}, headers=HEADERS, timeout=DOWNLOAD_TIMEOUT
+            )
+            resp.raise_for_status()
+            return resp.json()
+        except (requests.RequestException, ValueError) as e:
+            raise CommandError(f"Overpass API недоступен: {e}")
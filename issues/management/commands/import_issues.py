@@ -0,0 +1,96 @@
+import csv
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from issues.modules.bulk_import import (
+    EXTENSIONS, IssueImporter, RecordValidator, detect_format, read_records,
+)
+from users.models import CustomUser
+
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Массовая загрузка обращений из внешней системы (CSV, GeoJSON, GeoJSON Text Sequences/NDJSON): "
+        "проверка порциями, геокодирование адресов без координат, COPY во временную таблицу "
+        "и upsert в Issue по external_id. Повторная загрузка того же файла обновляет обращения."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл: " + ", ".join(EXTENSIONS))
+        parser.add_argument('--format', choices=sorted(set(EXTENSIONS.values())),
+                            help="Формат, если его не определить по расширению.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--reporter', help="Email автора для загруженных обращений (по умолчанию — без автора).")
+        parser.add_argument('--no-geocode', action='store_true',
+                            help="Отклонять записи без координат, не обращаясь к геокодеру.")
+        parser.add_argument('--rejects', help="CSV для отклонённых записей (номер, причина).")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        if fmt is None:
+            raise CommandError("Не удалось определить формат — укажите --format.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size должен быть положительным")
+
+        reporter_id = None
+        if options['reporter']:
+            reporter_id = CustomUser.objects.filter(email=options['reporter']).values_list('pk', flat=True).first()
+            if reporter_id is None:
+                raise CommandError(f"Пользователь {options['reporter']} не найден")
+
+        validator = RecordValidator()
+        importer = IssueImporter(reporter_id=reporter_id, geocode=not options['no_geocode'])
+        rejects_file = open(options['rejects'], 'w', encoding='utf-8', newline='') if options['rejects'] else None
+        rejects = csv.writer(rejects_file) if rejects_file else None
+        if rejects:
+            rejects.writerow(['record', 'reason'])
+
+        totals = {'read': 0, 'inserted': 0, 'updated': 0, 'rejected': 0}
+        start = time.time()
+        try:
+            records = read_records(options['path'], fmt)
+            while batch := list(islice(records, options['batch_size'])):
+                valid = []
+                for number, raw in batch:
+                    try:
+                        record = validator.clean(raw)
+                        importer.locate(record)
+                    except ValueError as e:
+                        self._reject(totals, rejects, number, e)
+                        continue
+                    valid.append(record)
+
+                inserted, updated = importer.load(valid)
+                totals['read'] += len(batch)
+                totals['inserted'] += inserted
+                totals['updated'] += updated
+                elapsed = max(time.time() - start, 1e-3)
+                self.stdout.write(
+                    f"Прочитано {totals['read']}: добавлено {totals['inserted']}, обновлено {totals['updated']}, "
+                    f"отклонено {totals['rejected']} — {totals['read'] / elapsed:.0f} строк/с"
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Не удалось прочитать {options['path']}: {e}")
+        finally:
+            if rejects_file:
+                rejects_file.close()
+            importer.finish()
+
+        elapsed = max(time.time() - start, 1e-3)
+        self.stdout.write(self.style.SUCCESS(
+            f"Загружено за {elapsed:.1f}с ({totals['read'] / elapsed:.0f} строк/с): "
+            f"добавлено {totals['inserted']}, обновлено {totals['updated']}, отклонено {totals['rejected']}"
+        ))
+
+    def _reject(self, totals, rejects, number, error):
+        totals['rejected'] += 1
+        if totals['rejected'] <= MAX_REPORTED_ERRORS:
+            self.stderr.write(f"Запись {number}: {error}")
+        elif totals['rejected'] == MAX_REPORTED_ERRORS + 1:
+            self.stderr.write("… остальные отклонённые записи не выводятся" + (" (см. --rejects)" if rejects else ""))
+        if rejects:
+            rejects.writerow([number, str(error)])
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from issues.models import IssuePhoto
+from issues.modules.photos import process_photo
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит миниатюры и средние копии для уже загруженных фото (media/issue_photos/) "
+        "и удаляет из оригиналов EXIF. По умолчанию обрабатываются только фото без миниатюры."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Пересоздать копии для всех фото (например, после смены размеров или формата).",
+        )
+
+    def handle(self, *args, **options):
+        photos = IssuePhoto.objects.order_by('id')
+        if not options['all']:
+            photos = photos.filter(thumbnail='')
+
+        processed = failed = 0
+        for photo in photos.iterator(chunk_size=200):
+            if process_photo(photo):
+                processed += 1
+            else:
+                failed += 1
+                self.stderr.write(f"Фото {photo.pk} ({photo.image.name}) не обработано")
+
+        self.stdout.write(self.style.SUCCESS(f"Обработано фото: {processed}, с ошибками: {failed}"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from issues.models import Issue
+from issues.modules.votes import rebuild_vote_counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики голосов (upvotes, downvotes, rating) по таблице Vote"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--issue',
+            type=int,
+            action='append',
+            dest='issue_ids',
+            help="ID обращения (можно указать несколько раз). По умолчанию — все обращения.",
+        )
+
+    def handle(self, *args, **options):
+        issues = Issue.objects.all()
+        if options['issue_ids']:
+            issues = issues.filter(pk__in=options['issue_ids'])
+
+        updated = rebuild_vote_counters(issues)
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано обращений: {updated}"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from issues.modules.analytics import rebuild_rollups, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает дневную сводку обращений для аналитики (IssueDailyStats). "
+        "По умолчанию — только дни, отмеченные сигналами; обычно это делает воркер очереди."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help="Пересобрать сводку целиком, от первого обращения (после импорта или правок в обход ORM).",
+        )
+
+    def handle(self, *args, **options):
+        days = rebuild_rollups() if options['full'] else refresh_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано дней: {days}"))
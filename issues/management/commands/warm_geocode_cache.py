@@ -0,0 +1,91 @@
+import math
+
+from django.contrib.gis.geos import Polygon
+from django.core.management.base import BaseCommand
+
+from issues.models import Issue
+from issues.modules import geocode_store
+from issues.modules.geocoding import reverse_geocode, search_address
+
+# Городская застройка: (мин. долгота, мин. широта, макс. долгота, макс. широта)
+CITIES = {
+    'Ханты-Мансийск': (68.90, 60.95, 69.15, 61.05),
+    'Сургут': (73.25, 61.22, 73.55, 61.30),
+    'Нижневартовск': (76.45, 60.90, 76.70, 60.97),
+}
+METERS_PER_DEGREE = 111320
+
+
+def grid_points(bbox, step_m):
+    """Узлы сетки с шагом step_m метров внутри bbox."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lat_step = step_m / METERS_PER_DEGREE
+    lon_step = step_m / (METERS_PER_DEGREE * math.cos(math.radians((min_lat + max_lat) / 2)))
+    lat = min_lat
+    while lat <= max_lat:
+        lon = min_lon
+        while lon <= max_lon:
+            yield lat, lon
+            lon += lon_step
+        lat += lat_step
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогревает постоянный кэш геокодирования для городов ХМАО: обратное геокодирование "
+        "по сетке и прямой поиск адресов существующих обращений. Запросы идут через общий "
+        "лимитер Nominatim, уже закэшированные точки пропускаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--city',
+            action='append',
+            dest='cities',
+            choices=list(CITIES),
+            help="Город (можно указать несколько раз). По умолчанию — все.",
+        )
+        parser.add_argument(
+            '--step',
+            type=int,
+            default=1000,
+            help="Шаг сетки обратного геокодирования в метрах (по умолчанию 1000).",
+        )
+        parser.add_argument(
+            '--skip-reverse',
+            action='store_true',
+            help="Только прямой поиск по адресам обращений.",
+        )
+
+    def handle(self, *args, **options):
+        for city in options['cities'] or CITIES:
+            bbox = CITIES[city]
+            searched = self._warm_search(city, bbox)
+            reversed_count = 0 if options['skip_reverse'] else self._warm_reverse(bbox, options['step'])
+            self.stdout.write(f"{city}: поиск — {searched}, обратное геокодирование — {reversed_count}")
+
+        evicted = geocode_store.evict()
+        self.stdout.write(self.style.SUCCESS(f"Кэш прогрет, вытеснено записей: {evicted}"))
+
+    def _warm_search(self, city, bbox):
+        addresses = set(
+            Issue.objects.filter(location__within=Polygon.from_bbox(bbox))
+            .exclude(address='')
+            .values_list('address', flat=True)
+        )
+        addresses.add(city)
+
+        count = 0
+        for address in sorted(addresses):
+            if geocode_store.get_search(address, 5) is None:
+                search_address(address)
+                count += 1
+        return count
+
+    def _warm_reverse(self, bbox, step_m):
+        count = 0
+        for lat, lon in grid_points(bbox, step_m):
+            if geocode_store.get_reverse(lat, lon) is None:
+                reverse_geocode(lat, lon)
+                count += 1
+        return count
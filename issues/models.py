@@ -1,12 +1,14 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import FileExtensionValidator
-from django.db.models import Sum
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from .constants import ISSUE_CATEGORY_CHOICES
+from .modules.search import SEARCH_VECTOR
 
 User = get_user_model()
 
@@ -33,6 +35,7 @@ class Issue(models.Model):
         (STATUS_IN_PROGRESS, _('В работе')),
         (STATUS_RESOLVED, _('Решено')),
     ]
+    VOTE_COUNTER_FIELDS = ('upvotes', 'downvotes', 'rating')
 
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -72,8 +75,35 @@ class Issue(models.Model):
         help_text="Official assigned to resolve this issue"
     )
     resolved_at = models.DateTimeField(null=True, blank=True)
+    # Идентификатор в исходной системе для обращений, загруженных командой import_issues;
+    # ключ upsert при повторной загрузке
+    external_id = models.CharField(max_length=64, null=True, blank=True, unique=True, editable=False)
+    # Денормализованные счётчики голосов; поддерживаются атомарными F()-обновлениями
+    # в issues.modules.votes, пересчитываются командой rebuild_vote_counters
+    upvotes = models.PositiveIntegerField(_("Голосов «за»"), default=0)
+    downvotes = models.PositiveIntegerField(_("Голосов «против»"), default=0)
+    rating = models.IntegerField(_("Рейтинг"), default=0)
+    # Хранимый tsvector (заголовок, адрес, описание) для полнотекстового поиска
+    search_vector = models.GeneratedField(
+        expression=SEARCH_VECTOR,
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
+        indexes = [
+            # Ключи keyset-пагинации списка обращений (поле сортировки + id)
+            models.Index(fields=['created_at', 'id'], name='issue_created_id_idx'),
+            models.Index(fields=['rating', 'id'], name='issue_rating_id_idx'),
+            models.Index(fields=['title', 'id'], name='issue_title_id_idx'),
+            # Выборка изменений для ?since= (issues.modules.sync)
+            models.Index(fields=['updated_at'], name='issue_updated_at_idx'),
+            GinIndex(fields=['search_vector'], name='issue_search_vector_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='issue_title_trgm_idx'),
+            # Поиск подстроки (ILIKE) в описании и адресе
+            GinIndex(fields=['description'], opclasses=['gin_trgm_ops'], name='issue_description_trgm_idx'),
+            GinIndex(fields=['address'], opclasses=['gin_trgm_ops'], name='issue_address_trgm_idx'),
+        ]
         permissions = [
             ('can_resolve_issue', 'Can mark issue as resolved'),
             ('can_assign_issue', 'Can assign issues to officials'),
@@ -86,20 +116,15 @@ class Issue(models.Model):
     def save(self, *args, **kwargs):
         if self.status == self.STATUS_RESOLVED and not self.resolved_at:
             self.resolved_at = timezone.now()
+        # Счётчики голосов меняются только атомарными UPDATE — обычное сохранение
+        # не должно перезаписывать их устаревшими значениями из памяти
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and not f.generated and f.name not in self.VOTE_COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
 
-    @property
-    def rating(self):
-        """
-        Возвращает текущий рейтинг (сумму голосов).
-        Если объект аннотирован через _rating — использует его (быстро).
-        Иначе — делает запрос к БД (медленно, fallback).
-        """
-        if hasattr(self, '_rating'):
-            return self._rating
-        # fallback (например, при вызове issue.rating вне аннотированного QuerySet)
-        return self.votes.aggregate(models.Sum('value'))['value__sum'] or 0
-
 
 class IssuePhoto(models.Model):
     issue = models.ForeignKey(
@@ -113,10 +138,29 @@ class IssuePhoto(models.Model):
     )
     caption = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Уменьшенные копии без EXIF (issues.modules.photos): миниатюра — для списков
+    # и попапов карты, средняя — для просмотра. Размеры хранятся, чтобы не открывать файлы.
+    thumbnail = models.ImageField(upload_to='issue_photos/variants/', blank=True)
+    medium = models.ImageField(upload_to='issue_photos/variants/', blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    medium_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    medium_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"Photo for {self.issue.title}"
 
+    @property
+    def small_url(self):
+        """Миниатюра, пока её нет (фото не обработано) — оригинал."""
+        return (self.thumbnail or self.image).url
+
+    @property
+    def medium_url(self):
+        return (self.medium or self.image).url
+
 
 class Vote(models.Model):
     VOTE_UP = 1
@@ -188,3 +232,113 @@ class Comment(models.Model):
 
     def __str__(self):
         return f"Комментарий от {self.author.get_full_name()} к обращению {self.issue.id}"
+
+
+class GeocodeCacheEntry(models.Model):
+    """
+    Постоянный кэш геокодирования (второй уровень после Django cache).
+    Прямой поиск хранится по нормализованной строке запроса,
+    обратный — по координатам, округлённым до сетки, с точкой для поиска ближайшего.
+    """
+    KIND_SEARCH = 'search'
+    KIND_REVERSE = 'reverse'
+    KIND_CHOICES = [
+        (KIND_SEARCH, _('Поиск адреса')),
+        (KIND_REVERSE, _('Обратное геокодирование')),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=500)
+    location = models.PointField(geography=True, null=True, blank=True)
+    payload = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = _('Кэш геокодирования')
+        verbose_name_plural = _('Кэш геокодирования')
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='geocode_cache_kind_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.key}"
+
+
+class GazetteerAddress(models.Model):
+    """
+    Локальный справочник адресов и улиц ХМАО из выгрузки OSM (команда import_gazetteer).
+    Автодополнение отвечает из него, не обращаясь к Nominatim.
+    """
+    street = models.CharField(_("Улица"), max_length=255)
+    housenumber = models.CharField(_("Номер дома"), max_length=50, blank=True)
+    city = models.CharField(_("Населённый пункт"), max_length=100, blank=True)
+    # Нормализованная строка «улица дом» (см. issues.modules.gazetteer.normalize_address)
+    search_name = models.CharField(max_length=400)
+    location = models.PointField(srid=4326)
+    osm_type = models.CharField(max_length=10)
+    osm_id = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = _('Адрес справочника')
+        verbose_name_plural = _('Справочник адресов')
+        constraints = [
+            models.UniqueConstraint(fields=['osm_type', 'osm_id'], name='gazetteer_osm_uniq'),
+        ]
+        indexes = [
+            # LIKE 'префикс%' по индексу независимо от локали базы
+            models.Index(fields=['search_name'], opclasses=['varchar_pattern_ops'], name='gazetteer_prefix_idx'),
+            GinIndex(fields=['search_name'], opclasses=['gin_trgm_ops'], name='gazetteer_trgm_idx'),
+        ]
+
+    def __str__(self):
+        return ", ".join(p for p in (self.street, self.housenumber, self.city) if p)
+
+
+class IssueDailyStats(models.Model):
+    """
+    Дневная сводка по обращениям для аналитики должностных лиц (issues.modules.analytics).
+    Строка на (день, категория): сколько создано и решено в этот день. Время решения
+    хранится суммой и гистограммой, чтобы среднее и медиана за любой период
+    считались по сводке, без агрегирования по Issue.
+    """
+    date = models.DateField()
+    category = models.CharField(max_length=20, choices=ISSUE_CATEGORY_CHOICES)
+    opened = models.PositiveIntegerField(default=0)
+    resolved = models.PositiveIntegerField(default=0)
+    resolve_seconds_total = models.BigIntegerField(default=0)
+    # Число решённых по корзинам времени решения (границы — analytics.RESOLVE_BUCKETS_HOURS)
+    resolve_histogram = models.JSONField(default=list)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Дневная статистика обращений')
+        verbose_name_plural = _('Дневная статистика обращений')
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='issue_daily_stats_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.category}: +{self.opened} / {self.resolved}"
+
+
+class IssueStatsDirtyDate(models.Model):
+    """День, сводку за который нужно пересчитать (отмечается сигналами Issue)."""
+    date = models.DateField(unique=True)
+
+    def __str__(self):
+        return str(self.date)
+
+
+class IssueTombstone(models.Model):
+    """
+    Отметка об удалённом обращении для инкрементальной синхронизации карты
+    (issues.modules.sync): клиент с устаревшим набором точек узнаёт, какие убрать.
+    """
+    issue_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"#{self.issue_id} ({self.deleted_at:%Y-%m-%d %H:%M})"
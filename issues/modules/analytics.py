@@ -0,0 +1,254 @@
+"""
+Аналитика для должностных лиц: сколько обращений создано и решено по дням
+и категориям, среднее и медианное время решения.
+
+Агрегирование по Issue выполняется только при пересчёте сводки IssueDailyStats
+и только за изменившиеся дни: сигналы Issue отмечают дни создания и решения
+в IssueStatsDirtyDate и ставят в очередь задачу issues.refresh_rollups.
+Дашборд и JSON API читают лишь строки сводки за выбранный период.
+Медиана за период оценивается по гистограмме времени решения
+(линейная интерполяция внутри корзины), среднее — точное.
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from issues.constants import ISSUE_CATEGORY_CHOICES
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+# Верхние границы корзин времени решения, часы; последняя корзина открыта сверху
+RESOLVE_BUCKETS_HOURS = (1, 4, 12, 24, 48, 72, 120, 168, 336, 720, 1440, 2160)
+PERIOD_CHOICES = (7, 30, 90, 365)
+DEFAULT_PERIOD = 30
+REFRESH_TASK = 'issues.refresh_rollups'
+# Пересчёт откладывается, чтобы серия правок обращений уложилась в один запуск
+REFRESH_DELAY = 60
+
+
+# === ГИСТОГРАММА ВРЕМЕНИ РЕШЕНИЯ ===
+def empty_histogram() -> List[int]:
+    return [0] * (len(RESOLVE_BUCKETS_HOURS) + 1)
+
+
+def bucket_index(seconds: float) -> int:
+    hours = seconds / 3600
+    for index, bound in enumerate(RESOLVE_BUCKETS_HOURS):
+        if hours < bound:
+            return index
+    return len(RESOLVE_BUCKETS_HOURS)
+
+
+def merge_histogram(target: List[int], source: Iterable[int]) -> None:
+    for index, count in enumerate(source):
+        if index < len(target):
+            target[index] += count
+
+
+def histogram_median_hours(histogram: List[int]) -> Optional[float]:
+    total = sum(histogram)
+    if not total:
+        return None
+    half = total / 2
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= half:
+            lower = RESOLVE_BUCKETS_HOURS[index - 1] if index else 0
+            if index >= len(RESOLVE_BUCKETS_HOURS):
+                # Открытая сверху корзина: известна только нижняя граница
+                return float(lower)
+            upper = RESOLVE_BUCKETS_HOURS[index]
+            return round(lower + (upper - lower) * (half - seen) / count, 1)
+        seen += count
+    return None
+
+
+# === ПЕРЕСЧЁТ СВОДКИ ===
+def mark_dirty(*moments: Optional[datetime]) -> None:
+    """Отмечает для пересчёта дни (по местному времени) переданных моментов."""
+    from issues.models import IssueStatsDirtyDate
+
+    days = {timezone.localdate(moment) for moment in moments if moment is not None}
+    if days:
+        IssueStatsDirtyDate.objects.bulk_create(
+            [IssueStatsDirtyDate(date=day) for day in days], ignore_conflicts=True
+        )
+
+
+def mark_range_dirty(start: date, end: date) -> int:
+    from issues.models import IssueStatsDirtyDate
+
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    IssueStatsDirtyDate.objects.bulk_create(
+        [IssueStatsDirtyDate(date=day) for day in days], ignore_conflicts=True, batch_size=1000
+    )
+    return len(days)
+
+
+def schedule_refresh() -> None:
+    """Ставит отложенный пересчёт в очередь, если он ещё не ждёт выполнения."""
+    from jobs.models import Job
+    from issues.tasks import refresh_issue_rollups
+
+    if not Job.objects.filter(name=REFRESH_TASK, status=Job.STATUS_PENDING).exists():
+        refresh_issue_rollups.delay(countdown=getattr(settings, 'ANALYTICS_REFRESH_DELAY', REFRESH_DELAY))
+
+
+def _day_bounds(days: Iterable[date]):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(min(days), time.min), tz)
+    end = timezone.make_aware(datetime.combine(max(days) + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def compute_daily_rows(days: Iterable[date]) -> List:
+    """Строки IssueDailyStats за указанные дни (только непустые пары день–категория)."""
+    from issues.models import Issue, IssueDailyStats
+
+    days = set(days)
+    start, end = _day_bounds(days)
+    rows = {}
+
+    def row(day, category):
+        if (day, category) not in rows:
+            rows[day, category] = IssueDailyStats(
+                date=day, category=category, resolve_histogram=empty_histogram()
+            )
+        return rows[day, category]
+
+    opened = (
+        Issue.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by()
+        .values('category', day=TruncDate('created_at'))
+        .annotate(total=Count('id'))
+    )
+    for item in opened:
+        if item['day'] in days:
+            row(item['day'], item['category']).opened = item['total']
+
+    resolved = (
+        Issue.objects.filter(resolved_at__gte=start, resolved_at__lt=end)
+        .order_by()
+        .values_list('category', 'created_at', 'resolved_at')
+    )
+    for category, created_at, resolved_at in resolved.iterator(chunk_size=2000):
+        day = timezone.localdate(resolved_at)
+        if day not in days:
+            continue
+        seconds = max((resolved_at - created_at).total_seconds(), 0)
+        entry = row(day, category)
+        entry.resolved += 1
+        entry.resolve_seconds_total += int(seconds)
+        entry.resolve_histogram[bucket_index(seconds)] += 1
+
+    return list(rows.values())
+
+
+def refresh_rollups() -> int:
+    """Пересчитывает сводку за отмеченные дни. Возвращает число пересчитанных дней."""
+    from issues.models import IssueDailyStats, IssueStatsDirtyDate
+
+    with transaction.atomic():
+        dirty = list(
+            IssueStatsDirtyDate.objects.select_for_update(skip_locked=True).order_by('date')
+        )
+        if not dirty:
+            return 0
+        # Отметки снимаются до расчёта: изменение, пришедшее во время пересчёта,
+        # дождётся коммита и отметит день заново
+        IssueStatsDirtyDate.objects.filter(pk__in=[entry.pk for entry in dirty]).delete()
+        days = [entry.date for entry in dirty]
+        rows = compute_daily_rows(days)
+        IssueDailyStats.objects.filter(date__in=days).delete()
+        IssueDailyStats.objects.bulk_create(rows, batch_size=500)
+
+    logger.info(f"Сводка обращений пересчитана за {len(days)} дн. ({len(rows)} строк)")
+    return len(days)
+
+
+def rebuild_rollups() -> int:
+    """Полный пересчёт: от первого обращения до сегодняшнего дня."""
+    from issues.models import Issue, IssueDailyStats
+
+    first = Issue.objects.aggregate(first=Min('created_at'))['first']
+    with transaction.atomic():
+        IssueDailyStats.objects.all().delete()
+        if first is not None:
+            mark_range_dirty(timezone.localdate(first), timezone.localdate())
+    return refresh_rollups()
+
+
+# === ЧТЕНИЕ ===
+def parse_period(value) -> int:
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PERIOD
+    return days if days in PERIOD_CHOICES else DEFAULT_PERIOD
+
+
+def _totals() -> Dict:
+    return {'opened': 0, 'resolved': 0, 'seconds': 0, 'histogram': empty_histogram()}
+
+
+def _add(totals: Dict, row: Dict) -> None:
+    totals['opened'] += row['opened']
+    totals['resolved'] += row['resolved']
+    totals['seconds'] += row['resolve_seconds_total']
+    merge_histogram(totals['histogram'], row['resolve_histogram'])
+
+
+def _summary(totals: Dict) -> Dict:
+    mean = totals['seconds'] / totals['resolved'] / 3600 if totals['resolved'] else None
+    return {
+        'opened': totals['opened'],
+        'resolved': totals['resolved'],
+        'median_resolve_hours': histogram_median_hours(totals['histogram']),
+        'mean_resolve_hours': round(mean, 1) if mean is not None else None,
+    }
+
+
+def get_analytics(days: int = DEFAULT_PERIOD, category: Optional[str] = None) -> Dict:
+    """Показатели за последние days дней (включая сегодня) по сводке IssueDailyStats."""
+    from issues.models import IssueDailyStats, IssueStatsDirtyDate
+
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    labels = dict(ISSUE_CATEGORY_CHOICES)
+
+    rows = IssueDailyStats.objects.filter(date__gte=start, date__lte=end)
+    if category:
+        rows = rows.filter(category=category)
+
+    daily = {start + timedelta(days=offset): _totals() for offset in range(days)}
+    by_category = {key: _totals() for key in ([category] if category else labels)}
+    overall = _totals()
+    for row in rows.values('date', 'category', 'opened', 'resolved', 'resolve_seconds_total', 'resolve_histogram'):
+        _add(daily[row['date']], row)
+        _add(by_category.setdefault(row['category'], _totals()), row)
+        _add(overall, row)
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'days': days,
+        'category': category,
+        'totals': _summary(overall),
+        'daily': [
+            {'date': day.isoformat(), 'opened': totals['opened'], 'resolved': totals['resolved']}
+            for day, totals in daily.items()
+        ],
+        'by_category': [
+            {'category': key, 'label': str(labels.get(key, key)), **_summary(totals)}
+            for key, totals in by_category.items()
+        ],
+        # Дни, ожидающие пересчёта: цифры за них могут отставать
+        'pending_days': IssueStatsDirtyDate.objects.count(),
+    }
@@ -0,0 +1,356 @@
+"""
+Массовая загрузка обращений из внешней системы (команда import_issues).
+
+Записи читаются потоком (CSV, GeoJSON, GeoJSON Text Sequences/NDJSON) и
+проверяются порциями; недостающие координаты находятся по адресу через
+geocode_address (кэш и общий лимитер Nominatim). Порция копируется командой
+COPY во временную таблицу и одним INSERT … ON CONFLICT (external_id)
+переносится в Issue: новые обращения добавляются, загруженные ранее —
+обновляются, счётчики голосов и автор не меняются. Даты, которых нет в записи,
+у загруженных ранее обращений сохраняются, у новых — текущее время.
+
+Сигналы моделей при этом не срабатывают, поэтому кэши (тайлы, статистика,
+версия данных карты) сбрасываются для каждой порции явно — тайлы целиком,
+сменой поколения, — а дни сводки аналитики отмечаются для пересчёта в конце загрузки.
+"""
+import csv
+import io
+import json
+import logging
+from datetime import datetime, time as dt_time
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from issues.constants import ISSUE_CATEGORY_CHOICES
+from issues.models import Issue
+from issues.modules.analytics import mark_range_dirty, schedule_refresh
+from issues.modules.conditional import bump_dataset_version
+from issues.modules.geocoding import geocode_address
+from issues.modules.stats import invalidate_issue_stats
+from issues.modules.tiles import invalidate_all_tiles
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+FORMAT_CSV = 'csv'
+FORMAT_GEOJSON = 'geojson'
+FORMAT_GEOJSONSEQ = 'geojsonseq'
+EXTENSIONS = {
+    '.csv': FORMAT_CSV,
+    '.geojson': FORMAT_GEOJSON,
+    '.json': FORMAT_GEOJSON,
+    '.geojsons': FORMAT_GEOJSONSEQ,
+    '.geojsonseq': FORMAT_GEOJSONSEQ,
+    '.ndjson': FORMAT_GEOJSONSEQ,
+}
+STAGING_TABLE = 'issue_import_staging'
+# Столбцы временной таблицы в порядке данных COPY
+STAGING_COLUMNS = (
+    ('external_id', 'text'),
+    ('title', 'text'),
+    ('description', 'text'),
+    ('category', 'text'),
+    ('status', 'text'),
+    ('address', 'text'),
+    ('lon', 'double precision'),
+    ('lat', 'double precision'),
+    ('created_at', 'timestamptz'),
+    ('resolved_at', 'timestamptz'),
+)
+# Пустое поле без кавычек COPY читает как NULL; в этих столбцах — как пустую строку
+NOT_NULL_COLUMNS = ('title', 'description', 'category', 'status', 'address')
+TITLE_MAX_LENGTH = Issue._meta.get_field('title').max_length
+ADDRESS_MAX_LENGTH = Issue._meta.get_field('address').max_length
+EXTERNAL_ID_MAX_LENGTH = Issue._meta.get_field('external_id').max_length
+
+
+# === ЧТЕНИЕ ===
+def detect_format(path: str) -> Optional[str]:
+    for extension, fmt in EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return fmt
+    return None
+
+
+def _feature_record(feature: Dict) -> Dict:
+    record = dict(feature.get('properties') or {})
+    geometry = feature.get('geometry') or {}
+    if geometry.get('type') == 'Point':
+        record['lon'], record['lat'] = geometry['coordinates'][:2]
+    return record
+
+
+def _parse_item(item) -> Union[Dict, ValueError]:
+    if not isinstance(item, dict):
+        return ValueError("запись не является объектом JSON")
+    if item.get('type') != 'Feature':
+        return item
+    try:
+        return _feature_record(item)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return ValueError("некорректный объект Feature")
+
+
+def read_records(path: str, fmt: str) -> Iterator[Tuple[int, Union[Dict, ValueError]]]:
+    """
+    (номер записи, словарь полей) — строки CSV, объекты GeoJSON или строки NDJSON.
+    Запись, которую не удалось разобрать, приходит как ValueError с причиной:
+    отклоняется она одна, а не вся загрузка.
+    """
+    if fmt == FORMAT_CSV:
+        # utf-8-sig: выгрузки из Excel начинаются с BOM
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+    elif fmt == FORMAT_GEOJSON:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        for number, feature in enumerate(data.get('features', []), start=1):
+            yield number, _parse_item(feature)
+    else:
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f, start=1):
+                line = line.strip().lstrip('\x1e')
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    yield number, ValueError(f"некорректный JSON: {e}")
+                    continue
+                yield number, _parse_item(item)
+
+
+# === ПРОВЕРКА ===
+def _lookup(choices) -> Dict[str, str]:
+    """Значение принимается и как ключ, и как подпись (без учёта регистра)."""
+    table = {}
+    for key, label in choices:
+        table[str(key).lower()] = key
+        table[str(label).lower()] = key
+    return table
+
+
+def _parse_moment(value) -> Optional[datetime]:
+    if value in (None, ''):
+        return None
+    text = str(value).strip()
+    moment = parse_datetime(text)
+    if moment is None:
+        day = parse_date(text)
+        if day is None:
+            raise ValueError(f"некорректная дата «{text}»")
+        moment = datetime.combine(day, dt_time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _parse_coordinate(value, low: float, high: float) -> Optional[float]:
+    if value in (None, ''):
+        return None
+    number = float(value)
+    if not low <= number <= high:
+        raise ValueError(f"координата {number} вне диапазона")
+    return number
+
+
+class RecordValidator:
+    def __init__(self):
+        self.categories = _lookup(ISSUE_CATEGORY_CHOICES)
+        self.statuses = _lookup(Issue.STATUS_CHOICES)
+
+    def clean(self, raw: Union[Dict, ValueError]) -> Dict:
+        """Запись для загрузки; ValueError с причиной, если запись отклонена."""
+        if isinstance(raw, ValueError):
+            raise raw
+        external_id = str(raw.get('external_id') or raw.get('id') or '').strip() or None
+        if external_id and len(external_id) > EXTERNAL_ID_MAX_LENGTH:
+            raise ValueError("слишком длинный external_id")
+
+        title = str(raw.get('title') or '').strip()
+        if not title:
+            raise ValueError("нет заголовка")
+
+        category = self.categories.get(str(raw.get('category') or '').strip().lower())
+        if category is None:
+            raise ValueError(f"неизвестная категория «{raw.get('category')}»")
+        status = self.statuses.get(str(raw.get('status') or Issue.STATUS_OPEN).strip().lower())
+        if status is None:
+            raise ValueError(f"неизвестный статус «{raw.get('status')}»")
+
+        try:
+            lon = _parse_coordinate(raw.get('lon'), -180, 180)
+            lat = _parse_coordinate(raw.get('lat'), -90, 90)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"некорректные координаты: {e}")
+        address = str(raw.get('address') or '').strip()[:ADDRESS_MAX_LENGTH]
+        if (lon is None or lat is None) and not address:
+            raise ValueError("нет ни координат, ни адреса")
+
+        # Нет даты — None: у загруженного ранее обращения останется прежняя
+        # (см. _fill_known_dates_sql), у нового — время загрузки
+        created_at = _parse_moment(raw.get('created_at'))
+        resolved_at = _parse_moment(raw.get('resolved_at'))
+
+        return {
+            'external_id': external_id,
+            'title': title[:TITLE_MAX_LENGTH],
+            'description': str(raw.get('description') or '').strip(),
+            'category': category,
+            'status': status,
+            'address': address,
+            'lon': lon,
+            'lat': lat,
+            'created_at': created_at,
+            'resolved_at': resolved_at,
+        }
+
+
+# === ЗАГРУЗКА ===
+def _fill_known_dates_sql() -> str:
+    """Недостающие даты обновляемых обращений — из таблицы: повторная загрузка их не сдвигает."""
+    table = Issue._meta.db_table
+    return f"""
+        UPDATE {STAGING_TABLE} s SET
+            created_at = COALESCE(s.created_at, i.created_at),
+            resolved_at = COALESCE(s.resolved_at, CASE WHEN s.status = %(resolved)s THEN i.resolved_at END)
+        FROM {table} i
+        WHERE i.external_id = s.external_id
+          AND (s.created_at IS NULL OR s.resolved_at IS NULL)
+    """
+
+
+def _upsert_sql() -> str:
+    # Как Issue.save(): у решённого обращения есть дата решения; точная
+    # неизвестна — берём дату создания
+    table = Issue._meta.db_table
+    return f"""
+        INSERT INTO {table} (
+            external_id, title, description, category, status, address, location,
+            created_at, updated_at, resolved_at, reporter_id, upvotes, downvotes, rating
+        )
+        SELECT
+            s.external_id, s.title, s.description, s.category, s.status, s.address,
+            ST_SetSRID(ST_MakePoint(s.lon, s.lat), 4326),
+            COALESCE(s.created_at, now()), now(),
+            COALESCE(s.resolved_at, CASE WHEN s.status = %(resolved)s THEN COALESCE(s.created_at, now()) END),
+            %(reporter)s, 0, 0, 0
+        FROM {STAGING_TABLE} s
+        ON CONFLICT (external_id) DO UPDATE SET
+            title = EXCLUDED.title,
+            description = EXCLUDED.description,
+            category = EXCLUDED.category,
+            status = EXCLUDED.status,
+            address = EXCLUDED.address,
+            location = EXCLUDED.location,
+            created_at = EXCLUDED.created_at,
+            updated_at = EXCLUDED.updated_at,
+            resolved_at = EXCLUDED.resolved_at
+        RETURNING (xmax = 0), created_at, resolved_at
+    """
+
+
+def _copy(cursor, sql: str, data: io.StringIO) -> None:
+    if hasattr(cursor, 'copy_expert'):
+        cursor.copy_expert(sql, data)  # psycopg2
+    else:
+        with cursor.copy(sql) as copy:  # psycopg 3
+            copy.write(data.getvalue())
+
+
+class IssueImporter:
+    """Загрузка проверенных записей порциями; хранит кэш геокодирования и диапазон дат."""
+
+    def __init__(self, reporter_id: Optional[int] = None, geocode: bool = True):
+        self.reporter_id = reporter_id
+        self.geocode = geocode
+        self.geocoded: Dict[str, Optional[Tuple[float, float]]] = {}
+        self.first_day = None
+        self.last_day = None
+
+    def locate(self, record: Dict) -> None:
+        """Координаты по адресу для записей без них; ValueError, если адрес не найден."""
+        if record['lon'] is not None and record['lat'] is not None:
+            return
+        if not self.geocode:
+            raise ValueError("нет координат (геокодирование отключено)")
+        address = record['address']
+        if address not in self.geocoded:
+            result = geocode_address(address)
+            self.geocoded[address] = (result[1].x, result[1].y) if result else None
+        if self.geocoded[address] is None:
+            raise ValueError(f"адрес не найден: «{address}»")
+        record['lon'], record['lat'] = self.geocoded[address]
+
+    def _staging(self, cursor) -> None:
+        columns = ', '.join(f"{name} {sql_type}" for name, sql_type in STAGING_COLUMNS)
+        cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ({columns})")
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+
+    def load(self, records: List[Dict]) -> Tuple[int, int]:
+        """COPY порции во временную таблицу и upsert в Issue. Возвращает (добавлено, обновлено)."""
+        # ON CONFLICT не обновляет строку дважды за запрос — из повторов в порции берём последнюю
+        unique, anonymous = {}, []
+        for record in records:
+            if record['external_id']:
+                unique[record['external_id']] = record
+            else:
+                anonymous.append(record)
+        records = [*unique.values(), *anonymous]
+        if not records:
+            return 0, 0
+
+        data = io.StringIO()
+        writer = csv.writer(data)
+        for record in records:
+            writer.writerow([
+                record[name].isoformat() if isinstance(record[name], datetime) else record[name]
+                for name, _sql_type in STAGING_COLUMNS
+            ])
+        data.seek(0)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._staging(cursor)
+            _copy(cursor, (
+                f"COPY {STAGING_TABLE} ({', '.join(name for name, _sql_type in STAGING_COLUMNS)}) "
+                f"FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({', '.join(NOT_NULL_COLUMNS)}))"
+            ), data)
+            # Прежние точка и даты обновляемых обращений: сбросить и старые тайлы,
+            # пересчитать и те дни сводки, откуда обращение ушло (как remember_previous_state)
+            previous = list(
+                Issue.objects.filter(external_id__in=list(unique))
+                .values_list('created_at', 'resolved_at')
+            ) if unique else []
+            params = {'resolved': Issue.STATUS_RESOLVED, 'reporter': self.reporter_id}
+            if unique:
+                cursor.execute(_fill_known_dates_sql(), params)
+            cursor.execute(_upsert_sql(), params)
+            rows = cursor.fetchall()
+
+        inserted = sum(1 for row in rows if row[0])
+        self._invalidate([dates for _flag, *dates in rows], previous)
+        return inserted, len(rows) - inserted
+
+    def _invalidate(self, current: List[Tuple], previous: List[Tuple]) -> None:
+        # Точечный сброс — до 21 ключа на обращение; порции дешевле сменить поколение тайлов
+        invalidate_all_tiles()
+        invalidate_issue_stats()
+        bump_dataset_version()
+        moments = [moment for dates in (*current, *previous) for moment in dates]
+        for moment in moments:
+            if moment is not None:
+                day = timezone.localdate(moment)
+                self.first_day = min(self.first_day or day, day)
+                self.last_day = max(self.last_day or day, day)
+
+    def finish(self) -> None:
+        """Отмечает дни загруженных обращений для пересчёта сводки аналитики."""
+        if self.first_day is not None:
+            days = mark_range_dirty(self.first_day, self.last_day)
+            schedule_refresh()
+            logger.info(f"Сводка аналитики: к пересчёту {days} дней ({self.first_day} — {self.last_day})")
@@ -0,0 +1,100 @@
+import logging
+import math
+from typing import Dict, List, Optional
+
+from django.contrib.gis.db.models import Collect
+from django.contrib.gis.db.models.functions import Centroid, SnapToGrid
+from django.contrib.gis.geos import Polygon
+from django.db.models import Count, Q
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+# Начиная с этого зума карта получает отдельные точки, а не кластеры
+CLUSTER_MAX_ZOOM = 14
+MIN_ZOOM = 0
+MAX_ZOOM = 22
+# Сколько ячеек сетки приходится на один тайл 256px (≈ 64px на кластер)
+CLUSTER_CELLS_PER_TILE = 4
+
+
+def parse_bbox(value: Optional[str]) -> Optional[Polygon]:
+    """
+    Разбирает строку 'west,south,east,north' в полигон (SRID 4326).
+    Возвращает None, если параметр не передан; ValueError — если он некорректен.
+    """
+    if not value:
+        return None
+
+    parts = value.split(',')
+    if len(parts) != 4:
+        raise ValueError("bbox должен иметь вид west,south,east,north")
+
+    west, south, east, north = (float(p) for p in parts)
+    if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= 90 and -90 <= north <= 90):
+        raise ValueError("bbox вне допустимого диапазона")
+    if west >= east or south >= north:
+        raise ValueError("bbox пустой или перевёрнут")
+
+    polygon = Polygon.from_bbox((west, south, east, north))
+    polygon.srid = 4326
+    return polygon
+
+
+def parse_zoom(value: Optional[str]) -> Optional[int]:
+    """Разбирает уровень зума карты. None — зум не передан; ValueError — некорректен."""
+    if value in (None, ''):
+        return None
+    number = float(value)
+    # int() от inf — OverflowError, от nan — ValueError
+    if not math.isfinite(number):
+        raise ValueError("zoom должен быть конечным числом")
+    zoom = int(number)
+    return max(MIN_ZOOM, min(zoom, MAX_ZOOM))
+
+
+def should_cluster(zoom: Optional[int]) -> bool:
+    return zoom is not None and zoom < CLUSTER_MAX_ZOOM
+
+
+def grid_size(zoom: int) -> float:
+    """Размер ячейки сетки кластеризации в градусах для данного зума."""
+    return 360.0 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+
+
+def cluster_issues(issues, zoom: int, statuses) -> List[Dict]:
+    """
+    Группирует обращения по ячейкам сетки (ST_SnapToGrid) одним GROUP BY-запросом.
+    Для каждой ячейки возвращает количество, центроид и разбивку по статусам.
+    """
+    size = grid_size(zoom)
+    status_counts = {
+        f'status_{key}': Count('id', filter=Q(status=key))
+        for key, _label in statuses
+    }
+
+    rows = (
+        issues.order_by()
+        .annotate(cell=SnapToGrid('location', size))
+        .values('cell')
+        .annotate(
+            count=Count('id'),
+            center=Centroid(Collect('location')),
+            **status_counts
+        )
+    )
+
+    clusters = []
+    for row in rows:
+        center = row['center']
+        if center is None:
+            continue
+        clusters.append({
+            'lon': center.x,
+            'lat': center.y,
+            'count': row['count'],
+            'statuses': {key: row[f'status_{key}'] for key, _label in statuses},
+        })
+
+    logger.debug(f"Кластеризация: зум {zoom}, {len(clusters)} кластеров")
+    return clusters
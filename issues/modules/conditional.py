@@ -0,0 +1,124 @@
+"""
+Условные GET для данных карты (ETag → 304 Not Modified).
+
+Сигналы Issue, Vote и IssuePhoto сдвигают «версию набора данных» при каждой
+записи — сразу и повторно после коммита, как и сброс кэша статистики.
+Валидатор ответа строится из версии и параметров запроса, поэтому повторный
+запрос с If-None-Match проверяется одним чтением из кэша, без обращения
+к таблице обращений и без выполнения view.
+
+Версия — время последнего изменения в миллисекундах; хранится в общем кэше.
+После очистки кэша версия начинается с текущего времени и поэтому не повторяет
+уже выданные ETag. Last-Modified не отдаётся: он с точностью до секунды, и
+запись в ту же секунду, что и ответ, его бы не изменила.
+
+Без общего кэша (LocMemCache, CACHE_URL не задан) версия у каждого процесса
+своя и записи в других воркерах не видит — тогда она хранится лишь
+LOCAL_VERSION_TTL секунд, и устаревший ответ отдаётся не дольше этого срока.
+"""
+import hashlib
+import json
+import time
+from functools import wraps
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.translation import get_language
+from django.views.decorators.http import condition
+
+from Map_of_local_issues.cache import Namespace
+
+# === КОНСТАНТЫ ===
+DATASET_CACHE = Namespace("issues.dataset", None)
+VERSION_KEY = DATASET_CACHE.key("version")
+LOCAL_VERSION_TTL = 5
+# Бэкенды кэша в памяти процесса: версия в них не общая для воркеров
+LOCAL_CACHE_BACKENDS = ('LocMemCache', 'DummyCache')
+
+
+# === ВЕРСИЯ НАБОРА ДАННЫХ ===
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _version_timeout() -> Optional[int]:
+    backend = settings.CACHES[DATASET_CACHE.alias]['BACKEND']
+    return LOCAL_VERSION_TTL if backend.endswith(LOCAL_CACHE_BACKENDS) else None
+
+
+def get_dataset_version() -> int:
+    version = DATASET_CACHE.get(VERSION_KEY)
+    if version is None:
+        version = _now_ms()
+        if not DATASET_CACHE.add(VERSION_KEY, version, _version_timeout()):
+            version = DATASET_CACHE.get(VERSION_KEY, version)
+    return version
+
+
+def _bump() -> None:
+    current = DATASET_CACHE.get(VERSION_KEY, 0)
+    # Не меньше прежней + 1: две записи в одну миллисекунду дают разные версии
+    DATASET_CACHE.set(VERSION_KEY, max(_now_ms(), current + 1), _version_timeout())
+
+
+def bump_dataset_version() -> None:
+    _bump()
+    # И повторно после коммита: параллельный запрос мог прочитать новую версию
+    # вместе с ещё не зафиксированными данными
+    transaction.on_commit(_bump)
+
+
+# === ВАЛИДАТОРЫ ===
+def _request_version(request) -> int:
+    # Версию читаем один раз за запрос
+    if not hasattr(request, '_dataset_version'):
+        request._dataset_version = get_dataset_version()
+    return request._dataset_version
+
+
+def response_etag(version: int, request, personal: bool) -> str:
+    parts = [
+        version,
+        request.path,
+        sorted(request.GET.lists()),
+        get_language(),
+        # Ответ с голосами пользователя и CSRF-токеном в формах
+        [request.user.pk, request.META.get('CSRF_COOKIE')] if personal else None,
+    ]
+    raw = json.dumps(parts, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def conditional_on_dataset(personal: bool = False, xhr_only: bool = False):
+    """
+    Условный GET по версии набора данных. personal — ответ зависит от пользователя;
+    xhr_only — только для XHR-ответов (частичные шаблоны), полная страница
+    отдаётся как обычно.
+    """
+    def applies(request) -> bool:
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        return not xhr_only or request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+    def etag(request, *args, **kwargs):
+        if applies(request):
+            return response_etag(_request_version(request), request, personal)
+        return None
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if xhr_only:
+                # Частичный шаблон и полная страница живут по одному URL
+                patch_vary_headers(response, ['X-Requested-With'])
+            if applies(request):
+                # Браузер хранит ответ, но каждый раз сверяет его с сервером
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,120 @@
+"""
+Выгрузка обращений для открытых данных: GeoJSON Text Sequences (RFC 8142),
+NDJSON и CSV.
+
+Строки читаются через values().iterator() — в PostgreSQL это серверный курсор,
+порциями по EXPORT_CHUNK_SIZE, — и сразу сериализуются по одной, поэтому память
+не зависит от размера таблицы. Один генератор используется и для
+StreamingHttpResponse (issues:export_issues), и для команды export_issues.
+Координаты извлекаются в SQL (ST_X/ST_Y), без создания объектов GEOS.
+Автор обращения и описание не выгружаются.
+"""
+import csv
+import json
+from datetime import datetime
+from typing import Dict, Iterator
+
+from django.db.models import F, FloatField, Func
+
+from issues.constants import ISSUE_CATEGORY_CHOICES
+from issues.models import Issue
+
+# === КОНСТАНТЫ ===
+EXPORT_CHUNK_SIZE = 2000
+# Строки склеиваются в блоки: запись в сокет на каждую строку дорога
+STREAM_BLOCK_SIZE = 64 * 1024
+FORMAT_GEOJSONSEQ = 'geojsonseq'
+FORMAT_NDJSON = 'ndjson'
+FORMAT_CSV = 'csv'
+# формат → (Content-Type, расширение файла)
+FORMATS = {
+    FORMAT_GEOJSONSEQ: ('application/geo+json-seq', 'geojsons'),
+    FORMAT_NDJSON: ('application/x-ndjson', 'ndjson'),
+    FORMAT_CSV: ('text/csv; charset=utf-8', 'csv'),
+}
+DB_FIELDS = (
+    'id', 'title', 'status', 'category', 'rating', 'upvotes', 'downvotes', 'address',
+    'lon', 'lat', 'created_at', 'updated_at', 'resolved_at',
+)
+COLUMNS = (
+    'id', 'title', 'status', 'status_display', 'category', 'category_display',
+    'rating', 'upvotes', 'downvotes', 'address', 'lon', 'lat',
+    'created_at', 'updated_at', 'resolved_at',
+)
+RECORD_SEPARATOR = '\x1e'
+
+
+def export_rows(issues) -> Iterator[Dict]:
+    """Строки выгрузки по возрастанию id: словари с ключами COLUMNS."""
+    status_labels = {key: str(label) for key, label in Issue.STATUS_CHOICES}
+    category_labels = {key: str(label) for key, label in ISSUE_CATEGORY_CHOICES}
+
+    rows = issues.annotate(
+        lon=Func(F('location'), function='ST_X', output_field=FloatField()),
+        lat=Func(F('location'), function='ST_Y', output_field=FloatField()),
+    ).order_by('pk').values(*DB_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    for row in rows:
+        row['status_display'] = status_labels.get(row['status'], row['status'])
+        row['category_display'] = category_labels.get(row['category'], row['category'])
+        for field in ('created_at', 'updated_at', 'resolved_at'):
+            if isinstance(row[field], datetime):
+                row[field] = row[field].isoformat()
+        yield {column: row[column] for column in COLUMNS}
+
+
+def _geojsonseq(rows: Iterator[Dict]) -> Iterator[str]:
+    for row in rows:
+        feature = {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [row.pop('lon'), row.pop('lat')]},
+            'properties': row,
+        }
+        yield RECORD_SEPARATOR + json.dumps(feature, ensure_ascii=False) + '\n'
+
+
+def _ndjson(rows: Iterator[Dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """«Файл» для csv.writer: write() возвращает строку, а не пишет её."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _csv(rows: Iterator[Dict]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([row[column] for column in COLUMNS])
+
+
+SERIALIZERS = {
+    FORMAT_GEOJSONSEQ: _geojsonseq,
+    FORMAT_NDJSON: _ndjson,
+    FORMAT_CSV: _csv,
+}
+
+
+def _blocks(lines: Iterator[str]) -> Iterator[str]:
+    block, size = [], 0
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= STREAM_BLOCK_SIZE:
+            yield ''.join(block)
+            block, size = [], 0
+    if block:
+        yield ''.join(block)
+
+
+def stream_export(issues, fmt: str) -> Iterator[str]:
+    """Выгрузка выборки issues в формате fmt (ключ FORMATS) блоками по ~STREAM_BLOCK_SIZE."""
+    return _blocks(SERIALIZERS[fmt](export_rows(issues)))
+
+
+def export_filename(fmt: str, now: datetime) -> str:
+    return f"issues-{now:%Y%m%d}.{FORMATS[fmt][1]}"
@@ -0,0 +1,193 @@
+"""
+Локальный справочник адресов ХМАО (модель GazetteerAddress).
+
+Автодополнение адресов отвечает из него: префиксный поиск по B-tree индексу
+(varchar_pattern_ops), при промахе — триграммы (GIN). Nominatim нужен только
+если в справочнике ничего не нашлось. Данные загружает команда import_gazetteer
+из выгрузки OSM (Overpass JSON или GeoJSON).
+"""
+import json
+import logging
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.contrib.gis.geos import GEOSException, GEOSGeometry, Point
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models.functions import Length
+
+from .geocode_store import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+MIN_QUERY_LENGTH = 3
+MIN_TRIGRAM_SIMILARITY = 0.35
+# Сокращения и типы улиц не участвуют в сравнении: «ул. Ленина, 5» == «Ленина 5»
+ADDRESS_NOISE = re.compile(
+    r"\b(улица|ул|проспект|пр-кт|пр-т|просп|пр|переулок|пер|проезд|бульвар|б-р|"
+    r"шоссе|микрорайон|мкр|дом|д|город|г)\b\.?"
+)
+# Отрезки одной улицы из OSM склеиваются в пределах этой сетки (градусы)
+STREET_DEDUP_GRID = 0.05
+
+
+def normalize_address(text: str) -> str:
+    text = normalize_query(text)
+    text = re.sub(r"[,;]", " ", text)
+    text = ADDRESS_NOISE.sub(" ", text)
+    return re.sub(r"\s+", " ", text).strip(" .")
+
+
+def _display_name(entry) -> str:
+    return ", ".join(p for p in (entry.street, entry.housenumber, entry.city) if p)
+
+
+def _as_result(entry) -> Dict:
+    """Тот же формат, что у geocoding._parse_nominatim_result."""
+    address = {"road": entry.street}
+    if entry.housenumber:
+        address["house_number"] = entry.housenumber
+    if entry.city:
+        address["city"] = entry.city
+    return {
+        "display_name": _display_name(entry),
+        "lat": entry.location.y,
+        "lon": entry.location.x,
+        "address": address,
+        "osm_id": entry.osm_id,
+        "osm_type": entry.osm_type,
+    }
+
+
+def _prefix_queryset(name: str):
+    from issues.models import GazetteerAddress
+    return (
+        GazetteerAddress.objects.filter(search_name__startswith=name)
+        .order_by(Length('search_name'), 'search_name', 'id')
+    )
+
+
+def _trigram_queryset(name: str):
+    from issues.models import GazetteerAddress
+    return (
+        GazetteerAddress.objects.filter(search_name__trigram_similar=name)
+        .annotate(similarity=TrigramSimilarity('search_name', name))
+        .filter(similarity__gte=MIN_TRIGRAM_SIMILARITY)
+        .order_by('-similarity', 'id')
+    )
+
+
+def search(query: str, limit: int = 5) -> Optional[List[Dict]]:
+    """Адреса из справочника или None, если ничего не нашлось (нужен Nominatim)."""
+    name = normalize_address(query)
+    if len(name) < MIN_QUERY_LENGTH:
+        return None
+
+    entries = list(_prefix_queryset(name)[:limit])
+    if not entries:
+        entries = list(_trigram_queryset(name)[:limit])
+    return [_as_result(e) for e in entries] or None
+
+
+async def asearch(query: str, limit: int = 5) -> Optional[List[Dict]]:
+    name = normalize_address(query)
+    if len(name) < MIN_QUERY_LENGTH:
+        return None
+
+    entries = [e async for e in _prefix_queryset(name)[:limit]]
+    if not entries:
+        entries = [e async for e in _trigram_queryset(name)[:limit]]
+    return [_as_result(e) for e in entries] or None
+
+
+# === ИМПОРТ ВЫГРУЗКИ OSM ===
+
+def overpass_query(viewbox: str) -> str:
+    """Запрос Overpass: здания с адресом и именованные улицы внутри viewbox."""
+    west, south, east, north = viewbox.split(",")
+    bbox = f"{south},{west},{north},{east}"
+    return (
+        "[out:json][timeout:900];("
+        f'nwr["addr:street"]["addr:housenumber"]({bbox});'
+        f'way["highway"]["name"]({bbox});'
+        ");out center tags;"
+    )
+
+
+def _osm_ref(kind: Optional[str], osm_id) -> Optional[tuple]:
+    """('node'|'way'|'relation', id) из разных форм ссылок: 'way/1', 'w1', ('way', 1)."""
+    if osm_id is None:
+        return None
+    if kind is None:
+        ref = str(osm_id)
+        if "/" in ref:
+            kind, osm_id = ref.split("/", 1)
+        else:
+            kind, osm_id = {"n": "node", "w": "way", "r": "relation"}.get(ref[:1]), ref[1:]
+    try:
+        return (kind, int(osm_id)) if kind else None
+    except ValueError:
+        return None
+
+
+def _overpass_items(data: Dict) -> Iterator[tuple]:
+    for element in data.get("elements", []):
+        coords = element if "lat" in element else element.get("center")
+        if not coords:
+            continue
+        yield (
+            _osm_ref(element.get("type"), element.get("id")),
+            element.get("tags", {}),
+            Point(coords["lon"], coords["lat"], srid=4326),
+        )
+
+
+def _geojson_items(data: Dict) -> Iterator[tuple]:
+    for feature in data.get("features", []):
+        properties = feature.get("properties") or {}
+        tags = properties.get("tags", properties)
+        try:
+            point = GEOSGeometry(json.dumps(feature["geometry"]), srid=4326).centroid
+        except (KeyError, TypeError, ValueError, GEOSException):
+            continue
+        ref = properties.get("@id") or feature.get("id")
+        yield _osm_ref(None, ref), tags, point
+
+
+def parse_extract(data: Dict) -> Iterator[tuple]:
+    """(osm-ссылка, теги, точка) из Overpass JSON или GeoJSON FeatureCollection."""
+    if "elements" in data:
+        return _overpass_items(data)
+    return _geojson_items(data)
+
+
+def build_entries(items: Iterable[tuple], viewbox: str) -> Iterator:
+    """Записи GazetteerAddress: дома с адресом и улицы (по одной на улицу в округе)."""
+    from issues.models import GazetteerAddress
+
+    west, south, east, north = (float(v) for v in viewbox.split(","))
+    seen_streets = set()
+    for ref, tags, point in items:
+        if ref is None or not (west <= point.x <= east and south <= point.y <= north):
+            continue
+
+        if tags.get("addr:street") and tags.get("addr:housenumber"):
+            street, housenumber = tags["addr:street"], tags["addr:housenumber"]
+        elif tags.get("highway") and tags.get("name"):
+            street, housenumber = tags["name"], ""
+            cell = (normalize_address(street), round(point.x / STREET_DEDUP_GRID), round(point.y / STREET_DEDUP_GRID))
+            if cell in seen_streets:
+                continue
+            seen_streets.add(cell)
+        else:
+            continue
+
+        yield GazetteerAddress(
+            street=street[:255],
+            housenumber=housenumber[:50],
+            city=tags.get("addr:city", "")[:100],
+            search_name=normalize_address(f"{street} {housenumber}")[:400],
+            location=point,
+            osm_type=ref[0],
+            osm_id=ref[1],
+        )
@@ -0,0 +1,256 @@
+"""
+Постоянный кэш геокодирования в PostGIS (модель GeocodeCacheEntry).
+
+Второй уровень после Django cache: переживает перезапуски и общий для всех
+воркеров. Прямой поиск хранится по нормализованной строке запроса, обратный —
+по координатам, округлённым до сетки; обратный запрос отвечается ближайшей
+записью в радиусе REVERSE_TOLERANCE_M (GiST-индекс по geography).
+"""
+import logging
+import random
+import re
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+SEARCH_TTL = timedelta(days=30)
+REVERSE_TTL = timedelta(days=90)
+# Шаг сетки обратного геокодирования: 4 знака ≈ 11 м по широте
+REVERSE_SNAP_DIGITS = 4
+REVERSE_TOLERANCE_M = 25
+# last_used_at обновляется не чаще, чем раз в этот интервал (без записи на каждое попадание)
+TOUCH_INTERVAL = timedelta(hours=1)
+DEFAULT_MAX_ENTRIES = 50000
+# Доля записей, после которых запускается вытеснение (дешёвая замена планировщику)
+EVICTION_PROBABILITY = 0.01
+
+
+def _max_entries() -> int:
+    return int(getattr(settings, "GEOCODE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+
+
+def normalize_query(query: str) -> str:
+    """Ключ прямого поиска: регистр, пробелы и пунктуация по краям не важны."""
+    query = re.sub(r"\s+", " ", query.strip().lower()).strip(" ,.;")
+    return query.replace("ё", "е")
+
+
+def search_key(query: str, limit: int) -> str:
+    return f"{normalize_query(query)}|{limit}"
+
+
+def snap(lat: float, lon: float):
+    return round(lat, REVERSE_SNAP_DIGITS), round(lon, REVERSE_SNAP_DIGITS)
+
+
+def reverse_key(lat: float, lon: float) -> str:
+    lat, lon = snap(lat, lon)
+    return f"{lat:.{REVERSE_SNAP_DIGITS}f},{lon:.{REVERSE_SNAP_DIGITS}f}"
+
+
+def _entries():
+    from issues.models import GeocodeCacheEntry
+    return GeocodeCacheEntry.objects
+
+
+def _fresh(kind: str):
+    return _entries().filter(kind=kind, expires_at__gt=timezone.now())
+
+
+def _nearest_reverse(lat: float, lon: float):
+    point = Point(lon, lat, srid=4326)
+    from issues.models import GeocodeCacheEntry
+    return (
+        _fresh(GeocodeCacheEntry.KIND_REVERSE)
+        .filter(location__dwithin=(point, D(m=REVERSE_TOLERANCE_M)))
+        .annotate(distance=Distance('location', point))
+        .order_by('distance')
+    )
+
+
+def _touch_filter(entry):
+    """Отметка об использовании для LRU; пропускается, если запись трогали недавно."""
+    now = timezone.now()
+    if entry.last_used_at > now - TOUCH_INTERVAL:
+        return None
+    return _entries().filter(pk=entry.pk), {'hits': F('hits') + 1, 'last_used_at': now}
+
+
+def _search_defaults(results: List[Dict]) -> Dict:
+    from issues.models import GeocodeCacheEntry
+    now = timezone.now()
+    return {
+        'kind': GeocodeCacheEntry.KIND_SEARCH,
+        'payload': results,
+        'last_used_at': now,
+        'expires_at': now + SEARCH_TTL,
+    }
+
+
+def _reverse_defaults(lat: float, lon: float, display_name: str) -> Dict:
+    from issues.models import GeocodeCacheEntry
+    now = timezone.now()
+    snapped_lat, snapped_lon = snap(lat, lon)
+    return {
+        'kind': GeocodeCacheEntry.KIND_REVERSE,
+        'location': Point(snapped_lon, snapped_lat, srid=4326),
+        'payload': {'display_name': display_name},
+        'last_used_at': now,
+        'expires_at': now + REVERSE_TTL,
+    }
+
+
+# === СИНХРОННЫЙ ДОСТУП ===
+
+def _touch(entry) -> None:
+    touch = _touch_filter(entry)
+    if touch is not None:
+        queryset, values = touch
+        queryset.update(**values)
+
+
+def _maybe_evict() -> None:
+    if random.random() < EVICTION_PROBABILITY:
+        evict()
+
+
+def get_search(query: str, limit: int) -> Optional[List[Dict]]:
+    from issues.models import GeocodeCacheEntry
+    try:
+        entry = _fresh(GeocodeCacheEntry.KIND_SEARCH).filter(key=search_key(query, limit)).first()
+        if entry is None:
+            return None
+        _touch(entry)
+        return entry.payload
+    except DatabaseError as e:
+        logger.warning(f"Кэш геокодирования недоступен: {e}")
+        return None
+
+
+def store_search(query: str, limit: int, results: List[Dict]) -> None:
+    try:
+        defaults = _search_defaults(results)
+        _entries().update_or_create(kind=defaults.pop('kind'), key=search_key(query, limit), defaults=defaults)
+        _maybe_evict()
+    except DatabaseError as e:
+        logger.warning(f"Не удалось сохранить результат поиска в кэш: {e}")
+
+
+def get_reverse(lat: float, lon: float) -> Optional[str]:
+    try:
+        entry = _nearest_reverse(lat, lon).first()
+        if entry is None:
+            return None
+        _touch(entry)
+        return entry.payload.get('display_name')
+    except DatabaseError as e:
+        logger.warning(f"Кэш геокодирования недоступен: {e}")
+        return None
+
+
+def store_reverse(lat: float, lon: float, display_name: str) -> None:
+    try:
+        defaults = _reverse_defaults(lat, lon, display_name)
+        _entries().update_or_create(kind=defaults.pop('kind'), key=reverse_key(lat, lon), defaults=defaults)
+        _maybe_evict()
+    except DatabaseError as e:
+        logger.warning(f"Не удалось сохранить адрес в кэш: {e}")
+
+
+# === АСИНХРОННЫЙ ДОСТУП ===
+
+async def _atouch(entry) -> None:
+    touch = _touch_filter(entry)
+    if touch is not None:
+        queryset, values = touch
+        await queryset.aupdate(**values)
+
+
+async def _amaybe_evict() -> None:
+    if random.random() < EVICTION_PROBABILITY:
+        await aevict()
+
+
+async def aget_search(query: str, limit: int) -> Optional[List[Dict]]:
+    from issues.models import GeocodeCacheEntry
+    try:
+        entry = await _fresh(GeocodeCacheEntry.KIND_SEARCH).filter(key=search_key(query, limit)).afirst()
+        if entry is None:
+            return None
+        await _atouch(entry)
+        return entry.payload
+    except DatabaseError as e:
+        logger.warning(f"Кэш геокодирования недоступен: {e}")
+        return None
+
+
+async def astore_search(query: str, limit: int, results: List[Dict]) -> None:
+    try:
+        defaults = _search_defaults(results)
+        await _entries().aupdate_or_create(
+            kind=defaults.pop('kind'), key=search_key(query, limit), defaults=defaults
+        )
+        await _amaybe_evict()
+    except DatabaseError as e:
+        logger.warning(f"Не удалось сохранить результат поиска в кэш: {e}")
+
+
+async def aget_reverse(lat: float, lon: float) -> Optional[str]:
+    try:
+        entry = await _nearest_reverse(lat, lon).afirst()
+        if entry is None:
+            return None
+        await _atouch(entry)
+        return entry.payload.get('display_name')
+    except DatabaseError as e:
+        logger.warning(f"Кэш геокодирования недоступен: {e}")
+        return None
+
+
+async def astore_reverse(lat: float, lon: float, display_name: str) -> None:
+    try:
+        defaults = _reverse_defaults(lat, lon, display_name)
+        await _entries().aupdate_or_create(
+            kind=defaults.pop('kind'), key=reverse_key(lat, lon), defaults=defaults
+        )
+        await _amaybe_evict()
+    except DatabaseError as e:
+        logger.warning(f"Не удалось сохранить адрес в кэш: {e}")
+
+
+# === ВЫТЕСНЕНИЕ ===
+
+def evict(max_entries: Optional[int] = None) -> int:
+    """
+    Удаляет просроченные записи (TTL), затем самые давно использованные сверх
+    max_entries (LRU). Возвращает число удалённых записей.
+    """
+    max_entries = _max_entries() if max_entries is None else max_entries
+    deleted, _ = _entries().filter(expires_at__lte=timezone.now()).delete()
+
+    overflow = _entries().count() - max_entries
+    if overflow > 0:
+        stale_ids = list(
+            _entries().order_by('last_used_at', 'id').values_list('id', flat=True)[:overflow]
+        )
+        lru_deleted, _ = _entries().filter(id__in=stale_ids).delete()
+        deleted += lru_deleted
+
+    if deleted:
+        logger.info(f"Кэш геокодирования: вытеснено {deleted} записей")
+    return deleted
+
+
+async def aevict(max_entries: Optional[int] = None) -> int:
+    from asgiref.sync import sync_to_async
+    return await sync_to_async(evict)(max_entries)
@@ -1,9 +1,18 @@
+import asyncio
 import logging
 import requests
 import time
 from typing import List, Dict, Optional, Tuple
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.gis.geos import Point
-from django.core.cache import cache
+from Map_of_local_issues.cache import Namespace
+from Map_of_local_issues.instrumentation import geocoding_timer
+
+from . import gazetteer, geocode_store, throttling
+from .throttling import RateLimitTimeout, flight_key, single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +21,11 @@ NOMINATIM_BASE_URL = "https://nominatim.openstreetmap.org"
 REQUEST_TIMEOUT = 8.0  
 FAST_TIMEOUT = 5.0
 CACHE_TIMEOUT = 7200
+REVERSE_CACHE_TIMEOUT = 3600 * 24
+# Пул keep-alive соединений асинхронного клиента (на процесс / event loop)
+POOL_MAX_CONNECTIONS = 10
+POOL_MAX_KEEPALIVE = 5
+POOL_KEEPALIVE_EXPIRY = 30.0
 
 HEADERS = {
     # Обязательный User-Agent согласно политике Nominatim:
@@ -26,6 +40,78 @@ HMAO_VIEWBOX = "60.5,58.5,80.0,67.0"
 # Viewbox для Ханты-Мансийска
 KHANTY_VIEWBOX = "68.75,60.75,69.30,61.15"
 
+# Области общего кэша: стабильные ключи, свои TTL и счётчики попаданий
+NOMINATIM_CACHE = Namespace("geocode.nominatim", CACHE_TIMEOUT)
+SEARCH_CACHE = Namespace("geocode.search", CACHE_TIMEOUT)
+GEOCODE_CACHE = Namespace("geocode.address", CACHE_TIMEOUT * 3)
+REVERSE_CACHE = Namespace("geocode.reverse", REVERSE_CACHE_TIMEOUT)
+
+REVERSE_HEADERS = {
+    "User-Agent": "MapOfLocalIssues-for-HMMAO/1.0 (ss@yandex.ru)",  # СВОЙ email
+    "Accept-Language": "ru-RU,ru",
+    "Referer": "ss@yandex.ru",  # важно: пустой или свой домен
+}
+
+_session: Optional[requests.Session] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop = None
+
+
+def _base_url() -> str:
+    """Адрес Nominatim; в тестах подменяется на локальный фейковый сервер."""
+    return getattr(settings, "NOMINATIM_BASE_URL", NOMINATIM_BASE_URL).rstrip("/")
+
+
+def _get_session() -> requests.Session:
+    """Общая keep-alive сессия для синхронных запросов."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update(HEADERS)
+    return _session
+
+
+def _use_async_client() -> bool:
+    """
+    httpx.AsyncClient — только под ASGI, где event loop один на процесс. Под WSGI
+    async views выполняются через async_to_sync каждый раз в новом цикле: пул
+    соединений не переиспользовался бы, а клиенты закрытых циклов оставались бы
+    незакрытыми. Там запрос уходит через общую синхронную сессию в потоке.
+    """
+    return getattr(settings, "SERVER_INTERFACE", "wsgi") == "asgi"
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """
+    Асинхронный клиент с пулом keep-alive соединений. Клиент привязан к event loop:
+    при смене цикла прежний закрывается в своём цикле, если тот ещё работает.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is not None and _async_client_loop is not loop:
+        if not _async_client.is_closed and _async_client_loop.is_running():
+            asyncio.run_coroutine_threadsafe(_async_client.aclose(), _async_client_loop)
+        _async_client = None
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            headers=HEADERS,
+            limits=httpx.Limits(
+                max_connections=POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=POOL_MAX_KEEPALIVE,
+                keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client, _async_client_loop
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+
 
 def _assemble_address_from_parts(address: dict) -> str:
     """Собирает читаемый адрес из частей"""
@@ -108,39 +194,63 @@ def _parse_nominatim_result(item: dict) -> Dict:
         }
 
 
-def _request_nominatim(endpoint: str, params: dict, timeout: float = REQUEST_TIMEOUT) -> Optional[list]:
-    """Единая точка доступа к Nominatim"""
+def _nominatim_params(params: dict) -> dict:
     params.update({
         "format": "json",
         "addressdetails": 1,
         "accept-language": "ru",
         "polygon_geojson": 0,
     })
+    return params
+
+
+def _nominatim_cache_key(endpoint: str, params: dict) -> str:
+    return NOMINATIM_CACHE.key(endpoint, sorted(params.items()))
 
-    cache_key = f"nominatim_{endpoint}_{hash(tuple(sorted(params.items())))}"
-    cached = cache.get(cache_key)
+
+def _handle_nominatim_response(endpoint: str, status_code: int, data, duration: float) -> Optional[list]:
+    if status_code == 200:
+        logger.info(f"Nominatim {endpoint} ответил за {duration:.2f}с")
+        return data
+    logger.warning(f"Nominatim {endpoint} вернул {status_code}")
+    return None
+
+
+def _request_nominatim(endpoint: str, params: dict, timeout: float = REQUEST_TIMEOUT) -> Optional[list]:
+    """Единая точка доступа к Nominatim"""
+    params = _nominatim_params(params)
+
+    cache_key = _nominatim_cache_key(endpoint, params)
+    cached = NOMINATIM_CACHE.get(cache_key)
     if cached is not None:
         logger.debug("Кэш найден для Nominatim")
         return cached
 
-    try:
-        start = time.time()
-        resp = requests.get(
-            f"{NOMINATIM_BASE_URL}{endpoint}",
-            params=params,
-            headers=HEADERS,
-            timeout=timeout
-        )
-        duration = time.time() - start
+    # Одинаковые одновременные запросы объединяются в один поход в Nominatim
+    key = flight_key(endpoint, sorted(params.items()))
+    return single_flight.do(
+        key, lambda: _fetch_nominatim(endpoint, params, timeout, cache_key), cache_key, timeout
+    )
 
-        if resp.status_code == 200:
-            data = resp.json()
+
+def _fetch_nominatim(endpoint: str, params: dict, timeout: float, cache_key: str) -> Optional[list]:
+    try:
+        with geocoding_timer():
+            throttling.acquire(timeout)
+            start = time.time()
+            resp = _get_session().get(
+                f"{_base_url()}{endpoint}",
+                params=params,
+                timeout=timeout
+            )
+        data = resp.json() if resp.status_code == 200 else None
+        data = _handle_nominatim_response(endpoint, resp.status_code, data, time.time() - start)
+        if data is not None:
             # Кэшируем успешные результаты
-            cache.set(cache_key, data, CACHE_TIMEOUT)
-            logger.info(f"Nominatim {endpoint} ответил за {duration:.2f}с")
-            return data
-        else:
-            logger.warning(f"Nominatim {endpoint} вернул {resp.status_code}")
+            NOMINATIM_CACHE.set(cache_key, data)
+        return data
+    except RateLimitTimeout:
+        logger.warning(f"Nominatim {endpoint}: очередь лимитера не успела за {timeout}с")
     except requests.exceptions.Timeout:
         logger.warning(f"Nominatim {endpoint} превысил таймаут {timeout}с")
     except Exception as e:
@@ -149,47 +259,71 @@ def _request_nominatim(endpoint: str, params: dict, timeout: float = REQUEST_TIM
     return None
 
 
-# === ОСНОВНЫЕ ФУНКЦИИ ===
+async def _arequest_nominatim(endpoint: str, params: dict, timeout: float = REQUEST_TIMEOUT) -> Optional[list]:
+    """Асинхронный вариант _request_nominatim: не занимает поток на время ответа"""
+    params = _nominatim_params(params)
 
-def search_address(query: str, limit: int = 5) -> List[Dict]:
-    """Поиск адресов по строке"""
-    if len(query.strip()) < 3:
-        return []
-
-    cache_key = f"search_addr_{hash(query.lower())}_{limit}"
-    cached = cache.get(cache_key)
+    cache_key = _nominatim_cache_key(endpoint, params)
+    cached = await NOMINATIM_CACHE.aget(cache_key)
     if cached is not None:
+        logger.debug("Кэш найден для Nominatim")
         return cached
 
-    start_time = time.time()
+    key = flight_key(endpoint, sorted(params.items()))
+    return await single_flight.ado(
+        key, lambda: _afetch_nominatim(endpoint, params, timeout, cache_key), cache_key, timeout
+    )
+
+
+async def _afetch_nominatim(endpoint: str, params: dict, timeout: float, cache_key: str) -> Optional[list]:
+    if not _use_async_client():
+        return await sync_to_async(_fetch_nominatim, thread_sensitive=False)(endpoint, params, timeout, cache_key)
+    try:
+        with geocoding_timer():
+            await throttling.aacquire(timeout)
+            start = time.time()
+            resp = await _get_async_client().get(
+                f"{_base_url()}{endpoint}",
+                params=params,
+                timeout=timeout
+            )
+        data = resp.json() if resp.status_code == 200 else None
+        data = _handle_nominatim_response(endpoint, resp.status_code, data, time.time() - start)
+        if data is not None:
+            await NOMINATIM_CACHE.aset(cache_key, data)
+        return data
+    except RateLimitTimeout:
+        logger.warning(f"Nominatim {endpoint}: очередь лимитера не успела за {timeout}с")
+    except httpx.TimeoutException:
+        logger.warning(f"Nominatim {endpoint} превысил таймаут {timeout}с")
+    except Exception as e:
+        logger.error(f" Nominatim {endpoint} ошибка: {e}")
+
+    return None
+
+
+def _search_params(query: str, limit: int) -> Tuple[dict, dict]:
     params = {
         "q": query,
         "limit": min(limit, 5),
         "countrycodes": "ru",
     }
-
-    results = []
-
     # С bounded для ХМАО (приоритет)
     bounded_params = {**params, "viewbox": HMAO_VIEWBOX, "bounded": 1}
-    data = _request_nominatim("/search", bounded_params, timeout=FAST_TIMEOUT)
+    return bounded_params, params
+
+
+def _collect_results(results: List[Dict], data, limit: int) -> None:
     if data and isinstance(data, list):
         for item in data[:limit]:
             parsed = _parse_nominatim_result(item)
             if parsed["display_name"] and len(parsed["display_name"]) > 5:
-                results.append(parsed)
+                # Не дублируем уже найденные
+                if not any(r["display_name"] == parsed["display_name"] for r in results):
+                    results.append(parsed)
 
-    # Если мало результатов, пробуем без bounded
-    if len(results) < 2:
-        data = _request_nominatim("/search", params, timeout=REQUEST_TIMEOUT)
-        if data and isinstance(data, list):
-            for item in data[:limit]:
-                parsed = _parse_nominatim_result(item)
-                if parsed["display_name"] and len(parsed["display_name"]) > 5:
-                    # Не дублируем уже найденные
-                    if not any(r["display_name"] == parsed["display_name"] for r in results):
-                        results.append(parsed)
 
+def _finish_search(query: str, results: List[Dict], start_time: float) -> List[Dict]:
     # Фолбэк: хотя бы 1 результат
     if not results:
         logger.warning(f"⚠️ Не найдено адресов для '{query}', используем фолбэк")
@@ -204,16 +338,102 @@ def search_address(query: str, limit: int = 5) -> List[Dict]:
 
     duration = time.time() - start_time
     logger.info(f"'{query}': {len(results)} адресов за {duration:.2f}с")
+    return results
+
+
+def _search_cache_key(query: str, limit: int) -> str:
+    return SEARCH_CACHE.key(geocode_store.normalize_query(query), limit)
 
+
+# === ОСНОВНЫЕ ФУНКЦИИ ===
+
+def search_address(query: str, limit: int = 5) -> List[Dict]:
+    """Поиск адресов по строке"""
+    if len(query.strip()) < 3:
+        return []
+
+    cache_key = _search_cache_key(query, limit)
+    cached = SEARCH_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Локальный справочник адресов: миллисекунды вместо похода в Nominatim
+    local = gazetteer.search(query, limit)
+    if local is not None:
+        SEARCH_CACHE.set(cache_key, local)
+        return local
+
+    stored = geocode_store.get_search(query, limit)
+    if stored is not None:
+        SEARCH_CACHE.set(cache_key, stored)
+        return stored[:limit]
+
+    start_time = time.time()
+    bounded_params, params = _search_params(query, limit)
+
+    results = []
+    _collect_results(results, _request_nominatim("/search", bounded_params, timeout=FAST_TIMEOUT), limit)
+
+    # Если мало результатов, пробуем без bounded
+    if len(results) < 2:
+        _collect_results(results, _request_nominatim("/search", params, timeout=REQUEST_TIMEOUT), limit)
+
+    # Фолбэк в постоянный кэш не попадает — при следующем запросе пробуем Nominatim снова
+    if results:
+        geocode_store.store_search(query, limit, results)
+
+    results = _finish_search(query, results, start_time)
     # Сохраняем в кэш
-    cache.set(cache_key, results, CACHE_TIMEOUT)
+    SEARCH_CACHE.set(cache_key, results)
+    return results[:limit]
+
+
+async def asearch_address(query: str, limit: int = 5) -> List[Dict]:
+    """Асинхронный поиск адресов по строке"""
+    if len(query.strip()) < 3:
+        return []
+
+    cache_key = _search_cache_key(query, limit)
+    cached = await SEARCH_CACHE.aget(cache_key)
+    if cached is not None:
+        return cached
+
+    local = await gazetteer.asearch(query, limit)
+    if local is not None:
+        await SEARCH_CACHE.aset(cache_key, local)
+        return local
+
+    stored = await geocode_store.aget_search(query, limit)
+    if stored is not None:
+        await SEARCH_CACHE.aset(cache_key, stored)
+        return stored[:limit]
+
+    start_time = time.time()
+    bounded_params, params = _search_params(query, limit)
+
+    results = []
+    _collect_results(results, await _arequest_nominatim("/search", bounded_params, timeout=FAST_TIMEOUT), limit)
+
+    # Если мало результатов, пробуем без bounded
+    if len(results) < 2:
+        _collect_results(results, await _arequest_nominatim("/search", params, timeout=REQUEST_TIMEOUT), limit)
+
+    if results:
+        await geocode_store.astore_search(query, limit, results)
+
+    results = _finish_search(query, results, start_time)
+    await SEARCH_CACHE.aset(cache_key, results)
     return results[:limit]
 
 
+def _geocode_cache_key(address: str) -> str:
+    return GEOCODE_CACHE.key(geocode_store.normalize_query(address))
+
+
 def geocode_address(address: str) -> Optional[Tuple[str, Point]]:
     """Однозначное геокодирование адреса """
-    cache_key = f"geocode_simple_{hash(address)}"
-    cached = cache.get(cache_key)
+    cache_key = _geocode_cache_key(address)
+    cached = GEOCODE_CACHE.get(cache_key)
     if cached:
         display_name, (lon, lat) = cached
         return display_name, Point(lon, lat, srid=4326)
@@ -221,34 +441,36 @@ def geocode_address(address: str) -> Optional[Tuple[str, Point]]:
     results = search_address(address, limit=1)
     if results:
         r = results[0]
-        display_name = r["display_name"]
-        point = Point(r["lon"], r["lat"], srid=4326)
         # Кэшируем успешный результат дольше
-        cache.set(cache_key, (display_name, (r["lon"], r["lat"])), CACHE_TIMEOUT * 3)
-        return display_name, point
+        GEOCODE_CACHE.set(cache_key, (r["display_name"], (r["lon"], r["lat"])))
+        return r["display_name"], Point(r["lon"], r["lat"], srid=4326)
 
     return None
 
 
+async def ageocode_address(address: str) -> Optional[Tuple[str, Point]]:
+    """Асинхронное однозначное геокодирование адреса"""
+    cache_key = _geocode_cache_key(address)
+    cached = await GEOCODE_CACHE.aget(cache_key)
+    if cached:
+        display_name, (lon, lat) = cached
+        return display_name, Point(lon, lat, srid=4326)
 
+    results = await asearch_address(address, limit=1)
+    if results:
+        r = results[0]
+        await GEOCODE_CACHE.aset(cache_key, (r["display_name"], (r["lon"], r["lat"])))
+        return r["display_name"], Point(r["lon"], r["lat"], srid=4326)
 
+    return None
 
 
+def _reverse_cache_key(lat: float, lon: float) -> str:
+    return REVERSE_CACHE.key(geocode_store.reverse_key(lat, lon))
 
-def reverse_geocode(lat: float, lon: float) -> str:
-    """Обратный геокодинг через Nominatim с соблюдением ToS"""
-    cache_key = f"rev_geo_{int(lat * 10000)}_{int(lon * 10000)}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
 
-    headers = {
-        "User-Agent": "MapOfLocalIssues-for-HMMAO/1.0 (ss@yandex.ru)",  # СВОЙ email
-        "Accept-Language": "ru-RU,ru",
-        "Referer": "ss@yandex.ru",  # важно: пустой или свой домен
-    }
-
-    params = {
+def _reverse_params(lat: float, lon: float) -> dict:
+    return {
         "lat": lat,
         "lon": lon,
         "format": "json",
@@ -257,39 +479,24 @@ def reverse_geocode(lat: float, lon: float) -> str:
         "email": "ss@yandex.ru",
     }
 
-    try:
-        #  Добавляем задержку, чтобы избежать 403
-        time.sleep(0.5)
-
-        resp = requests.get(
-            "https://nominatim.openstreetmap.org/reverse",
-            params=params,
-            headers=headers,
-            timeout=8.0  # Увеличиваем таймаут — сервер медленный
-        )
 
-        if resp.status_code == 200:
-            data = resp.json()
-            display_name = data.get("display_name", "").split(", Россия")[0].strip()
+def _handle_reverse_response(status_code: int, data) -> Optional[str]:
+    if status_code == 200:
+        display_name = data.get("display_name", "").split(", Россия")[0].strip()
 
-            # Улучшаем адрес для ХМАО
-            if "ханты-мансийск" not in display_name.lower():
-                display_name = f"{display_name}, Ханты-Мансийск"
+        # Улучшаем адрес для ХМАО
+        if "ханты-мансийск" not in display_name.lower():
+            display_name = f"{display_name}, Ханты-Мансийск"
+        return display_name
 
-            cache.set(cache_key, display_name, 3600 * 24)
-            return display_name
-
-        elif resp.status_code == 403:
-            logger.error("Nominatim вернул 403: проверьте User-Agent и частоту запросов")
-        elif resp.status_code == 429:
-            logger.error("Слишком много запросов к Nominatim — ограничение 1/сек")
-
-    except requests.exceptions.Timeout:
-        logger.warning("Nominatim таймаут (8с) — сервер недоступен/медленный")
-    except Exception as e:
-        logger.error(f"Ошибка Nominatim: {e}")
+    elif status_code == 403:
+        logger.error("Nominatim вернул 403: проверьте User-Agent и частоту запросов")
+    elif status_code == 429:
+        logger.error("Слишком много запросов к Nominatim — ограничение 1/сек")
+    return None
 
 
+def _reverse_fallback(lat: float, lon: float) -> str:
     if 68.5 <= lon <= 69.5 and 60.5 <= lat <= 61.5:
         return "Ханты-Мансийск, ХМАО"
     elif 73.0 <= lon <= 74.0 and 61.0 <= lat <= 62.0:
@@ -297,4 +504,102 @@ def reverse_geocode(lat: float, lon: float) -> str:
     elif 76.0 <= lon <= 77.0 and 60.5 <= lat <= 61.5:
         return "Нижневартовск, ХМАО"
     else:
-        return f"шир. {lat:.5f}, долг. {lon:.5f}, ХМАО"
\ No newline at end of file
+        return f"шир. {lat:.5f}, долг. {lon:.5f}, ХМАО"
+
+
+def reverse_geocode(lat: float, lon: float) -> str:
+    """Обратный геокодинг через Nominatim с соблюдением ToS"""
+    cache_key = _reverse_cache_key(lat, lon)
+    cached = REVERSE_CACHE.get(cache_key)
+    if cached:
+        return cached
+
+    # Ближайший сохранённый адрес в радиусе допуска — без похода в Nominatim
+    stored = geocode_store.get_reverse(lat, lon)
+    if stored:
+        REVERSE_CACHE.set(cache_key, stored)
+        return stored
+
+    display_name = single_flight.do(
+        flight_key("/reverse", cache_key), lambda: _fetch_reverse(lat, lon, cache_key),
+        cache_key, REQUEST_TIMEOUT
+    )
+    return display_name or _reverse_fallback(lat, lon)
+
+
+def _fetch_reverse(lat: float, lon: float, cache_key: str) -> Optional[str]:
+    try:
+        with geocoding_timer():
+            # Общий лимитер 1 запрос/с вместо задержки в каждом запросе — иначе 403/429
+            throttling.acquire(REQUEST_TIMEOUT)
+
+            resp = _get_session().get(
+                f"{_base_url()}/reverse",
+                params=_reverse_params(lat, lon),
+                headers=REVERSE_HEADERS,
+                timeout=REQUEST_TIMEOUT  # Увеличиваем таймаут — сервер медленный
+            )
+        data = resp.json() if resp.status_code == 200 else None
+        display_name = _handle_reverse_response(resp.status_code, data)
+        if display_name:
+            REVERSE_CACHE.set(cache_key, display_name)
+            geocode_store.store_reverse(lat, lon, display_name)
+            return display_name
+
+    except RateLimitTimeout:
+        logger.warning("Nominatim /reverse: очередь лимитера переполнена")
+    except requests.exceptions.Timeout:
+        logger.warning("Nominatim таймаут (8с) — сервер недоступен/медленный")
+    except Exception as e:
+        logger.error(f"Ошибка Nominatim: {e}")
+
+    return None
+
+
+async def areverse_geocode(lat: float, lon: float) -> str:
+    """Асинхронный обратный геокодинг: ожидание ответа не блокирует воркер"""
+    cache_key = _reverse_cache_key(lat, lon)
+    cached = await REVERSE_CACHE.aget(cache_key)
+    if cached:
+        return cached
+
+    stored = await geocode_store.aget_reverse(lat, lon)
+    if stored:
+        await REVERSE_CACHE.aset(cache_key, stored)
+        return stored
+
+    display_name = await single_flight.ado(
+        flight_key("/reverse", cache_key), lambda: _afetch_reverse(lat, lon, cache_key),
+        cache_key, REQUEST_TIMEOUT
+    )
+    return display_name or _reverse_fallback(lat, lon)
+
+
+async def _afetch_reverse(lat: float, lon: float, cache_key: str) -> Optional[str]:
+    if not _use_async_client():
+        return await sync_to_async(_fetch_reverse, thread_sensitive=False)(lat, lon, cache_key)
+    try:
+        with geocoding_timer():
+            await throttling.aacquire(REQUEST_TIMEOUT)
+
+            resp = await _get_async_client().get(
+                f"{_base_url()}/reverse",
+                params=_reverse_params(lat, lon),
+                headers=REVERSE_HEADERS,
+                timeout=REQUEST_TIMEOUT
+            )
+        data = resp.json() if resp.status_code == 200 else None
+        display_name = _handle_reverse_response(resp.status_code, data)
+        if display_name:
+            await REVERSE_CACHE.aset(cache_key, display_name)
+            await geocode_store.astore_reverse(lat, lon, display_name)
+            return display_name
+
+    except RateLimitTimeout:
+        logger.warning("Nominatim /reverse: очередь лимитера переполнена")
+    except httpx.TimeoutException:
+        logger.warning("Nominatim таймаут (8с) — сервер недоступен/медленный")
+    except Exception as e:
+        logger.error(f"Ошибка Nominatim: {e}")
+
+    return None
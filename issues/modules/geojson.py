@@ -0,0 +1,168 @@
+"""
+GeoJSON точек обращений для map/geojson.
+
+Два способа сериализации (settings.MAP_GEOJSON_ENGINE):
+- 'database' (по умолчанию) — FeatureCollection целиком собирает PostgreSQL
+  (ST_AsGeoJSON, json_build_object, json_agg) и возвращает одной строкой;
+  подписи статусов и категорий, шаблон URL обращения и префикс медиа
+  передаются параметрами запроса как таблицы подстановки. Python не
+  разбирает и не сериализует точки, но ответ — один HttpResponse и целиком
+  лежит в памяти (это не потоковая отдача; поток — issues:export_issues);
+- 'python' — строки читаются через values()/iterator() и собираются в словари;
+  используется и для хранилищ файлов, URL которых нельзя построить в SQL.
+
+Имена файлов миниатюр в SQL-варианте не экранируются (storage.url() кодирует
+не-ASCII символы): браузер кодирует их сам, адрес тот же.
+"""
+import json
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.contrib.gis.db.models.functions import AsGeoJSON
+from django.urls import reverse
+
+from issues.constants import ISSUE_CATEGORY_CHOICES
+from issues.models import Issue, IssuePhoto
+
+# === КОНСТАНТЫ ===
+ENGINE_DATABASE = 'database'
+ENGINE_PYTHON = 'python'
+
+FEATURE_COLLECTION_SQL = """
+SELECT json_build_object(
+    'type', 'FeatureCollection',
+    'features', COALESCE(
+        json_agg(json_build_object(
+            'type', 'Feature',
+            'geometry', f.geometry::json,
+            'properties', json_build_object(
+                'id', f.id,
+                'title', f.title,
+                'status', f.status,
+                'status_display', COALESCE(%s::jsonb ->> f.status, f.status),
+                'category', f.category,
+                'category_display', COALESCE(%s::jsonb ->> f.category, f.category),
+                'vote_rating', f.vote_rating,
+                'photos_count', f.photos_count,
+                'thumbnail', %s || f.thumbnail,
+                'url', format(%s, f.id)
+            )
+        )) FILTER (WHERE f.geometry IS NOT NULL),
+        '[]'::json
+    ),
+    'deleted', %s::json,
+    'sync_token', %s::text,
+    'full', %s::boolean
+)::text
+FROM ({rows}) AS f
+"""
+
+
+def get_engine() -> str:
+    engine = getattr(settings, 'MAP_GEOJSON_ENGINE', ENGINE_DATABASE)
+    thumbnail_storage = IssuePhoto._meta.get_field('thumbnail').storage
+    if engine == ENGINE_DATABASE and (
+        connection.vendor != 'postgresql' or not isinstance(thumbnail_storage, FileSystemStorage)
+    ):
+        return ENGINE_PYTHON
+    return engine
+
+
+def _annotate(issues):
+    # Рейтинг берётся из денормализованного поля, число фото и миниатюра — подзапросами
+    return issues.annotate(
+        vote_rating=F('rating'),
+        photos_count=Coalesce(
+            Subquery(
+                IssuePhoto.objects.filter(issue=OuterRef('pk'))
+                .order_by().values('issue').annotate(total=Count('id')).values('total'),
+                output_field=IntegerField()
+            ),
+            0
+        ),
+        thumbnail=Subquery(
+            IssuePhoto.objects.filter(issue=OuterRef('pk')).exclude(thumbnail='')
+            .order_by('id').values('thumbnail')[:1]
+        ),
+    )
+
+
+def _labels() -> Dict[str, Dict[str, str]]:
+    return {
+        'status': {key: str(label) for key, label in Issue.STATUS_CHOICES},
+        'category': {key: str(label) for key, label in ISSUE_CATEGORY_CHOICES},
+    }
+
+
+def _detail_url_template() -> str:
+    return reverse('issues:issue_detail', args=[0]).replace('/0/', '/{}/')
+
+
+# === PYTHON ===
+def issue_features(issues) -> List[Dict]:
+    """Точки обращений выборки issues как GeoJSON Feature (один запрос, без экземпляров Issue)."""
+    rows = _annotate(issues).values(
+        'id', 'title', 'status', 'category', 'location', 'vote_rating', 'photos_count', 'thumbnail'
+    ).iterator(chunk_size=2000)
+
+    labels = _labels()
+    detail_url = _detail_url_template()
+    thumbnail_storage = IssuePhoto._meta.get_field('thumbnail').storage
+
+    features = []
+    for row in rows:
+        location = row['location']
+        if location:
+            feature = {
+                'type': 'Feature',
+                'geometry': {
+                    'type': 'Point',
+                    'coordinates': [location.x, location.y]
+                },
+                'properties': {
+                    'id': row['id'],
+                    'title': row['title'],
+                    'status': row['status'],
+                    'status_display': labels['status'].get(row['status'], row['status']),
+                    'category': row['category'],
+                    'category_display': labels['category'].get(row['category'], row['category']),
+                    'vote_rating': row['vote_rating'],
+                    'photos_count': row['photos_count'],
+                    'thumbnail': thumbnail_storage.url(row['thumbnail']) if row['thumbnail'] else None,
+                    'url': detail_url.format(row['id'])
+                }
+            }
+            features.append(feature)
+    return features
+
+
+# === POSTGRESQL ===
+def feature_collection_bytes(issues, deleted: List[int], sync_token: str, full: bool) -> bytes:
+    """FeatureCollection выборки issues с полями синхронизации, собранный PostgreSQL."""
+    rows = _annotate(issues).values(
+        'id', 'title', 'status', 'category', 'vote_rating', 'photos_count', 'thumbnail',
+        geometry=AsGeoJSON('location'),
+    ).order_by()
+    rows_sql, rows_params = rows.query.sql_with_params()
+
+    labels = _labels()
+    thumbnail_storage = IssuePhoto._meta.get_field('thumbnail').storage
+    params = [
+        json.dumps(labels['status'], ensure_ascii=False),
+        json.dumps(labels['category'], ensure_ascii=False),
+        thumbnail_storage.base_url,
+        # format() подставляет id на место %s
+        _detail_url_template().replace('%', '%%').replace('{}', '%s'),
+        json.dumps(deleted),
+        sync_token,
+        full,
+        *rows_params,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(FEATURE_COLLECTION_SQL.format(rows=rows_sql), params)
+        (payload,) = cursor.fetchone()
+    return payload.encode('utf-8')
@@ -0,0 +1,98 @@
+import logging
+from typing import List, Optional, Tuple
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+PAGE_SIZE = 20
+CURSOR_SALT = "issues.pagination.cursor"
+
+# Параметр sort → (поле модели, по убыванию, разбор значения из курсора).
+# Второй ключ сортировки — id в том же направлении, он делает курсор стабильным.
+SORT_KEYS = {
+    '-created_at': ('created_at', True, parse_datetime),
+    'created_at': ('created_at', False, parse_datetime),
+    '-vote_rating': ('rating', True, int),
+    'vote_rating': ('rating', False, int),
+    'title': ('title', False, str),
+    # Только при поиске: search_rank аннотирует issues.modules.search.search_issues
+    '-relevance': ('search_rank', True, float),
+}
+DEFAULT_SORT = '-created_at'
+RELEVANCE_SORT = '-relevance'
+
+
+def normalize_sort(sort: Optional[str], searching: bool = False) -> str:
+    if sort == RELEVANCE_SORT and not searching:
+        return DEFAULT_SORT
+    return sort if sort in SORT_KEYS else DEFAULT_SORT
+
+
+def order_by_keys(sort: str) -> Tuple[str, str]:
+    field, descending, _parse = SORT_KEYS[sort]
+    prefix = '-' if descending else ''
+    return f'{prefix}{field}', f'{prefix}id'
+
+
+def encode_cursor(issue, sort: str) -> str:
+    """Подписанный курсор: значение ключа сортировки и id последнего обращения на странице."""
+    field, _descending, _parse = SORT_KEYS[sort]
+    value = getattr(issue, field)
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return signing.dumps([sort, value, issue.pk], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor: Optional[str], sort: str) -> Optional[Tuple[object, int]]:
+    """Возвращает (значение, id) или None, если курсор пуст, подделан или от другой сортировки."""
+    if not cursor:
+        return None
+    try:
+        cursor_sort, value, pk = signing.loads(cursor, salt=CURSOR_SALT)
+    except (signing.BadSignature, ValueError, TypeError):
+        logger.info("Некорректный курсор пагинации")
+        return None
+    if cursor_sort != sort:
+        return None
+
+    _field, _descending, parse = SORT_KEYS[sort]
+    try:
+        value = parse(value)
+    except (ValueError, TypeError):
+        return None
+    if value is None:
+        return None
+    return value, int(pk)
+
+
+def paginate_keyset(queryset, sort: str, cursor: Optional[str] = None,
+                    page_size: Optional[int] = None) -> Tuple[List, Optional[str]]:
+    """
+    Keyset-пагинация: WHERE (поле, id) после курсора ORDER BY поле, id LIMIT n+1.
+    В отличие от OFFSET, стоимость страницы не зависит от её номера.
+    Возвращает (обращения страницы, курсор следующей страницы или None).
+    """
+    page_size = page_size or PAGE_SIZE
+    sort = sort if sort in SORT_KEYS else DEFAULT_SORT
+    field, descending, _parse = SORT_KEYS[sort]
+    queryset = queryset.order_by(*order_by_keys(sort))
+
+    position = decode_cursor(cursor, sort)
+    if position is not None:
+        value, pk = position
+        lookup = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{lookup}': value}) |
+            Q(**{field: value, f'pk__{lookup}': pk})
+        )
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1], sort)
+    return items, next_cursor
@@ -0,0 +1,117 @@
+"""
+Обработка фотографий обращений: уменьшенные копии и удаление метаданных.
+
+Из загруженного оригинала строятся миниатюра фиксированного размера (списки,
+попапы карты) и средняя копия (страница обращения). Копии сохраняются в WebP,
+если Pillow собран с его поддержкой, иначе в JPEG. EXIF (в том числе GPS
+и модель телефона) из оригинала удаляется, ориентация применяется к пикселям.
+"""
+import io
+import logging
+import os
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+THUMBNAIL_SIZE = (320, 240)
+MEDIUM_SIZE = (1280, 1280)
+VARIANT_QUALITY = {'WEBP': 80, 'JPEG': 85}
+ORIGINAL_JPEG_QUALITY = 90
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+
+def variant_format() -> str:
+    """Формат копий: settings.PHOTO_VARIANT_FORMAT (по умолчанию WebP), JPEG — если WebP недоступен."""
+    fmt = getattr(settings, 'PHOTO_VARIANT_FORMAT', 'WEBP').upper()
+    if fmt == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return fmt if fmt in VARIANT_QUALITY else 'JPEG'
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """JPEG не поддерживает прозрачность — подкладываем белый фон."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert('RGB') if image.mode != 'RGB' else image
+
+
+def _encode(image: Image.Image, fmt: str, quality: Optional[int] = None) -> bytes:
+    """Кодирует изображение; метаданные не передаются, поэтому в файл не попадают."""
+    if fmt == 'JPEG':
+        image = _flatten(image)
+    elif fmt == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    buffer = io.BytesIO()
+    options = {'optimize': True}
+    if quality is not None:
+        options['quality'] = quality
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def make_variant(image: Image.Image, size: Tuple[int, int], crop: bool) -> Image.Image:
+    if crop:
+        # Миниатюры в сетке одинакового размера — обрезаем по центру
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    return variant
+
+
+def _replace_file(field, name: str, content: bytes) -> None:
+    old_name = field.name
+    field.save(name, ContentFile(content), save=False)
+    if old_name and old_name != field.name:
+        field.storage.delete(old_name)
+
+
+def _strip_original(photo, source: Image.Image, image: Image.Image) -> None:
+    """Пересохраняет оригинал без EXIF, если метаданные в нём есть."""
+    if 'exif' not in source.info and not source.getexif():
+        return
+    fmt = source.format if source.format in ('JPEG', 'PNG') else 'JPEG'
+    quality = ORIGINAL_JPEG_QUALITY if fmt == 'JPEG' else None
+    stem = os.path.splitext(os.path.basename(photo.image.name))[0]
+    _replace_file(photo.image, f"{stem}.{EXTENSIONS[fmt]}", _encode(image, fmt, quality))
+
+
+def process_photo(photo) -> bool:
+    """
+    Строит миниатюру и среднюю копию IssuePhoto, удаляет EXIF из оригинала
+    и записывает размеры. Возвращает False, если файл не удалось прочитать.
+    """
+    try:
+        with photo.image.open('rb') as f:
+            source = Image.open(f)
+            source.load()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning(f"Не удалось открыть фото {photo.pk}: {e}")
+        return False
+
+    image = ImageOps.exif_transpose(source)
+    _strip_original(photo, source, image)
+
+    fmt = variant_format()
+    stem = os.path.splitext(os.path.basename(photo.image.name))[0]
+    thumbnail = make_variant(image, THUMBNAIL_SIZE, crop=True)
+    medium = make_variant(image, MEDIUM_SIZE, crop=False)
+    _replace_file(photo.thumbnail, f"{stem}_thumb.{EXTENSIONS[fmt]}", _encode(thumbnail, fmt, VARIANT_QUALITY[fmt]))
+    _replace_file(photo.medium, f"{stem}_medium.{EXTENSIONS[fmt]}", _encode(medium, fmt, VARIANT_QUALITY[fmt]))
+
+    photo.width, photo.height = image.size
+    photo.thumbnail_width, photo.thumbnail_height = thumbnail.size
+    photo.medium_width, photo.medium_height = medium.size
+    photo.save(update_fields=[
+        'image', 'thumbnail', 'medium', 'width', 'height',
+        'thumbnail_width', 'thumbnail_height', 'medium_width', 'medium_height',
+    ])
+    return True
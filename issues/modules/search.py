@@ -0,0 +1,76 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+SEARCH_CONFIG = "russian"
+# Веса полей в Issue.search_vector: заголовок важнее адреса, адрес — описания
+SEARCH_VECTOR = (
+    SearchVector('title', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('address', weight='B', config=SEARCH_CONFIG)
+    + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+)
+MIN_TRIGRAM_QUERY_LENGTH = 3
+
+
+def apply_issue_filters(queryset, category=None, status=None, search=''):
+    """Фильтры списка и карты обращений: категория, статус и полнотекстовый поиск."""
+    from issues.constants import ISSUE_CATEGORY_CHOICES
+    from issues.models import Issue
+
+    if category and category in dict(ISSUE_CATEGORY_CHOICES):
+        queryset = queryset.filter(category=category)
+
+    if status and status in dict(Issue.STATUS_CHOICES):
+        queryset = queryset.filter(status=status)
+
+    if search:
+        queryset = search_issues(queryset, search)
+
+    return queryset
+
+
+def _matching_reporters(text: str):
+    """Авторы, в чьих email, имени или фамилии есть запрос (таблица пользователей мала)."""
+    User = get_user_model()
+    return User.objects.filter(
+        Q(email__icontains=text) |
+        Q(first_name__icontains=text) |
+        Q(last_name__icontains=text)
+    ).values('id')
+
+
+def search_issues(queryset, text: str):
+    """
+    Полнотекстовый поиск обращений: tsvector (русская морфология, GIN-индекс),
+    подстрока в заголовке, описании или адресе (ILIKE по триграммным GIN-индексам),
+    похожий заголовок для опечаток и подстрока в email, имени или фамилии автора.
+    Аннотирует search_rank для сортировки по релевантности — в double precision:
+    значение real (float4) не возвращается из курсора пагинации тем же числом.
+    """
+    text = text.strip()
+    if not text:
+        return queryset
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    condition = Q(search_vector=query) | Q(reporter__in=_matching_reporters(text))
+    # Короче трёх символов триграммный индекс не помогает — только слова и авторы
+    if len(text) >= MIN_TRIGRAM_QUERY_LENGTH:
+        condition |= (
+            Q(title__trigram_similar=text) |
+            Q(title__icontains=text) |
+            Q(description__icontains=text) |
+            Q(address__icontains=text)
+        )
+
+    return queryset.filter(condition).annotate(
+        search_rank=Cast(
+            SearchRank(F('search_vector'), query) + TrigramSimilarity('title', text),
+            FloatField()
+        )
+    )
@@ -0,0 +1,74 @@
+"""
+Сводная статистика обращений для главной страницы.
+
+Считается одним GROUP BY по (статус, категория) с условными COUNT за последние
+30 дней и кэшируется; кэш сбрасывается сигналами сохранения и удаления Issue
+(issues.signals), так что обычный просмотр главной не обращается к базе.
+"""
+import logging
+from datetime import timedelta
+from typing import Dict
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from issues.constants import ISSUE_CATEGORY_CHOICES
+from Map_of_local_issues.cache import Namespace
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+RECENT_DAYS = 30
+# TTL ограничивает и «сползание» окна 30 дней, если обращения долго не меняются
+STATS_CACHE = Namespace("stats.issues", 600)
+STATS_KEY = STATS_CACHE.key("home")
+
+
+def compute_issue_stats() -> Dict:
+    from issues.models import Issue
+
+    since = timezone.now() - timedelta(days=RECENT_DAYS)
+    rows = (
+        Issue.objects.order_by()
+        .values('status', 'category')
+        .annotate(
+            total=Count('id'),
+            created_recently=Count('id', filter=Q(created_at__gte=since)),
+            resolved_recently=Count('id', filter=Q(resolved_at__gte=since)),
+        )
+    )
+
+    by_status = {key: 0 for key, _label in Issue.STATUS_CHOICES}
+    by_category = {key: 0 for key, _label in ISSUE_CATEGORY_CHOICES}
+    stats = {'total': 0, 'created_recently': 0, 'resolved_recently': 0}
+    for row in rows:
+        by_status[row['status']] = by_status.get(row['status'], 0) + row['total']
+        by_category[row['category']] = by_category.get(row['category'], 0) + row['total']
+        for field in stats:
+            stats[field] += row[field]
+
+    labels = dict(ISSUE_CATEGORY_CHOICES)
+    stats.update(
+        by_status=by_status,
+        by_category=[
+            {'category': key, 'label': str(labels.get(key, key)), 'count': count}
+            for key, count in by_category.items()
+        ],
+        recent_days=RECENT_DAYS,
+    )
+    return stats
+
+
+def get_issue_stats() -> Dict:
+    stats = STATS_CACHE.get(STATS_KEY)
+    if stats is None:
+        stats = compute_issue_stats()
+        STATS_CACHE.set(STATS_KEY, stats)
+    return stats
+
+
+def invalidate_issue_stats() -> None:
+    STATS_CACHE.delete(STATS_KEY)
+    # И повторно после коммита: параллельный запрос мог успеть закэшировать старые числа
+    transaction.on_commit(lambda: STATS_CACHE.delete(STATS_KEY))
@@ -0,0 +1,77 @@
+"""
+Инкрементальная синхронизация точек карты (map/geojson/?since=<token>).
+
+С каждым ответом map/geojson клиент получает sync_token, а дальше (опрос,
+переподключение) запрашивает только изменения: обращения с updated_at позже
+токена и id тех, что нужно убрать с карты, — удалённых (IssueTombstone)
+и переставших подходить под фильтры или область карты.
+
+Токен — момент выдачи, сдвинутый назад на SYNC_OVERLAP: транзакция, начатая
+до выдачи токена, может зафиксироваться позже, а повторно присланная точка
+безвредна — клиент заменяет маркер по id. Надгробия хранятся
+TOMBSTONE_RETENTION; токен старше — недействителен, и клиент получает полный
+набор (full=true).
+"""
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from issues.models import Issue, IssueTombstone
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+SYNC_OVERLAP = timedelta(seconds=getattr(settings, 'SYNC_OVERLAP_SECONDS', 10))
+TOMBSTONE_RETENTION = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 7))
+
+
+# === ТОКЕН ===
+def issue_token(now: Optional[datetime] = None) -> str:
+    """Токен синхронизации: микросекунды Unix-времени в шестнадцатеричной записи."""
+    moment = (now or timezone.now()) - SYNC_OVERLAP
+    return format(int(moment.timestamp() * 1_000_000), 'x')
+
+
+def parse_token(token: str) -> datetime:
+    """Момент, с которого клиенту нужны изменения; ValueError для некорректного токена."""
+    try:
+        micros = int(token, 16)
+        if micros < 0:
+            raise ValueError
+        return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise ValueError(f"Некорректный токен синхронизации: {token!r}") from None
+
+
+def is_expired(since: datetime, now: Optional[datetime] = None) -> bool:
+    """Надгробия за этот период уже удалены — изменения не восстановить."""
+    return since < (now or timezone.now()) - TOMBSTONE_RETENTION
+
+
+# === ИЗМЕНЕНИЯ ===
+def changes_since(issues, since: datetime) -> Tuple[object, List[int]]:
+    """
+    Изменения после since для выборки карты issues (с фильтрами и bbox):
+    (обращения, изменённые и подходящие под выборку; id, которые клиент должен убрать).
+    """
+    changed = issues.filter(updated_at__gt=since)
+    left = (
+        Issue.objects.filter(updated_at__gt=since)
+        .exclude(pk__in=changed.values('pk'))
+        .values_list('pk', flat=True)
+    )
+    deleted = IssueTombstone.objects.filter(deleted_at__gt=since).values_list('issue_id', flat=True)
+    # Один запрос: UNION убирает и повторы
+    return changed, sorted(left.union(deleted))
+
+
+def record_deletion(issue_id: int) -> None:
+    """Надгробие удалённого обращения; заодно удаляет надгробия старше срока хранения."""
+    now = timezone.now()
+    IssueTombstone.objects.create(issue_id=issue_id, deleted_at=now)
+    pruned, _ = IssueTombstone.objects.filter(deleted_at__lt=now - TOMBSTONE_RETENTION).delete()
+    if pruned:
+        logger.info(f"Удалено устаревших надгробий: {pruned}")
@@ -0,0 +1,304 @@
+"""
+Ограничение частоты запросов к Nominatim и объединение одинаковых запросов.
+
+Политика Nominatim — не чаще 1 запроса в секунду с приложения, поэтому лимитер
+общий для всех воркеров: токены выдаются через атомарные add/incr в кэше
+(settings.GEOCODING_THROTTLE_CACHE, по умолчанию 'default'). С общим бэкендом
+кэша (Redis/memcached/база) лимит действует на все процессы сразу.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+DEFAULT_RATE = 1.0  # запросов в секунду
+DEFAULT_BURST = 1
+SLOT_KEY_PREFIX = "nominatim_rl_slot"
+QUEUE_DEPTH_KEY = "nominatim_rl_queue_depth"
+FLIGHT_KEY_PREFIX = "nominatim_inflight"
+FLIGHT_POLL_INTERVAL = 0.1
+
+
+class RateLimitTimeout(Exception):
+    """Токен не получен до истечения таймаута запроса."""
+
+
+def _cache():
+    return caches[getattr(settings, "GEOCODING_THROTTLE_CACHE", "default")]
+
+
+def _rate() -> float:
+    return float(getattr(settings, "NOMINATIM_RATE_LIMIT", DEFAULT_RATE))
+
+
+def _burst() -> int:
+    return int(getattr(settings, "NOMINATIM_RATE_BURST", DEFAULT_BURST))
+
+
+def flight_key(*parts) -> str:
+    """Стабильный между процессами ключ запроса (в отличие от hash())."""
+    raw = "|".join(str(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ThrottleStats:
+    """Метрики процесса: очередь, ожидание, объединённые запросы."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.coalesced = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def enter(self):
+        with self._lock:
+            self.waiting += 1
+
+    def leave(self, waited: Optional[float]):
+        with self._lock:
+            self.waiting -= 1
+            if waited is None:
+                self.timeouts += 1
+                return
+            self.acquired += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def add_coalesced(self):
+        with self._lock:
+            self.coalesced += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "queue_depth": self.waiting,
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "coalesced": self.coalesced,
+                "avg_wait": round(self.total_wait / self.acquired, 4) if self.acquired else 0.0,
+                "max_wait": round(self.max_wait, 4),
+            }
+
+
+stats = ThrottleStats()
+
+
+def _slot_key(slot: int) -> str:
+    return f"{SLOT_KEY_PREFIX}_{slot}"
+
+
+def _try_slot(cache, slot: int, ttl: int) -> bool:
+    key = _slot_key(slot)
+    cache.add(key, 0, ttl)
+    try:
+        return cache.incr(key) <= _burst()
+    except ValueError:
+        # Ключ вытеснен между add и incr — слот считаем занятым
+        return False
+
+
+async def _atry_slot(cache, slot: int, ttl: int) -> bool:
+    key = _slot_key(slot)
+    await cache.aadd(key, 0, ttl)
+    try:
+        return await cache.aincr(key) <= _burst()
+    except ValueError:
+        return False
+
+
+def _queue_delta(cache, delta: int) -> None:
+    cache.add(QUEUE_DEPTH_KEY, 0, None)
+    try:
+        cache.incr(QUEUE_DEPTH_KEY, delta)
+    except ValueError:
+        pass
+
+
+async def _aqueue_delta(cache, delta: int) -> None:
+    await cache.aadd(QUEUE_DEPTH_KEY, 0, None)
+    try:
+        await cache.aincr(QUEUE_DEPTH_KEY, delta)
+    except ValueError:
+        pass
+
+
+def acquire(timeout: float) -> float:
+    """
+    Берёт токен общего лимитера. Время делится на слоты длиной 1/rate секунд,
+    в каждом слоте не больше burst запросов; если текущий слот занят — резервируется
+    ближайший свободный и вызывающий ждёт его начала. Возвращает время ожидания.
+    """
+    cache = _cache()
+    rate = _rate()
+    ttl = int(timeout) + 5
+    start = time.time()
+    deadline = start + timeout
+    slot = int(start * rate)
+
+    stats.enter()
+    _queue_delta(cache, 1)
+    waited = None
+    try:
+        while slot / rate < deadline:
+            if _try_slot(cache, slot, ttl):
+                delay = slot / rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                waited = time.time() - start
+                return waited
+            slot += 1
+        raise RateLimitTimeout
+    finally:
+        _queue_delta(cache, -1)
+        stats.leave(waited)
+
+
+async def aacquire(timeout: float) -> float:
+    """Асинхронный acquire(): ожидание слота не блокирует event loop."""
+    cache = _cache()
+    rate = _rate()
+    ttl = int(timeout) + 5
+    start = time.time()
+    deadline = start + timeout
+    slot = int(start * rate)
+
+    stats.enter()
+    await _aqueue_delta(cache, 1)
+    waited = None
+    try:
+        while slot / rate < deadline:
+            if await _atry_slot(cache, slot, ttl):
+                delay = slot / rate - time.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                waited = time.time() - start
+                return waited
+            slot += 1
+        raise RateLimitTimeout
+    finally:
+        await _aqueue_delta(cache, -1)
+        stats.leave(waited)
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """
+    Объединяет одинаковые одновременные запросы: первый вызывающий (лидер) идёт
+    в Nominatim, остальные ждут его результат. Внутри процесса — через Event/Task,
+    между процессами — через флаг в кэше и опрос кэша результатов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[tuple, asyncio.Task] = {}
+
+    def do(self, key: str, fn: Callable, result_key: str, timeout: float):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            stats.add_coalesced()
+            call.event.wait(timeout)
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn, result_key, timeout)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    def _do_shared(self, key: str, fn: Callable, result_key: str, timeout: float):
+        cache = _cache()
+        lock_key = f"{FLIGHT_KEY_PREFIX}_{key}"
+        # Флаг снимает только тот, кто его поставил: ждавший дольше timeout
+        # выполняет запрос сам, но флаг лидера не трогает
+        token = uuid.uuid4().hex
+        acquired = cache.add(lock_key, token, int(timeout) + 1)
+        if not acquired:
+            # Тот же запрос уже выполняет другой процесс — ждём его результат в кэше
+            stats.add_coalesced()
+            deadline = time.time() + timeout
+            while time.time() < deadline and cache.get(lock_key) is not None:
+                time.sleep(FLIGHT_POLL_INTERVAL)
+                result = caches["default"].get(result_key)
+                if result is not None:
+                    return result
+            result = caches["default"].get(result_key)
+            if result is not None:
+                return result
+            acquired = cache.add(lock_key, token, int(timeout) + 1)
+        try:
+            return fn()
+        finally:
+            if acquired and cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    async def ado(self, key: str, coro_fn: Callable, result_key: str, timeout: float):
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = loop.create_task(self._ado_shared(key, coro_fn, result_key, timeout))
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _t: self._tasks.pop(task_key, None))
+        else:
+            stats.add_coalesced()
+        return await asyncio.shield(task)
+
+    async def _ado_shared(self, key: str, coro_fn: Callable, result_key: str, timeout: float):
+        cache = _cache()
+        lock_key = f"{FLIGHT_KEY_PREFIX}_{key}"
+        token = uuid.uuid4().hex
+        acquired = await cache.aadd(lock_key, token, int(timeout) + 1)
+        if not acquired:
+            stats.add_coalesced()
+            deadline = time.time() + timeout
+            while time.time() < deadline and await cache.aget(lock_key) is not None:
+                await asyncio.sleep(FLIGHT_POLL_INTERVAL)
+                result = await caches["default"].aget(result_key)
+                if result is not None:
+                    return result
+            result = await caches["default"].aget(result_key)
+            if result is not None:
+                return result
+            acquired = await cache.aadd(lock_key, token, int(timeout) + 1)
+        try:
+            return await coro_fn()
+        finally:
+            if acquired and await cache.aget(lock_key) == token:
+                await cache.adelete(lock_key)
+
+
+single_flight = SingleFlight()
+
+
+def get_metrics() -> Dict:
+    """Метрики лимитера: по процессу и общая глубина очереди из кэша."""
+    metrics = stats.snapshot()
+    metrics["shared_queue_depth"] = _cache().get(QUEUE_DEPTH_KEY, 0)
+    metrics["rate_limit"] = _rate()
+    metrics["burst"] = _burst()
+    return metrics
@@ -0,0 +1,135 @@
+import logging
+import math
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from django.db import connection
+
+from Map_of_local_issues.cache import Namespace
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+TILE_MIN_ZOOM = 0
+TILE_MAX_ZOOM = 20
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_LAYER_NAME = "issues"
+TILE_CACHE_TIMEOUT = 3600 * 24
+TILE_CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+# Версию нужно увеличивать при изменении атрибутов тайла
+TILE_CACHE = Namespace("tiles", TILE_CACHE_TIMEOUT)
+# Поколение тайлов входит в ключ: его смена сбрасывает весь кэш тайлов одной записью
+GENERATION_KEY = TILE_CACHE.key("generation")
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    if not (TILE_MIN_ZOOM <= z <= TILE_MAX_ZOOM):
+        return False
+    size = 2 ** z
+    return 0 <= x < size and 0 <= y < size
+
+
+def _generation() -> int:
+    generation = TILE_CACHE.get(GENERATION_KEY)
+    if generation is None:
+        # С текущего времени: после истечения или вытеснения ключа тайлы прежних поколений не вернутся
+        generation = int(time.time() * 1000)
+        if not TILE_CACHE.add(GENERATION_KEY, generation):
+            generation = TILE_CACHE.get(GENERATION_KEY, generation)
+    return generation
+
+
+def tile_cache_key(z: int, x: int, y: int, generation: Optional[int] = None) -> str:
+    if generation is None:
+        generation = _generation()
+    return TILE_CACHE.key(generation, z, x, y)
+
+
+def tile_for_point(lon: float, lat: float, z: int) -> Tuple[int, int]:
+    """Координаты тайла (x, y) в схеме XYZ, содержащего точку на зуме z."""
+    size = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lon + 180.0) / 360.0 * size)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * size)
+    return min(max(x, 0), size - 1), min(max(y, 0), size - 1)
+
+
+def tile_keys_for_points(points: Iterable) -> List[str]:
+    """Ключи кэша всех тайлов (на всех зумах), которые покрывают переданные точки."""
+    keys = set()
+    generation = _generation()
+    for point in points:
+        if point is None:
+            continue
+        for z in range(TILE_MIN_ZOOM, TILE_MAX_ZOOM + 1):
+            x, y = tile_for_point(point.x, point.y, z)
+            keys.add(tile_cache_key(z, x, y, generation))
+    return list(keys)
+
+
+def invalidate_tiles(*points) -> None:
+    """Сбрасывает кэш тайлов, в которые попадают точки (старое и новое положение обращения)."""
+    keys = tile_keys_for_points(points)
+    if keys:
+        TILE_CACHE.delete_many(keys)
+        logger.debug(f"Сброшено {len(keys)} тайлов")
+
+
+def invalidate_all_tiles() -> None:
+    """Сбрасывает все тайлы сменой поколения — для массовых изменений (загрузка порциями)."""
+    generation = _generation()
+    TILE_CACHE.set(GENERATION_KEY, max(int(time.time() * 1000), generation + 1))
+
+
+def _build_tile_sql() -> str:
+    from issues.models import Issue, IssuePhoto
+
+    return f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom
+        ),
+        mvtgeom AS (
+            SELECT
+                ST_AsMVTGeom(
+                    ST_Transform(i.location, 3857), bounds.geom,
+                    {TILE_EXTENT}, {TILE_BUFFER}, true
+                ) AS geom,
+                i.id,
+                i.title,
+                i.status,
+                i.category,
+                i.rating AS vote_rating,
+                (
+                    SELECT COUNT(*) FROM {IssuePhoto._meta.db_table} p WHERE p.issue_id = i.id
+                )::integer AS photos_count,
+                (
+                    SELECT p.thumbnail FROM {IssuePhoto._meta.db_table} p
+                    WHERE p.issue_id = i.id AND p.thumbnail <> ''
+                    ORDER BY p.id LIMIT 1
+                ) AS thumbnail
+            FROM {Issue._meta.db_table} i, bounds
+            WHERE i.location && ST_Transform(bounds.geom, 4326)
+        )
+        SELECT ST_AsMVT(mvtgeom.*, '{TILE_LAYER_NAME}', {TILE_EXTENT}, 'geom') FROM mvtgeom
+    """
+
+
+def get_tile(z: int, x: int, y: int) -> Optional[bytes]:
+    """
+    Возвращает тайл MVT с обращениями. Кодирование выполняет PostGIS (ST_AsMVT),
+    результат кэшируется до изменения обращений, попадающих в тайл.
+    """
+    key = tile_cache_key(z, x, y)
+    cached = TILE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    with connection.cursor() as cursor:
+        cursor.execute(_build_tile_sql(), {'z': z, 'x': x, 'y': y})
+        row = cursor.fetchone()
+
+    tile = bytes(row[0]) if row and row[0] is not None else b""
+    TILE_CACHE.set(key, tile)
+    return tile
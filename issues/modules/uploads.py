@@ -0,0 +1,143 @@
+"""
+Потоковая обработка загрузки фото при создании обращения.
+
+IssuePhotoUploadHandler заменяет стандартные обработчики Django (память + временный
+файл) для create_issue: лимиты 5 файлов / 5 МБ проверяются по мере поступления
+данных, тип файла определяется по сигнатуре, а не по Content-Type клиента.
+Отклонённый файл дальше не записывается; запрос заведомо больше лимита не
+читается вовсе. Принятые файлы лежат во временном файле, и FileSystemStorage
+переносит его в media без повторного копирования в память.
+"""
+import logging
+from typing import List, Optional, Tuple
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+MAX_PHOTOS = 5
+MAX_PHOTO_SIZE = 5 * 1024 * 1024
+# Запас на текстовые поля формы и заголовки частей multipart
+MAX_FORM_OVERHEAD = 1024 * 1024
+MAX_REQUEST_SIZE = MAX_PHOTOS * MAX_PHOTO_SIZE + MAX_FORM_OVERHEAD
+
+IMAGE_SIGNATURES = {
+    b'\xff\xd8\xff': 'image/jpeg',
+    b'\x89PNG\r\n\x1a\n': 'image/png',
+}
+SIGNATURE_LENGTH = max(len(signature) for signature in IMAGE_SIGNATURES)
+
+REJECT_TOO_MANY = 'too_many'
+REJECT_TOO_LARGE = 'too_large'
+REJECT_NOT_IMAGE = 'not_image'
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    for signature, content_type in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return content_type
+    return None
+
+
+def is_request_too_large(content_length) -> bool:
+    """Тело запроса заведомо больше MAX_REQUEST_SIZE (по заголовку Content-Length)."""
+    try:
+        return int(content_length or 0) > MAX_REQUEST_SIZE
+    except (TypeError, ValueError):
+        return False
+
+
+class IssuePhotoUploadHandler(FileUploadHandler):
+    """
+    Принимает не больше MAX_PHOTOS изображений JPEG/PNG до MAX_PHOTO_SIZE каждое.
+    Отклонённые файлы попадают в rejected как (имя файла, причина); aborted —
+    тело запроса превышает MAX_REQUEST_SIZE и не разбиралось.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.files_seen = 0
+        self.rejected: List[Tuple[str, str]] = []
+        self.aborted = False
+        # Не «file»: MultiPartParser._close_files закрывает handler.file без проверки на None
+        self._file = None
+        self._header = b''
+        self._sniffed_type = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if is_request_too_large(content_length):
+            logger.info(f"Загрузка отклонена до чтения: {content_length} байт")
+            self.aborted = True
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.files_seen += 1
+        self._header = b''
+        self._sniffed_type = None
+
+        if self.files_seen > MAX_PHOTOS:
+            self._reject(REJECT_TOO_MANY)
+            return
+        if content_length and content_length > MAX_PHOTO_SIZE:
+            self._reject(REJECT_TOO_LARGE)
+            return
+        self._file = TemporaryUploadedFile(file_name, content_type, 0, charset, content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._file is None:
+            # Файл отклонён: данные читаются из потока, но никуда не пишутся
+            return None
+
+        if self._sniffed_type is None:
+            self._header += raw_data[:SIGNATURE_LENGTH]
+            if len(self._header) >= SIGNATURE_LENGTH and not self._sniff():
+                return None
+
+        if start + len(raw_data) > MAX_PHOTO_SIZE:
+            self._reject(REJECT_TOO_LARGE)
+            return None
+
+        self._file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self._file is None:
+            return None
+        if self._sniffed_type is None and not self._sniff():
+            return None
+
+        uploaded, self._file = self._file, None
+        uploaded.seek(0)
+        uploaded.size = file_size
+        # Тип по содержимому, а не присланный клиентом
+        uploaded.content_type = self._sniffed_type
+        return uploaded
+
+    def upload_interrupted(self):
+        self._discard()
+
+    def upload_complete(self):
+        self._discard()
+
+    def _sniff(self) -> bool:
+        self._sniffed_type = sniff_image_type(self._header)
+        if self._sniffed_type is None:
+            self._reject(REJECT_NOT_IMAGE)
+            return False
+        return True
+
+    def _reject(self, reason: str) -> None:
+        self.rejected.append((self.file_name, reason))
+        self._discard()
+
+    def _discard(self) -> None:
+        if self._file is not None:
+            # TemporaryUploadedFile удаляет временный файл при закрытии
+            self._file.close()
+            self._file = None
@@ -0,0 +1,122 @@
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from issues.models import Issue, Vote
+from issues.modules.conditional import bump_dataset_version
+
+logger = logging.getLogger(__name__)
+
+
+def _counter_deltas(old_value: Optional[int], new_value: Optional[int]) -> dict:
+    """Изменения счётчиков upvotes/downvotes/rating при смене голоса old → new."""
+    upvotes = (new_value == Vote.VOTE_UP) - (old_value == Vote.VOTE_UP)
+    downvotes = (new_value == Vote.VOTE_DOWN) - (old_value == Vote.VOTE_DOWN)
+    return {
+        'upvotes': upvotes,
+        'downvotes': downvotes,
+        'rating': (new_value or 0) - (old_value or 0),
+    }
+
+
+def adjust_vote_counters(issue_id: int, old_value: Optional[int], new_value: Optional[int]) -> None:
+    """Сдвигает счётчики обращения при смене голоса old → new одним UPDATE."""
+    deltas = _counter_deltas(old_value, new_value)
+    if any(deltas.values()):
+        # updated_at — чтобы новый рейтинг попал в изменения карты (?since=)
+        Issue.objects.filter(pk=issue_id).update(
+            updated_at=timezone.now(),
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+
+
+def apply_vote(user, issue: Issue, value: Optional[int]) -> Tuple[int, Optional[int]]:
+    """
+    Устанавливает голос пользователя (1, -1 или None — отмена) и атомарно
+    обновляет денормализованные счётчики обращения.
+    Возвращает (новый рейтинг, текущий голос пользователя).
+    """
+    with transaction.atomic():
+        # Блокируется строка обращения: select_for_update по ещё не существующему
+        # голосу ничего не блокирует, и два первых голоса одного пользователя
+        # иначе оба дошли бы до INSERT (IntegrityError по unique_together)
+        rating = (
+            Issue.objects.select_for_update()
+            .filter(pk=issue.pk)
+            .values_list('rating', flat=True)
+            .get()
+        )
+        existing = Vote.objects.filter(user=user, issue=issue).first()
+        old_value = existing.value if existing else None
+
+        if value is None:
+            if existing:
+                # Счётчики поправлены здесь — сигнал post_delete их не трогает
+                existing.counters_applied = True
+                existing.delete()
+        elif existing:
+            if existing.value != value:
+                existing.value = value
+                existing.save(update_fields=['value'])
+        else:
+            Vote.objects.create(user=user, issue=issue, value=value)
+
+        adjust_vote_counters(issue.pk, old_value, value)
+        rating += _counter_deltas(old_value, value)['rating']
+
+    return rating, value
+
+
+def attach_user_votes(user, issues: Iterable[Issue]) -> List[Issue]:
+    """
+    Проставляет обращениям голос пользователя: user_vote (1, -1 или None),
+    user_has_upvoted и user_has_downvoted.
+
+    Голоса страницы читаются одним запросом по индексу (user, issue) вместо
+    коррелированного подзапроса на каждую строку списка.
+    Возвращает обращения списком — queryset при этом вычисляется.
+    """
+    issues = list(issues)
+    votes = {}
+    if issues and user.is_authenticated:
+        votes = dict(
+            Vote.objects.filter(user=user, issue_id__in=[issue.pk for issue in issues])
+            .values_list('issue_id', 'value')
+        )
+    for issue in issues:
+        issue.user_vote = votes.get(issue.pk)
+        issue.user_has_upvoted = issue.user_vote == Vote.VOTE_UP
+        issue.user_has_downvoted = issue.user_vote == Vote.VOTE_DOWN
+    return issues
+
+
+def rebuild_vote_counters(issues=None) -> int:
+    """
+    Пересчитывает upvotes/downvotes/rating по таблице Vote одним UPDATE.
+    Возвращает число обновлённых обращений.
+    """
+    if issues is None:
+        issues = Issue.objects.all()
+
+    def _vote_subquery(aggregate):
+        return Coalesce(
+            Subquery(
+                Vote.objects.filter(issue=OuterRef('pk'))
+                .order_by().values('issue').annotate(total=aggregate).values('total'),
+                output_field=IntegerField()
+            ),
+            0
+        )
+
+    updated = issues.update(
+        upvotes=_vote_subquery(Count('id', filter=Q(value=Vote.VOTE_UP))),
+        downvotes=_vote_subquery(Count('id', filter=Q(value=Vote.VOTE_DOWN))),
+        rating=_vote_subquery(Sum('value')),
+    )
+    bump_dataset_version()
+    logger.info(f"Пересчитаны счётчики голосов для {updated} обращений")
+    return updated
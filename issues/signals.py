@@ -0,0 +1,96 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_save, pre_migrate, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Issue, IssuePhoto, Vote
+from .modules.analytics import mark_dirty, schedule_refresh
+from .modules.conditional import bump_dataset_version
+from .modules.stats import invalidate_issue_stats
+from .modules.sync import record_deletion
+from .modules.tiles import invalidate_tiles
+from .modules.votes import adjust_vote_counters
+
+
+@receiver(pre_migrate)
+def create_search_extensions(sender, app_config=None, using='default', **kwargs):
+    """pg_trgm нужен триграммному индексу Issue.title до применения миграций."""
+    if app_config is None or app_config.name != 'issues':
+        return
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
+@receiver(pre_save, sender=Issue)
+def remember_previous_state(sender, instance, **kwargs):
+    """
+    Запоминает прежнее положение (сбросить и старые тайлы при переносе точки)
+    и прежние даты (пересчитать и те дни сводки аналитики, откуда ушло обращение).
+    """
+    instance._previous_location = None
+    instance._previous_dates = ()
+    if instance.pk:
+        previous = (
+            Issue.objects.filter(pk=instance.pk)
+            .values_list('location', 'created_at', 'resolved_at')
+            .first()
+        )
+        if previous is not None:
+            instance._previous_location = previous[0]
+            instance._previous_dates = previous[1:]
+
+
+def rollup_changed(instance, *extra_dates):
+    mark_dirty(instance.created_at, instance.resolved_at, *extra_dates)
+    schedule_refresh()
+
+
+@receiver(post_save, sender=Issue)
+def issue_saved(sender, instance, **kwargs):
+    invalidate_tiles(instance.location, getattr(instance, '_previous_location', None))
+    invalidate_issue_stats()
+    bump_dataset_version()
+    rollup_changed(instance, *getattr(instance, '_previous_dates', ()))
+
+
+@receiver(post_delete, sender=Issue)
+def issue_deleted(sender, instance, **kwargs):
+    invalidate_tiles(instance.location)
+    invalidate_issue_stats()
+    bump_dataset_version()
+    rollup_changed(instance)
+    record_deletion(instance.pk)
+
+
+@receiver(post_delete, sender=Vote)
+def vote_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Голос удалён в обход apply_vote — каскадом вместе с пользователем или в
+    админке: счётчики обращения сдвигаются здесь. Другие прямые правки голосов
+    (изменение в админке, импорт) исправляет команда rebuild_vote_counters.
+    """
+    if getattr(instance, 'counters_applied', False):
+        return
+    if isinstance(origin, Issue) or getattr(origin, 'model', None) is Issue:
+        # Удаляется само обращение — счётчики больше не нужны
+        return
+    adjust_vote_counters(instance.issue_id, instance.value, None)
+
+
+@receiver(post_save, sender=Vote)
+@receiver(post_delete, sender=Vote)
+@receiver(post_save, sender=IssuePhoto)
+@receiver(post_delete, sender=IssuePhoto)
+def issue_attributes_changed(sender, instance, **kwargs):
+    """Рейтинг и число фото входят в атрибуты тайла и в ответы карты."""
+    bump_dataset_version()
+    if sender is IssuePhoto:
+        # ...и в точки map/geojson: обращение должно попасть в изменения для ?since=
+        # (голоса обновляют updated_at вместе со счётчиками в issues.modules.votes)
+        Issue.objects.filter(pk=instance.issue_id).update(updated_at=timezone.now())
+    issue = Issue.objects.filter(pk=instance.issue_id).only('location').first()
+    if issue is not None:
+        invalidate_tiles(issue.location)
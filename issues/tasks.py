@@ -0,0 +1,26 @@
+import logging
+
+from jobs.queue import task
+
+from .models import IssuePhoto
+from .modules.analytics import refresh_rollups
+from .modules.photos import process_photo
+
+logger = logging.getLogger(__name__)
+
+
+@task('issues.process_photo', max_attempts=3)
+def process_issue_photo(photo_id: int) -> None:
+    """Миниатюры и удаление EXIF для загруженного фото (вне запроса пользователя)."""
+    photo = IssuePhoto.objects.filter(pk=photo_id).first()
+    if photo is None:
+        logger.info(f"Фото {photo_id} удалено до обработки")
+        return
+    # Нечитаемый файл повтором не исправить — process_photo только логирует его
+    process_photo(photo)
+
+
+@task('issues.refresh_rollups', max_attempts=3)
+def refresh_issue_rollups() -> None:
+    """Пересчёт дневной сводки для аналитики за дни, отмеченные сигналами Issue."""
+    refresh_rollups()
@@ -8,8 +8,13 @@ urlpatterns = [
     path('api/geocode/', views.GeocodeAPIView.as_view(), name='geocode_api'),
     path('api/search-address/', views.SearchAddressAPIView.as_view(), name='search_address_api'),
     path('api/reverse-geocode/', views.ReverseGeocodeAPIView.as_view(), name='reverse_geocode_api'),
+    path('api/geocoding-metrics/', views.geocoding_metrics, name='geocoding_metrics'),
+    path('api/analytics/', views.analytics_api, name='analytics_api'),
+    path('analytics/', views.analytics_dashboard, name='analytics'),
     path('map/', views.map_view, name='map'),
     path('map/geojson/', views.get_issues_geojson, name='map_geojson'),
+    path('export/', views.export_issues, name='export_issues'),
+    path('tiles/<int:z>/<int:x>/<int:y>.pbf', views.issue_tile, name='issue_tile'),
     path('create/', views.create_issue, name='create_issue'),
     path('update-status/<int:issue_id>/', views.update_issue_status, name='update_issue_status'),
     path('<int:issue_id>/delete/', views.delete_issue, name='delete_issue'),
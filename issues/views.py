@@ -2,21 +2,42 @@ import logging
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.gis.geos import Point
-from django.db.models import Q, Prefetch, Case, When, IntegerField, Sum, BooleanField, Value as V, OuterRef, Subquery
-from django.http import JsonResponse
+from django.db.models import F, Prefetch
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.urls import reverse
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext
 from django.utils.translation import gettext_lazy as _
 from django.views import View
-from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_POST
 
+from Map_of_local_issues.cache import get_stats as get_cache_stats
 from .constants import ISSUE_CATEGORIES, ISSUE_CATEGORY_CHOICES
 from .forms import CommentForm
-from .models import Comment, Issue, IssuePhoto, Vote
-from .modules.geocoding import geocode_address, reverse_geocode, search_address
+from .models import Comment, Issue, IssuePhoto
+from .modules.analytics import PERIOD_CHOICES, get_analytics, parse_period
+from .modules.clustering import cluster_issues, parse_bbox, parse_zoom, should_cluster
+from .modules.conditional import conditional_on_dataset
+from .modules.geojson import (
+    ENGINE_DATABASE, feature_collection_bytes, get_engine as get_geojson_engine, issue_features,
+)
+from .modules.export import FORMAT_GEOJSONSEQ, FORMATS, export_filename, stream_export
+from .modules.geocoding import (
+    ageocode_address, areverse_geocode, asearch_address, geocode_address, reverse_geocode,
+)
+from .modules.pagination import RELEVANCE_SORT, normalize_sort, paginate_keyset
+from .modules.search import apply_issue_filters
+from .modules.sync import changes_since, is_expired, issue_token, parse_token
+from .modules.throttling import get_metrics as get_throttle_metrics
+from .modules.uploads import (
+    MAX_PHOTOS, REJECT_NOT_IMAGE, REJECT_TOO_LARGE, REJECT_TOO_MANY, IssuePhotoUploadHandler,
+    is_request_too_large,
+)
+from .modules.tiles import TILE_CONTENT_TYPE, get_tile, is_valid_tile
+from .modules.votes import apply_vote, attach_user_votes
+from .tasks import process_issue_photo
 
 logger = logging.getLogger(__name__)
 
@@ -24,31 +45,16 @@ logger = logging.getLogger(__name__)
 @login_required
 def issue_detail(request, pk):
     """Детали обращения"""
-    user_vote_subq = Vote.objects.filter(
-        issue=OuterRef('pk'),
-        user=request.user
-    ).values('value')[:1]
-
     issue = get_object_or_404(
         Issue.objects.prefetch_related(
             Prefetch('photos', queryset=IssuePhoto.objects.order_by('id')),
             Prefetch('comments', queryset=Comment.objects.select_related('author').order_by('-created_at'))
         ).annotate(
-            user_vote=Subquery(user_vote_subq, output_field=IntegerField()),
-            user_has_upvoted=Case(
-                When(user_vote=1, then=V(True)),
-                default=V(False),
-                output_field=BooleanField()
-            ),
-            user_has_downvoted=Case(
-                When(user_vote=-1, then=V(True)),
-                default=V(False),
-                output_field=BooleanField()
-            ),
-            vote_rating=Sum('votes__value', default=0)
+            vote_rating=F('rating')
         ),
         pk=pk
     )
+    attach_user_votes(request.user, [issue])
 
     if request.method == 'POST':
         comment_form = CommentForm(request.POST)
@@ -68,6 +74,7 @@ def issue_detail(request, pk):
 
 
 @login_required
+@conditional_on_dataset(personal=True, xhr_only=True)
 def map_view(request):
     """
     Отображает карту со всеми обращениями с возможностью фильтрации
@@ -77,50 +84,24 @@ def map_view(request):
     search = request.GET.get('search', '').strip()
     sort = request.GET.get('sort', '-created_at')
 
-    user_vote_subq = Vote.objects.filter(
-        issue=OuterRef('pk'),
-        user=request.user
-    ).values('value')[:1]
-
     issues = Issue.objects.select_related('reporter').prefetch_related(
         Prefetch('photos', queryset=IssuePhoto.objects.order_by('id'))
     ).annotate(
-        user_vote=Subquery(user_vote_subq, output_field=IntegerField()),
-        user_has_upvoted=Case(
-            When(user_vote=1, then=V(True)),
-            default=V(False),
-            output_field=BooleanField()
-        ),
-        user_has_downvoted=Case(
-            When(user_vote=-1, then=V(True)),
-            default=V(False),
-            output_field=BooleanField()
-        ),
-        vote_rating=Sum('votes__value', default=0)
+        vote_rating=F('rating')
     )
 
-    if category and category in dict(ISSUE_CATEGORY_CHOICES).keys():
-        issues = issues.filter(category=category)
+    issues = apply_issue_filters(issues, category, status, search)
 
-    if status and status in dict(Issue.STATUS_CHOICES).keys():
-        issues = issues.filter(status=status)
-
-    if search:
-        issues = issues.filter(
-            Q(title__icontains=search) |
-            Q(description__icontains=search) |
-            Q(reporter__email__icontains=search) |
-            Q(reporter__first_name__icontains=search) |
-            Q(reporter__last_name__icontains=search)
-        )
-
-    valid_sort_fields = ['-created_at', 'created_at', '-vote_rating', 'vote_rating', 'title']
-    if sort not in valid_sort_fields:
-        sort = '-created_at'
-    issues = issues.order_by(sort)
+    if search and 'sort' not in request.GET:
+        sort = RELEVANCE_SORT
+    sort = normalize_sort(sort, searching=bool(search))
+    cursor = request.GET.get('cursor')
+    page, next_cursor = paginate_keyset(issues, sort, cursor)
+    page = attach_user_votes(request.user, page)
 
     context = {
-        'issues': issues,
+        'issues': page,
+        'next_cursor': next_cursor,
         'categories': ISSUE_CATEGORIES,
         'user_role': request.user.role,
         'selected_category': category,
@@ -131,13 +112,44 @@ def map_view(request):
     }
 
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        if cursor:
+            # Следующая порция карточек для бесконечной прокрутки
+            return render(request, 'issues/partials/issue_cards.html', context)
+        context['issues_count'] = issues.order_by().count()
         return render(request, 'issues/partials/issues_list.html', context)
 
+    context['issues_count'] = issues.order_by().count()
+
     return render(request, 'issues/map.html', context)
 
 
+@csrf_exempt
 @login_required
 def create_issue(request):
+    # Обработчик загрузки нужно заменить до разбора тела запроса, а CsrfViewMiddleware
+    # читает request.POST раньше view — поэтому CSRF проверяется во вложенной функции
+    if request.method == 'POST' and is_request_too_large(request.META.get('CONTENT_LENGTH')):
+        # Такое тело не читается, а без него нет и csrfmiddlewaretoken — ответ
+        # отдаётся до проверки CSRF. Он ничего не меняет: только пустая форма с ошибкой
+        return _upload_too_large(request)
+    request.upload_handlers = [IssuePhotoUploadHandler(request)]
+    return _create_issue(request)
+
+
+def _upload_too_large(request):
+    messages.error(
+        request,
+        _("Слишком большой запрос: до %(count)s фото, не более 5MB каждое.") % {'count': MAX_PHOTOS},
+        extra_tags='issues'
+    )
+    return render(request, 'issues/create_issue.html', {
+        'categories': ISSUE_CATEGORY_CHOICES,
+        'initial': {},
+    })
+
+
+@csrf_protect
+def _create_issue(request):
     if request.user.role != 'citizen':
         messages.error(request, _("Только граждане могут сообщать о проблемах."), extra_tags='issues')
         return redirect('issues:map')
@@ -173,6 +185,7 @@ def create_issue(request):
         })
 
     if request.method == 'POST':
+        upload = request.upload_handlers[0]
         title = request.POST.get('title', '').strip()
         description = request.POST.get('description', '').strip()
         category = request.POST.get('category', '').strip()
@@ -242,20 +255,18 @@ def create_issue(request):
                 reporter=request.user,
             )
 
-            photos = request.FILES.getlist('images')
-            max_photos = 5
-            if len(photos) > max_photos:
-                messages.warning(request, _(f"Максимум {max_photos} фото. Лишние игнорируются."), extra_tags='issues')
-                photos = photos[:max_photos]
-
-            for photo in photos:
-                if photo.size > 5 * 1024 * 1024:
-                    messages.warning(request, _(f"Файл {photo.name} слишком большой. Игнорируется."), extra_tags='issues')
-                    continue
-                if not photo.content_type.startswith('image/'):
-                    messages.warning(request, _(f"Файл {photo.name} не изображение. Игнорируется."), extra_tags='issues')
-                    continue
-                IssuePhoto.objects.create(issue=issue, image=photo)
+            # Лимиты и тип файлов проверены IssuePhotoUploadHandler ещё при загрузке
+            if any(reason == REJECT_TOO_MANY for _name, reason in upload.rejected):
+                messages.warning(request, _("Максимум %(count)s фото. Лишние игнорируются.") % {'count': MAX_PHOTOS}, extra_tags='issues')
+            for name, reason in upload.rejected:
+                if reason == REJECT_TOO_LARGE:
+                    messages.warning(request, _("Файл %(name)s слишком большой. Игнорируется.") % {'name': name}, extra_tags='issues')
+                elif reason == REJECT_NOT_IMAGE:
+                    messages.warning(request, _("Файл %(name)s не изображение. Игнорируется.") % {'name': name}, extra_tags='issues')
+
+            for photo in request.FILES.getlist('images'):
+                # Миниатюры строит воркер — ответ не ждёт обработки изображений
+                process_issue_photo.delay(IssuePhoto.objects.create(issue=issue, image=photo).pk)
 
             messages.success(request, _("Ваше обращение успешно зарегистрировано!"), extra_tags='issues')
             return redirect('issues:map')
@@ -329,23 +340,16 @@ def vote_issue(request, issue_id):
     vote_value = request.POST.get('vote')
 
     if vote_value == '0':
-        Vote.objects.filter(user=request.user, issue=issue).delete()
-        user_vote = None
+        value = None
     elif vote_value in ['1', '-1']:
         value = int(vote_value)
-        Vote.objects.update_or_create(
-            user=request.user,
-            issue=issue,
-            defaults={'value': value}
-        )
-        user_vote = value
     else:
         return JsonResponse({
             'success': False,
             'error': gettext('Голос должен быть +1, -1 или 0 (отмена).')
         }, status=400)
 
-    rating = issue.votes.aggregate(rating_sum=Sum('value'))['rating_sum'] or 0
+    rating, user_vote = apply_vote(request.user, issue, value)
 
     return JsonResponse({
         'success': True,
@@ -356,70 +360,200 @@ def vote_issue(request, issue_id):
 
 
 @login_required
+@conditional_on_dataset()
 def get_issues_geojson(request):
-    """Возвращает GeoJSON с данными об обращениях для карты с учетом фильтров"""
+    """
+    Возвращает GeoJSON с данными об обращениях для карты с учетом фильтров.
+
+    Необязательные параметры:
+    - bbox=west,south,east,north — только обращения в видимой области карты
+      (пространственный фильтр по GiST-индексу на Issue.location);
+    - zoom — на мелких масштабах вместо точек возвращаются кластеры
+      (количество, центроид и разбивка по статусам);
+    - since — sync_token из предыдущего ответа с теми же фильтрами: вернутся
+      только изменённые с тех пор точки и в 'deleted' — id точек, которые нужно
+      убрать. Если изменения восстановить нельзя (токен устарел, кластеры),
+      ответ полный и 'full' равно true.
+    """
     category = request.GET.get('category')
     status = request.GET.get('status')
     search = request.GET.get('search', '').strip()
 
-    issues = Issue.objects.select_related('reporter').annotate(
-        vote_rating=Sum('votes__value', default=0)
-    )
+    try:
+        bbox = parse_bbox(request.GET.get('bbox'))
+        zoom = parse_zoom(request.GET.get('zoom'))
+    except (ValueError, TypeError):
+        return JsonResponse({
+            "error": gettext("Параметры 'bbox' и 'zoom' заданы некорректно.")
+        }, status=400)
+
+    since = None
+    if request.GET.get('since'):
+        try:
+            since = parse_token(request.GET['since'])
+        except ValueError:
+            return JsonResponse({
+                "error": gettext("Параметр 'since' задан некорректно.")
+            }, status=400)
 
-    if category and category in dict(ISSUE_CATEGORY_CHOICES).keys():
-        issues = issues.filter(category=category)
+    # Токен выдаётся до чтения данных: изменения, попавшие между ними, придут повторно
+    sync_token = issue_token()
+    issues = Issue.objects.all()
 
-    if status and status in dict(Issue.STATUS_CHOICES).keys():
-        issues = issues.filter(status=status)
+    if bbox is not None:
+        issues = issues.filter(location__contained=bbox)
 
-    if search:
-        issues = issues.filter(
-            Q(title__icontains=search) |
-            Q(description__icontains=search) |
-            Q(reporter__email__icontains=search) |
-            Q(reporter__first_name__icontains=search) |
-            Q(reporter__last_name__icontains=search)
-        )
+    issues = apply_issue_filters(issues, category, status, search)
 
-    features = []
-    for issue in issues:
-        if issue.location:
-            feature = {
+    if should_cluster(zoom):
+        features = [
+            {
                 'type': 'Feature',
                 'geometry': {
                     'type': 'Point',
-                    'coordinates': [issue.location.x, issue.location.y]
+                    'coordinates': [cluster['lon'], cluster['lat']]
                 },
                 'properties': {
-                    'id': issue.id,
-                    'title': issue.title,
-                    'status': issue.status,
-                    'status_display': issue.get_status_display(),
-                    'category': issue.category,
-                    'category_display': issue.get_category_display(),
-                    'vote_rating': issue.vote_rating,
-                    'photos_count': issue.photos.count(),
-                    'url': reverse('issues:issue_detail', args=[issue.id])
+                    'cluster': True,
+                    'count': cluster['count'],
+                    'statuses': cluster['statuses'],
                 }
             }
-            features.append(feature)
+            for cluster in cluster_issues(issues, zoom, Issue.STATUS_CHOICES)
+        ]
+        return JsonResponse({
+            'type': 'FeatureCollection',
+            'features': features,
+            'sync_token': sync_token,
+            'full': True,
+        })
+
+    deleted = []
+    if since is not None and not is_expired(since):
+        issues, deleted = changes_since(issues, since)
+    else:
+        since = None
+
+    if since is not None and not deleted and not issues.exists():
+        # Изменений нет — прежний токен: URL следующего опроса не меняется
+        # и повторный запрос с If-None-Match получит 304
+        sync_token = request.GET['since']
+
+    if get_geojson_engine() == ENGINE_DATABASE:
+        # FeatureCollection собирает PostgreSQL — строка целиком уходит одним ответом
+        return HttpResponse(
+            feature_collection_bytes(issues, deleted, sync_token, full=since is None),
+            content_type='application/json'
+        )
 
     geojson = {
         'type': 'FeatureCollection',
-        'features': features
+        'features': issue_features(issues),
+        'deleted': deleted,
+        'sync_token': sync_token,
+        'full': since is None,
     }
 
     return JsonResponse(geojson)
 
 
-@method_decorator(login_required, name='dispatch')
+@login_required
+def export_issues(request):
+    """
+    Выгрузка всех обращений для открытых данных потоком (постоянная память):
+    ?format=geojsonseq|ndjson|csv и те же фильтры, что у карты (category, status, search).
+    """
+    fmt = request.GET.get('format', FORMAT_GEOJSONSEQ)
+    if fmt not in FORMATS:
+        return JsonResponse({
+            "error": gettext("Параметр 'format' должен быть одним из: %(formats)s.") % {
+                'formats': ', '.join(FORMATS)
+            }
+        }, status=400)
+
+    issues = apply_issue_filters(
+        Issue.objects.all(),
+        request.GET.get('category'),
+        request.GET.get('status'),
+        request.GET.get('search', '').strip(),
+    )
+    response = StreamingHttpResponse(stream_export(issues, fmt), content_type=FORMATS[fmt][0])
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(fmt, timezone.now())}"'
+    return response
+
+
+@login_required
+def issue_tile(request, z, x, y):
+    """Векторный тайл (MVT) с обращениями: статус, категория, рейтинг и число фото"""
+    if not is_valid_tile(z, x, y):
+        raise Http404
+
+    tile = get_tile(z, x, y)
+    if not tile:
+        return HttpResponse(status=204)
+    return HttpResponse(tile, content_type=TILE_CONTENT_TYPE)
+
+
+@login_required
+def geocoding_metrics(request):
+    """Метрики лимитера Nominatim (очередь, ожидание, объединённые запросы) и попадания в кэш"""
+    if request.user.role != 'official':
+        return JsonResponse({
+            'success': False,
+            'error': gettext('Метрики доступны только должностным лицам.')
+        }, status=403)
+    return JsonResponse({**get_throttle_metrics(), 'cache': get_cache_stats()})
+
+
+def _analytics_params(request):
+    category = request.GET.get('category', '')
+    if category not in dict(ISSUE_CATEGORY_CHOICES):
+        category = None
+    return parse_period(request.GET.get('days')), category
+
+
+@login_required
+def analytics_dashboard(request):
+    """Дашборд должностного лица: создано и решено по дням и категориям, время решения"""
+    if request.user.role != 'official':
+        messages.error(request, _("Аналитика доступна только должностным лицам."))
+        return redirect('issues:map')
+
+    days, category = _analytics_params(request)
+    analytics = get_analytics(days, category)
+    peak = max([max(day['opened'], day['resolved']) for day in analytics['daily']] + [1])
+    return render(request, 'issues/analytics.html', {
+        'analytics': analytics,
+        'daily_peak': peak,
+        'periods': PERIOD_CHOICES,
+        'categories': ISSUE_CATEGORY_CHOICES,
+        'selected_days': days,
+        'selected_category': category or '',
+    })
+
+
+@login_required
+def analytics_api(request):
+    """Те же показатели в JSON (?days=7|30|90|365&category=...)"""
+    if request.user.role != 'official':
+        return JsonResponse({
+            'success': False,
+            'error': gettext('Аналитика доступна только должностным лицам.')
+        }, status=403)
+    days, category = _analytics_params(request)
+    return JsonResponse(get_analytics(days, category))
+
+
+# Асинхронные API геокодирования: под ASGI ожидание ответа Nominatim
+# не занимает поток воркера (см. Map_of_local_issues/asgi.py)
+@method_decorator(login_required, name='get')
 class GeocodeAPIView(View):
-    def get(self, request):
+    async def get(self, request):
         q = request.GET.get("q", "").strip()
         if not q:
             return JsonResponse({"error": gettext("Параметр 'q' обязателен.")}, status=400)
 
-        result = geocode_address(q)
+        result = await ageocode_address(q)
         if result:
             display_name, point = result
             return JsonResponse({
@@ -430,9 +564,9 @@ class GeocodeAPIView(View):
         return JsonResponse({"error": gettext("Адрес не найден.")}, status=404)
 
 
-@method_decorator(login_required, name='dispatch')
+@method_decorator(login_required, name='get')
 class ReverseGeocodeAPIView(View):
-    def get(self, request):
+    async def get(self, request):
         try:
             lat = float(request.GET.get("lat"))
             lon = float(request.GET.get("lon"))
@@ -441,18 +575,18 @@ class ReverseGeocodeAPIView(View):
                 "error": gettext("Параметры 'lat' и 'lon' обязательны и должны быть числами.")
             }, status=400)
 
-        address = reverse_geocode(lat, lon)
+        address = await areverse_geocode(lat, lon)
         if address:
             return JsonResponse({"address": address})
         return JsonResponse({"error": gettext("Не удалось определить адрес.")}, status=404)
 
 
-@method_decorator(login_required, name='dispatch')
+@method_decorator(login_required, name='get')
 class SearchAddressAPIView(View):
-    def get(self, request):
+    async def get(self, request):
         q = request.GET.get("q", "").strip()
         if len(q) < 2:
             return JsonResponse({"results": []})
 
-        results = search_address(q, limit=5)
-        return JsonResponse({"results": results})
\ No newline at end of file
+        results = await asearch_address(q, limit=5)
+        return JsonResponse({"results": results})
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from jobs.models import Job
+from jobs.queue import get_stats
+
+
+class Command(BaseCommand):
+    help = "Показывает размер очереди фоновых задач и последние ошибки"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', type=int, default=10, help="Сколько последних упавших задач показать")
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        self.stdout.write(
+            f"В очереди: {stats['pending']}, выполняется: {stats['running']}, "
+            f"выполнено: {stats['done']}, с ошибкой: {stats['failed']}"
+        )
+        self.stdout.write(f"Самая старая задача ждёт: {stats['oldest_pending_age']:.0f}с")
+
+        failed = Job.objects.filter(status=Job.STATUS_FAILED).order_by('-finished_at')[:options['failed']]
+        for job in failed:
+            last_line = job.last_error.strip().splitlines()[-1] if job.last_error else ''
+            self.stdout.write(self.style.ERROR(f"#{job.pk} {job.name} ({job.attempts} попыток): {last_line}"))
@@ -0,0 +1,49 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.queue import purge_done, requeue_stale, run_pending, worker_id
+
+POLL_INTERVAL = 1.0
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер фоновых задач. Запускается отдельным процессом; несколько воркеров "
+        "могут работать параллельно — задачи разбираются без пересечений."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', help="Выполнить готовые задачи и выйти")
+        parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL)
+
+    def handle(self, *args, **options):
+        worker = worker_id()
+        if options['burst']:
+            done = run_pending(worker=worker)
+            self.stdout.write(self.style.SUCCESS(f"Выполнено задач: {done}"))
+            return
+
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        self.stdout.write(f"Воркер {worker} запущен")
+
+        last_maintenance = 0.0
+        while not self._stopping:
+            close_old_connections()
+            if time.monotonic() - last_maintenance > MAINTENANCE_INTERVAL:
+                requeue_stale()
+                purge_done()
+                last_maintenance = time.monotonic()
+            # По одной задаче, чтобы SIGTERM дожидался только текущей
+            if not run_pending(limit=1, worker=worker):
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(f"Воркер {worker} остановлен")
+
+    def _stop(self, signum, frame):
+        self._stopping = True
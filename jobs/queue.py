@@ -0,0 +1,186 @@
+"""
+Очередь фоновых задач в PostgreSQL.
+
+Задачи объявляются декоратором @task в <app>/tasks.py и ставятся в очередь
+через .delay(). Воркеры (команда run_jobs) забирают их SELECT ... FOR UPDATE
+SKIP LOCKED, поэтому несколько процессов не получат одну задачу. Упавшая
+задача повторяется с экспоненциальной задержкой, после max_attempts остаётся
+в статусе FAILED (видна в админке и в команде jobs_status).
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# === КОНСТАНТЫ ===
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE = 10  # секунд до первого повтора
+BACKOFF_MAX = 3600
+LOCK_TIMEOUT = 600  # задача в RUNNING дольше — воркер считается упавшим
+KEEP_DONE = timedelta(days=7)
+STALE_ERROR = "Воркер остановился во время выполнения задачи (превышен JOBS_LOCK_TIMEOUT)"
+
+_registry: Dict[str, 'Task'] = {}
+
+
+class Task:
+    def __init__(self, fn: Callable, name: str, max_attempts: int):
+        self.fn = fn
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+    def delay(self, *args, countdown: int = 0, **kwargs) -> Job:
+        """
+        Ставит задачу в очередь. Аргументы должны сериализоваться в JSON;
+        countdown — через сколько секунд задачу можно выполнять.
+        """
+        return enqueue(self.name, *args, max_attempts=self.max_attempts, countdown=countdown, **kwargs)
+
+
+def task(name: Optional[str] = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+    def decorator(fn):
+        registered = Task(fn, name or f"{fn.__module__}.{fn.__name__}", max_attempts)
+        _registry[registered.name] = registered
+        return registered
+    return decorator
+
+
+def enqueue(name: str, *args, max_attempts: int = DEFAULT_MAX_ATTEMPTS, countdown: int = 0, **kwargs) -> Job:
+    # Строка в той же транзакции, что и запрос: откат запроса отменяет и задачу
+    return Job.objects.create(
+        name=name, args=list(args), kwargs=kwargs, max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=countdown),
+    )
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def backoff(attempts: int) -> timedelta:
+    """Задержка перед повтором: base·2^(n-1) с ограничением сверху и 10% разброса."""
+    base = _setting('JOBS_BACKOFF_BASE', BACKOFF_BASE)
+    delay = min(base * 2 ** (attempts - 1), _setting('JOBS_BACKOFF_MAX', BACKOFF_MAX))
+    return timedelta(seconds=delay * (1 + random.random() * 0.1))
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker: Optional[str] = None) -> Optional[Job]:
+    """Забирает следующую готовую задачу и помечает её RUNNING."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.STATUS_PENDING, run_at__lte=now)
+            .order_by('run_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.STATUS_RUNNING
+        job.attempts += 1
+        job.locked_at = now
+        job.locked_by = worker or worker_id()
+        job.save(update_fields=['status', 'attempts', 'locked_at', 'locked_by'])
+    return job
+
+
+def run_job(job: Job) -> bool:
+    """Выполняет задачу; при ошибке планирует повтор или помечает FAILED."""
+    registered = _registry.get(job.name)
+    try:
+        if registered is None:
+            raise LookupError(f"Задача {job.name} не зарегистрирована")
+        registered.fn(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        job.locked_at = None
+        if registered is None or job.attempts >= job.max_attempts:
+            job.status = Job.STATUS_FAILED
+            job.finished_at = timezone.now()
+            logger.error(f"Задача {job} не выполнена после {job.attempts} попыток")
+        else:
+            job.status = Job.STATUS_PENDING
+            job.run_at = timezone.now() + backoff(job.attempts)
+            logger.warning(f"Задача {job} упала, повтор в {job.run_at:%H:%M:%S}")
+        job.save(update_fields=['status', 'last_error', 'locked_at', 'run_at', 'finished_at'])
+        return False
+
+    job.status = Job.STATUS_DONE
+    job.finished_at = timezone.now()
+    job.locked_at = None
+    job.save(update_fields=['status', 'finished_at', 'locked_at'])
+    return True
+
+
+def run_pending(limit: Optional[int] = None, worker: Optional[str] = None) -> int:
+    """Выполняет готовые задачи, пока они есть (или limit штук). Возвращает число выполненных."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def requeue_stale() -> int:
+    """
+    Возвращает в очередь задачи, зависшие в RUNNING (воркер убит посреди выполнения).
+    Прерванный запуск — тоже попытка (attempts увеличен ещё в claim): задача,
+    которая каждый раз роняет воркер (например, по памяти), после max_attempts
+    помечается FAILED, а не возвращается в очередь бесконечно.
+    """
+    now = timezone.now()
+    deadline = now - timedelta(seconds=_setting('JOBS_LOCK_TIMEOUT', LOCK_TIMEOUT))
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=deadline)
+
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.STATUS_FAILED, locked_at=None, finished_at=now, last_error=STALE_ERROR
+    )
+    if failed:
+        logger.error(f"{failed} зависших задач помечены FAILED после max_attempts попыток")
+    return stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.STATUS_PENDING, locked_at=None, locked_by=''
+    )
+
+
+def purge_done() -> int:
+    deleted, _ = Job.objects.filter(
+        status=Job.STATUS_DONE, finished_at__lt=timezone.now() - KEEP_DONE
+    ).delete()
+    return deleted
+
+
+def get_stats() -> Dict:
+    """Число задач по статусам и возраст самой старой задачи в очереди (секунды)."""
+    from django.db.models import Count, Min
+
+    counts = dict(Job.objects.values_list('status').annotate(total=Count('id')).order_by())
+    oldest = Job.objects.filter(status=Job.STATUS_PENDING).aggregate(oldest=Min('run_at'))['oldest']
+    return {
+        'pending': counts.get(Job.STATUS_PENDING, 0),
+        'running': counts.get(Job.STATUS_RUNNING, 0),
+        'done': counts.get(Job.STATUS_DONE, 0),
+        'failed': counts.get(Job.STATUS_FAILED, 0),
+        'oldest_pending_age': max((timezone.now() - oldest).total_seconds(), 0) if oldest else 0,
+    }
@@ -1,62 +1,62 @@
 
 document.addEventListener('DOMContentLoaded', function() {
     
-    const voteButtons = document.querySelectorAll('.vote-btn');
-    voteButtons.forEach(button => {
-        button.addEventListener('click', function() {
-            const issueId = this.dataset.issueId;
-            const voteType = parseInt(this.dataset.voteType);
-            const isUpvote = this.classList.contains('upvote');
-            const isDownvote = this.classList.contains('downvote');
-
-            const upBtn = this.closest('.vote-buttons').querySelector('.upvote');
-            const downBtn = this.closest('.vote-buttons').querySelector('.downvote');
-            const isCurrentlyUpvoted = upBtn.classList.contains('active');
-            const isCurrentlyDownvoted = downBtn.classList.contains('active');
-
-            let voteValue = null;
-            if ((isUpvote && isCurrentlyUpvoted) || (isDownvote && isCurrentlyDownvoted)) {
-                voteValue = '0'; 
-            } else {
-                voteValue = voteType.toString();
+    // Делегирование: карточки подгружаются при прокрутке и после фильтрации
+    document.addEventListener('click', function(e) {
+        const button = e.target.closest('.issue-card .vote-btn');
+        if (!button) return;
+        const issueId = button.dataset.issueId;
+        const voteType = parseInt(button.dataset.voteType);
+        const isUpvote = button.classList.contains('upvote');
+        const isDownvote = button.classList.contains('downvote');
+
+        const upBtn = button.closest('.vote-buttons').querySelector('.upvote');
+        const downBtn = button.closest('.vote-buttons').querySelector('.downvote');
+        const isCurrentlyUpvoted = upBtn.classList.contains('active');
+        const isCurrentlyDownvoted = downBtn.classList.contains('active');
+
+        let voteValue = null;
+        if ((isUpvote && isCurrentlyUpvoted) || (isDownvote && isCurrentlyDownvoted)) {
+            voteValue = '0'; 
+        } else {
+            voteValue = voteType.toString();
+        }
+
+        const formData = new FormData();
+        const csrf = document.querySelector('[name=csrfmiddlewaretoken]').value;
+        formData.append('csrfmiddlewaretoken', csrf);
+        formData.append('vote', voteValue);
+
+        upBtn.disabled = true;
+        downBtn.disabled = true;
+
+        fetch(`/issues/${issueId}/vote/`, {
+            method: 'POST',
+            body: formData,
+            redirect: 'follow',
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        })
+        .then(r => r.json().then(data => r.ok ? data : Promise.reject(data)))
+        .then(data => {
+            const ratingElement = button.closest('.issue-card').querySelector('.vote-rating');
+            if (ratingElement) {
+                ratingElement.textContent = data.rating;
             }
 
-            const formData = new FormData();
-            const csrf = document.querySelector('[name=csrfmiddlewaretoken]').value;
-            formData.append('csrfmiddlewaretoken', csrf);
-            formData.append('vote', voteValue);
-
-            upBtn.disabled = true;
-            downBtn.disabled = true;
-
-            fetch(`/issues/${issueId}/vote/`, {
-                method: 'POST',
-                body: formData,
-                redirect: 'follow',
-                headers: { 'X-Requested-With': 'XMLHttpRequest' }
-            })
-            .then(r => r.json().then(data => r.ok ? data : Promise.reject(data)))
-            .then(data => {
-                const ratingElement = this.closest('.issue-card').querySelector('.vote-rating');
-                if (ratingElement) {
-                    ratingElement.textContent = data.rating;
-                }
-
-                if (upBtn) {
-                    upBtn.classList.toggle('active', data.user_vote === 1);
-                }
-                if (downBtn) {
-                    downBtn.classList.toggle('active', data.user_vote === -1);
-                }
-            })
-            .catch(err => {
-                console.error('Vote error:', err);
-                alert(err.error || 'Ошибка голосования.');
-            })
-            .finally(() => {
-                if (upBtn) upBtn.disabled = false;
-                if (downBtn) downBtn.disabled = false;
-            });
+            if (upBtn) {
+                upBtn.classList.toggle('active', data.user_vote === 1);
+            }
+            if (downBtn) {
+                downBtn.classList.toggle('active', data.user_vote === -1);
+            }
+        })
+        .catch(err => {
+            console.error('Vote error:', err);
+            alert(err.error || 'Ошибка голосования.');
+        })
+        .finally(() => {
+            if (upBtn) upBtn.disabled = false;
+            if (downBtn) downBtn.disabled = false;
         });
     });
 
@@ -125,23 +125,21 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     
-    const photoThumbnails = document.querySelectorAll('.photo-thumbnail');
-    photoThumbnails.forEach(thumbnail => {
-        thumbnail.addEventListener('click', function(e) {
-            if (e.target.tagName === 'IMG') {
-                const img = e.target;
-                const photoCard = this.closest('.issue-card');
-                if (photoCard) {
-                    
-                    const allPhotosInCard = photoCard.querySelectorAll('.photo-thumbnail img');
-                    const urlsArray = Array.from(allPhotosInCard).map(photoImg => photoImg.src);
-                    const clickedPhotoIndex = Array.from(allPhotosInCard).indexOf(img);
-
-                    
-                    openPhotoModal(clickedPhotoIndex, urlsArray);
-                }
-            }
-        });
+    document.addEventListener('click', function(e) {
+        const thumbnail = e.target.closest('.photo-thumbnail');
+        if (!thumbnail || e.target.tagName !== 'IMG') return;
+
+        const img = e.target;
+        const photoCard = thumbnail.closest('.issue-card');
+        if (photoCard) {
+            
+            const allPhotosInCard = photoCard.querySelectorAll('.photo-thumbnail img');
+            const urlsArray = Array.from(allPhotosInCard).map(photoImg => photoImg.dataset.full || photoImg.src);
+            const clickedPhotoIndex = Array.from(allPhotosInCard).indexOf(img);
+
+            
+            openPhotoModal(clickedPhotoIndex, urlsArray);
+        }
     });
 
     
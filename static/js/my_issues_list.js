@@ -75,7 +75,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (photoCard) {
                     
                     const allPhotosInCard = photoCard.querySelectorAll('.photo-thumbnail img');
-                    const urlsArray = Array.from(allPhotosInCard).map(photoImg => photoImg.src);
+                    const urlsArray = Array.from(allPhotosInCard).map(photoImg => photoImg.dataset.full || photoImg.src);
                     const clickedPhotoIndex = Array.from(allPhotosInCard).indexOf(img);
 
                     
@@ -0,0 +1,32 @@
+"""
+Проверка бюджета SQL-запросов view (settings.QUERY_BUDGETS) в тестах.
+
+    class MapQueriesTest(QueryBudgetMixin, TestCase):
+        def test_map(self):
+            self.assertWithinQueryBudget('get', reverse('issues:map'))
+
+Бюджет берётся по имени view из resolver_match ответа; превышение роняет тест
+со списком выполненных запросов — так N+1 в view и шаблонах видно сразу.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from Map_of_local_issues.instrumentation import get_query_budget
+
+
+class QueryBudgetMixin:
+    def assertWithinQueryBudget(self, method, path, data=None, budget=None, **extra):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data, **extra)
+
+        view_name = response.resolver_match.view_name if response.resolver_match else path
+        if budget is None:
+            budget = get_query_budget(view_name)
+        if budget is None:
+            self.fail(f"Для {view_name} не задан бюджет в settings.QUERY_BUDGETS")
+        if len(queries) > budget:
+            executed = "\n".join(
+                f"{number}. {query['sql']}" for number, query in enumerate(queries.captured_queries, 1)
+            )
+            self.fail(f"{view_name}: {len(queries)} SQL-запросов при бюджете {budget}\n{executed}")
+        return response
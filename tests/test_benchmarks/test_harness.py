@@ -0,0 +1,81 @@
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db.models import Count, Q
+from django.test import TestCase, override_settings
+
+from benchmarks import dataset, runner
+from issues.models import Issue, IssueDailyStats, Vote
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BenchmarkHarnessTest(TestCase):
+    """Генератор набора данных и прогон сценариев на маленьком наборе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counts = dataset.seed(issues=40, votes=300, photos=10, citizens=15, officials=2, seed_value=7)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_seed_counts_and_consistent_vote_counters(self):
+        self.assertEqual(self.counts, {'users': 17, 'issues': 40, 'votes': 300, 'photos': 10})
+        issues = Issue.objects.annotate(
+            ups=Count('votes', filter=Q(votes__value=Vote.VOTE_UP)),
+            downs=Count('votes', filter=Q(votes__value=Vote.VOTE_DOWN)),
+        )
+        for issue in issues:
+            self.assertEqual(
+                (issue.upvotes, issue.downvotes, issue.rating),
+                (issue.ups, issue.downs, issue.ups - issue.downs),
+            )
+        self.assertFalse(Issue.objects.filter(status=Issue.STATUS_RESOLVED, resolved_at__isnull=True).exists())
+        self.assertTrue(IssueDailyStats.objects.exists())
+
+    def test_reset_removes_only_bench_data(self):
+        self.assertEqual(dataset.reset(), 40)
+        self.assertFalse(dataset.bench_users().exists())
+        self.assertFalse(Vote.objects.exists())
+
+    def test_run_reports_latency_and_queries(self):
+        output = Path(tempfile.mkdtemp()) / 'result.json'
+        self.addCleanup(shutil.rmtree, output.parent, ignore_errors=True)
+        out = io.StringIO()
+        call_command(
+            'bench_run', '--requests', '5', '--nominatim-latency', '0', '--output', str(output),
+            stdout=out,
+        )
+
+        report = json.loads(output.read_text(encoding='utf-8'))
+        self.assertEqual(report['dataset']['issues'], 40)
+        self.assertEqual(set(report['scenarios']), set(runner.SCENARIOS))
+        for name, result in report['scenarios'].items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertEqual(result['requests'], 5)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries_max'], 0, name)
+
+        lines = runner.compare(report, report)
+        self.assertIn("(+0%)", lines[2])
+
+    def test_revalidation_hits(self):
+        user = dataset.first_citizen()
+        ctx = {'issue_ids': dataset.sample_issue_ids(seed_value=7)}
+        result = runner.run_scenario('geojson_revalidate', user, ctx, total=30, concurrency=1, seed_value=7)
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['hit_rate'], 0)
+
+    def test_percentile(self):
+        values = sorted(float(n) for n in range(1, 101))
+        self.assertEqual(runner.percentile(values, 0.5), 51.0)
+        self.assertEqual(runner.percentile(values, 0.99), 99.0)
+        self.assertEqual(runner.percentile([], 0.95), 0.0)
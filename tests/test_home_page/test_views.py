@@ -39,6 +39,33 @@ class HomePageViewTest(TestCase):
         self.assertEqual(context['issues_in_progress'], 1)
         self.assertEqual(context['issues_resolved'], 1)
 
+    def test_home_view_stats_are_cached(self):
+        """Повторный просмотр главной не обращается к базе за счётчиками."""
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+
+        stats = response.context['stats']
+        self.assertEqual(stats['total'], 2)
+        self.assertEqual(stats['created_recently'], 2)
+        self.assertEqual(stats['resolved_recently'], 1)
+        by_category = {item['category']: item['count'] for item in stats['by_category']}
+        self.assertEqual(by_category['roads'], 2)
+
+    def test_home_view_stats_invalidated_on_issue_change(self):
+        self.client.get(reverse('home'))
+        issue = Issue.objects.get(title="В работе")
+        issue.status = Issue.STATUS_RESOLVED
+        issue.save()
+
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['issues_in_progress'], 0)
+        self.assertEqual(response.context['issues_resolved'], 2)
+
+        issue.delete()
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['issues_resolved'], 1)
+
     def test_about_site(self):
         """GET /about/ → 200, использует шаблон 'about_site.html'."""
         response = self.client.get(reverse('about_site'))
@@ -0,0 +1,53 @@
+import subprocess
+import sys
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from Map_of_local_issues.cache import Namespace, get_stats, reset_stats
+from issues.modules import geocoding
+
+
+class CacheNamespaceTest(SimpleTestCase):
+    """Области кэша: стабильные версионированные ключи, TTL и счётчики."""
+
+    def setUp(self):
+        cache.clear()
+        reset_stats()
+
+    def test_key_is_stable_across_processes(self):
+        # hash() строк солится на процесс — ключ должен от него не зависеть
+        code = (
+            "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Map_of_local_issues.settings');"
+            "import django; django.setup();"
+            "from issues.modules.geocoding import _search_cache_key;"
+            "print(_search_cache_key('ул. Ленина', 5))"
+        )
+        other = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(other.stdout.strip(), geocoding._search_cache_key("ул. Ленина", 5))
+
+    def test_normalized_queries_share_key(self):
+        self.assertEqual(
+            geocoding._search_cache_key("  УЛ. Ленина ", 5),
+            geocoding._search_cache_key("ул. ленина", 5),
+        )
+
+    def test_version_changes_key(self):
+        self.assertNotEqual(Namespace("test.v", 60).key("a"), Namespace("test.v", 60, version=2).key("a"))
+
+    def test_hit_miss_counters(self):
+        ns = Namespace("test.stats", 60)
+        key = ns.key("x")
+        self.assertIsNone(ns.get(key))
+        ns.set(key, 0)
+        # Ложные значения — тоже попадания
+        self.assertEqual(ns.get(key), 0)
+
+        stats = get_stats()["test.stats"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    @override_settings(CACHE_TTLS={"test.ttl": 5})
+    def test_ttl_override_from_settings(self):
+        self.assertEqual(Namespace("test.ttl", 60).timeout, 5)
+        self.assertEqual(Namespace("test.other", 60).timeout, 60)
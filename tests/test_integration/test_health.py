@@ -0,0 +1,21 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+
+class HealthCheckTest(TestCase):
+    """Проверка живости: база и кэш, без входа и без кэширования ответа."""
+
+    def test_healthy(self):
+        response = self.client.get(reverse('health_check'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok', 'database': 'ok', 'cache': 'ok'})
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_cache_failure_returns_503(self):
+        with mock.patch('Map_of_local_issues.health.cache.set', side_effect=ConnectionError("redis недоступен")):
+            response = self.client.get(reverse('health_check'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['cache'], 'error')
+        self.assertEqual(response.json()['database'], 'ok')
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.gis.geos import Point
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from issues.models import Comment, Issue, IssuePhoto
+from tests.query_budget import QueryBudgetMixin
+from tests.test_issues.test_geocoding import FakeNominatimMixin
+from users.models import CustomUser
+
+
+class RequestMetricsTest(FakeNominatimMixin, TestCase):
+    """Метрики запроса: SQL, кэш и геокодирование в логе и Server-Timing."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(
+            email="citizen@test.com", password="pass123", role="citizen", email_verified=True
+        )
+        self.client.login(email="citizen@test.com", password="pass123")
+
+    def _logged(self, path, data=None, level='INFO'):
+        with self.assertLogs('request_metrics', level) as logs:
+            response = self.client.get(path, data)
+        return response, json.loads(logs.records[-1].getMessage())
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('issues:map'))
+        header = response['Server-Timing']
+        self.assertIn('db;dur=', header)
+        self.assertIn('queries"', header)
+        self.assertIn('total;dur=', header)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('issues:map')))
+
+    def test_structured_log_record(self):
+        response, record = self._logged(reverse('issues:map'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(record['view'], 'issues:map')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreaterEqual(record['db_ms'], 0)
+
+    def test_geocoding_time_is_recorded(self):
+        _, record = self._logged(reverse('issues:geocode_api'), {'q': 'ул. Чехова, 3'})
+        self.assertEqual(record['geocoding_calls'], 1)
+        self.assertGreater(record['geocoding_ms'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+
+        # Повторный запрос отвечает из кэша, без Nominatim
+        _, record = self._logged(reverse('issues:geocode_api'), {'q': 'ул. Чехова, 3'})
+        self.assertEqual(record['geocoding_calls'], 0)
+        self.assertGreater(record['cache_hits'], 0)
+
+    @override_settings(QUERY_BUDGETS={'issues:map': 1})
+    def test_budget_overrun_is_logged_as_warning(self):
+        _, record = self._logged(reverse('issues:map'), level='WARNING')
+        self.assertEqual(record['query_budget'], 1)
+        self.assertGreater(record['queries'], 1)
+
+    async def test_async_view_is_not_adapted_to_sync(self):
+        """
+        Под ASGI middleware не переводят цепочку в поток: async view выполняется
+        в той же задаче, что и запрос, а не через async_to_sync.
+        """
+        request_task = asyncio.current_task()
+        view_tasks = []
+
+        async def geocode(query):
+            view_tasks.append(asyncio.current_task())
+            return "ул. Мира, 1", Point(69.0, 61.0, srid=4326)
+
+        await self.async_client.aforce_login(self.user)
+        with self.assertLogs('request_metrics', 'INFO') as logs, patch('issues.views.ageocode_address', geocode):
+            response = await self.async_client.get(reverse('issues:geocode_api'), {'q': 'ул. Мира'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(view_tasks, [request_task])
+        self.assertEqual(json.loads(logs.records[-1].getMessage())['view'], 'issues:geocode_api')
+
+    async def test_async_request_counts_queries_of_sync_view(self):
+        """
+        Под ASGI sync view выполняется в потоке sync_to_async со своим соединением —
+        его запросы тоже входят в метрики и бюджет.
+        """
+        await self.async_client.aforce_login(self.user)
+        with self.assertLogs('request_metrics', 'INFO') as logs:
+            response = await self.async_client.get(reverse('issues:map'))
+
+        self.assertEqual(response.status_code, 200)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'issues:map')
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['db_ms'], 0)
+
+    @override_settings(QUERY_BUDGETS={'issues:map': 1})
+    async def test_async_request_budget_overrun_is_logged(self):
+        await self.async_client.aforce_login(self.user)
+        with self.assertLogs('request_metrics', 'WARNING') as logs:
+            await self.async_client.get(reverse('issues:map'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['query_budget'], 1)
+        self.assertGreater(record['queries'], 1)
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Число запросов основных страниц не растёт с числом обращений, фото и комментариев."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = CustomUser.objects.create_user(
+            email="citizen@test.com", password="pass123", role="citizen", email_verified=True
+        )
+        cls.official = CustomUser.objects.create_user(
+            email="official@test.com", password="pass123", role="official", email_verified=True
+        )
+        for n in range(12):
+            issue = Issue.objects.create(
+                title=f"Обращение {n}", description="...", location=Point(69.02 + n / 1000, 61.0),
+                reporter=cls.citizen, assigned_to=cls.official,
+                status=Issue.STATUS_IN_PROGRESS if n % 2 else Issue.STATUS_RESOLVED,
+            )
+            for _ in range(2):
+                IssuePhoto.objects.create(issue=issue, image=ContentFile(b"jpeg", name="p.jpg"))
+                Comment.objects.create(issue=issue, author=cls.official, text="Принято")
+        cls.issue = issue
+
+    def setUp(self):
+        self.client.login(email="citizen@test.com", password="pass123")
+
+    def test_map(self):
+        self.assertWithinQueryBudget('get', reverse('issues:map'))
+
+    def test_map_geojson(self):
+        self.assertWithinQueryBudget('get', reverse('issues:map_geojson'))
+        self.assertWithinQueryBudget('get', reverse('issues:map_geojson'), {'zoom': 10})
+
+    def test_issue_detail(self):
+        self.assertWithinQueryBudget('get', reverse('issues:issue_detail', args=[self.issue.pk]))
+
+    def test_vote(self):
+        self.assertWithinQueryBudget('post', reverse('issues:vote_issue', args=[self.issue.pk]), {'vote': '1'})
+
+    def test_my_issues(self):
+        self.assertWithinQueryBudget('get', reverse('users:my_issues'))
+        self.client.login(email="official@test.com", password="pass123")
+        self.assertWithinQueryBudget('get', reverse('users:my_issues'))
+
+    def test_home(self):
+        self.assertWithinQueryBudget('get', reverse('home'))
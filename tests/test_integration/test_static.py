@@ -0,0 +1,64 @@
+import io
+import json
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users.models import CustomUser
+
+STATIC_TAG = re.compile(r"{% static '([^']+)' %}")
+
+
+class ManifestStaticFilesTest(TestCase):
+    """
+    В продакшне статика отдаётся из манифеста (CompressedManifestStaticFilesStorage),
+    а ссылка на файл, которого нет в манифесте, — ошибка 500. В тестах по умолчанию
+    StaticFilesStorage, поэтому здесь collectstatic и манифест включаются явно.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.manifest = override_settings(
+            STATIC_ROOT=cls.static_root,
+            STORAGES={
+                **settings.STORAGES,
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+            },
+        )
+        cls.manifest.enable()
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=io.StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.manifest.disable()
+        shutil.rmtree(cls.static_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_templates_reference_collected_files(self):
+        manifest = json.loads((Path(self.static_root) / 'staticfiles.json').read_text())['paths']
+        missing = {
+            f"{template.relative_to(settings.BASE_DIR)}: {name}"
+            for template in (Path(settings.BASE_DIR) / 'templates').rglob('*.html')
+            for name in STATIC_TAG.findall(template.read_text(encoding='utf-8'))
+            if name not in manifest
+        }
+        self.assertEqual(missing, set())
+
+    def test_pages_render(self):
+        CustomUser.objects.create_user(email="static@test.com", password="pass", email_verified=True)
+        self.client.login(email="static@test.com", password="pass")
+
+        self.assertEqual(self.client.get(reverse('about_site')).status_code, 200)
+        # Пустой список обращений — иконка no-issues.svg
+        response = self.client.get(
+            reverse('issues:map'), {'search': 'ничего не найдено'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertContains(response, 'no-issues')
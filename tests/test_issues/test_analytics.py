@@ -0,0 +1,127 @@
+import io
+from datetime import timedelta
+
+from django.contrib.gis.geos import Point
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from issues.models import Issue, IssueDailyStats, IssueStatsDirtyDate
+from issues.modules.analytics import (
+    REFRESH_TASK,
+    bucket_index,
+    empty_histogram,
+    histogram_median_hours,
+    refresh_rollups,
+)
+from jobs.models import Job
+from jobs.queue import run_pending
+from users.models import CustomUser
+
+
+class AnalyticsRollupTest(TestCase):
+    """Дневная сводка для аналитики: инкрементальный пересчёт, медиана, доступ."""
+
+    def setUp(self):
+        self.citizen = CustomUser.objects.create_user(
+            email="citizen@test.com", password="pass123", role="citizen", email_verified=True
+        )
+        self.official = CustomUser.objects.create_user(
+            email="official@test.com", password="pass123", role="official", email_verified=True
+        )
+
+    def _issue(self, category='roads', **kwargs):
+        return Issue.objects.create(
+            title="Обращение", description="...", location=Point(69.0223, 61.0066),
+            reporter=self.citizen, category=category, **kwargs
+        )
+
+    def _resolve(self, issue, hours):
+        now = timezone.now()
+        issue.status = Issue.STATUS_RESOLVED
+        issue.created_at = now - timedelta(hours=hours)
+        issue.resolved_at = now
+        issue.save()
+
+    def test_histogram_median(self):
+        histogram = empty_histogram()
+        for hours in (2, 3, 30):
+            histogram[bucket_index(hours * 3600)] += 1
+        # Два значения в корзине 1–4 ч: медиана интерполируется внутри неё
+        self.assertEqual(histogram_median_hours(histogram), 3.2)
+        self.assertIsNone(histogram_median_hours(empty_histogram()))
+
+    def test_signals_mark_days_and_schedule_one_refresh(self):
+        self._issue()
+        self._issue(category='water')
+
+        self.assertEqual(IssueStatsDirtyDate.objects.count(), 1)
+        jobs = Job.objects.filter(name=REFRESH_TASK)
+        self.assertEqual(jobs.count(), 1)
+        # Пересчёт отложен, чтобы серия правок уложилась в один запуск
+        self.assertGreater(jobs.get().run_at, timezone.now())
+        self.assertEqual(run_pending(), 0)
+
+        self.assertEqual(refresh_rollups(), 1)
+        self.assertFalse(IssueStatsDirtyDate.objects.exists())
+        counts = dict(IssueDailyStats.objects.values_list('category', 'opened'))
+        self.assertEqual(counts, {'roads': 1, 'water': 1})
+
+    def test_resolution_updates_rollup_incrementally(self):
+        first, second = self._issue(), self._issue()
+        refresh_rollups()
+
+        self._resolve(first, hours=2)
+        self._resolve(second, hours=3)
+        refresh_rollups()
+
+        totals = IssueDailyStats.objects.filter(category='roads').aggregate(
+            opened=Sum('opened'), resolved=Sum('resolved'), seconds=Sum('resolve_seconds_total')
+        )
+        self.assertEqual(totals, {'opened': 2, 'resolved': 2, 'seconds': 5 * 3600})
+
+        self.client.login(email="official@test.com", password="pass123")
+        data = self.client.get(reverse('issues:analytics_api'), {'days': 7}).json()
+        self.assertEqual(data['days'], 7)
+        self.assertEqual(len(data['daily']), 7)
+        self.assertEqual(data['totals']['opened'], 2)
+        self.assertEqual(data['totals']['resolved'], 2)
+        self.assertEqual(data['totals']['mean_resolve_hours'], 2.5)
+        roads = next(item for item in data['by_category'] if item['category'] == 'roads')
+        self.assertEqual(roads['resolved'], 2)
+
+    def test_api_reads_rollup_only(self):
+        self._issue()
+        refresh_rollups()
+        self.client.login(email="official@test.com", password="pass123")
+        # Сессия/пользователь, строки сводки и число дней в очереди — без запросов к Issue
+        with self.assertNumQueries(4):
+            self.client.get(reverse('issues:analytics_api'))
+
+    def test_full_rebuild_command(self):
+        issue = self._issue()
+        # Правка в обход ORM: сигналы не срабатывают, сводку пересобирают командой
+        Issue.objects.filter(pk=issue.pk).update(created_at=timezone.now() - timedelta(days=3))
+        IssueDailyStats.objects.all().delete()
+        IssueStatsDirtyDate.objects.all().delete()
+
+        out = io.StringIO()
+        call_command('refresh_issue_rollups', '--full', stdout=out)
+        self.assertIn("Пересчитано дней: 4", out.getvalue())
+        self.assertEqual(
+            IssueDailyStats.objects.get().date, timezone.localdate() - timedelta(days=3)
+        )
+
+    def test_dashboard_for_officials_only(self):
+        self.client.login(email="citizen@test.com", password="pass123")
+        self.assertEqual(self.client.get(reverse('issues:analytics_api')).status_code, 403)
+        self.assertRedirects(self.client.get(reverse('issues:analytics')), reverse('issues:map'))
+
+        self.client.login(email="official@test.com", password="pass123")
+        response = self.client.get(reverse('issues:analytics'), {'days': 90, 'category': 'roads'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'issues/analytics.html')
+        self.assertEqual(response.context['analytics']['days'], 90)
+        self.assertEqual(response.context['analytics']['category'], 'roads')
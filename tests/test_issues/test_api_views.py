@@ -1,4 +1,4 @@
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.gis.geos import Point
@@ -10,7 +10,7 @@ class GeocodingAPITest(TestCase):
         self.user = CustomUser.objects.create_user(email="apiuser@test.com", password="pass", email_verified=True)
         self.client.login(email="apiuser@test.com", password="pass")
 
-    @patch('issues.views.geocode_address')
+    @patch('issues.views.ageocode_address', new_callable=AsyncMock)
     def test_geocode_api_success(self, mock_geocode):
         mock_geocode.return_value = (
             "ул. Ленина, 10, Ханты-Мансийск",
@@ -21,13 +21,13 @@ class GeocodingAPITest(TestCase):
         data = response.json()
         self.assertEqual(data['address'], "ул. Ленина, 10, Ханты-Мансийск")
 
-    @patch('issues.views.geocode_address')
+    @patch('issues.views.ageocode_address', new_callable=AsyncMock)
     def test_geocode_api_not_found(self, mock_geocode):
         mock_geocode.return_value = None
         response = self.client.get(reverse('issues:geocode_api'), {'q': 'Неизвестная улица 999'})
         self.assertEqual(response.status_code, 404)
 
-    @patch('issues.views.reverse_geocode')
+    @patch('issues.views.areverse_geocode', new_callable=AsyncMock)
     def test_reverse_geocode_api_success(self, mock_reverse):
         mock_reverse.return_value = "ул. Мира, 5"
         response = self.client.get(reverse('issues:reverse_geocode_api'), {'lat': '61.0066', 'lon': '69.0223'})
@@ -35,13 +35,13 @@ class GeocodingAPITest(TestCase):
         data = response.json()
         self.assertEqual(data['address'], "ул. Мира, 5")
 
-    @patch('issues.views.reverse_geocode')
+    @patch('issues.views.areverse_geocode', new_callable=AsyncMock)
     def test_reverse_geocode_api_failure(self, mock_reverse):
         mock_reverse.return_value = None
         response = self.client.get(reverse('issues:reverse_geocode_api'), {'lat': '999', 'lon': '999'})
         self.assertEqual(response.status_code, 404)  # ← твой view возвращает 404 при None
 
-    @patch('issues.views.search_address')
+    @patch('issues.views.asearch_address', new_callable=AsyncMock)
     def test_search_address_api(self, mock_search):
         mock_search.return_value = [
             {"display_name": "ул. Ленина, 1", "lat": 61.0067, "lon": 69.0224},
@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.gis.geos import Point
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from issues.models import Issue
+from issues.modules.export import COLUMNS, RECORD_SEPARATOR
+from users.models import CustomUser
+
+
+class IssueExportTest(TestCase):
+    """Потоковая выгрузка обращений: форматы, фильтры и команда export_issues."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="export@test.com", password="pass", role="citizen", email_verified=True
+        )
+        cls.pothole = Issue.objects.create(
+            title="Яма, глубокая", description="Личное", location=Point(69.0223, 61.0066),
+            reporter=cls.user, address="ул. Мира, 1",
+        )
+        cls.light = Issue.objects.create(
+            title="Фонарь", description="...", location=Point(69.03, 61.01),
+            reporter=cls.user, category="lighting", status=Issue.STATUS_RESOLVED,
+        )
+
+    def setUp(self):
+        self.client.login(email="export@test.com", password="pass")
+
+    def _export(self, **params):
+        response = self.client.get(reverse('issues:export_issues'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_geojsonseq(self):
+        response, body = self._export()
+        self.assertEqual(response['Content-Type'], 'application/geo+json-seq')
+        records = body.split(RECORD_SEPARATOR)
+        self.assertEqual(records[0], '')
+        features = [json.loads(record) for record in records[1:]]
+        self.assertEqual([f['properties']['id'] for f in features], [self.pothole.pk, self.light.pk])
+        self.assertEqual(features[0]['geometry']['coordinates'], [69.0223, 61.0066])
+        self.assertEqual(features[1]['properties']['status'], Issue.STATUS_RESOLVED)
+        self.assertNotIn('description', features[0]['properties'])
+
+    def test_ndjson_with_filters(self):
+        _, body = self._export(format='ndjson', category='lighting')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.light.pk])
+        self.assertEqual(set(rows[0]), set(COLUMNS))
+        self.assertIsNotNone(rows[0]['resolved_at'])
+
+    def test_csv(self):
+        response, body = self._export(format='csv', search='яма')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], "Яма, глубокая")
+        self.assertEqual(float(rows[0]['lat']), 61.0066)
+
+    def test_streams_in_blocks(self):
+        with patch('issues.modules.export.STREAM_BLOCK_SIZE', 1):
+            response = self.client.get(reverse('issues:export_issues'), {'format': 'ndjson'})
+            self.assertEqual(len(list(response.streaming_content)), 2)
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('issues:export_issues'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('issues:export_issues'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_command_writes_file(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        output = directory / 'issues.csv'
+        call_command('export_issues', '--format', 'csv', '--output', str(output), '--status', 'OPEN',
+                     stderr=io.StringIO())
+
+        rows = list(csv.DictReader(output.open(encoding='utf-8', newline='')))
+        self.assertEqual([int(row['id']) for row in rows], [self.pothole.pk])
+
+        out = io.StringIO()
+        call_command('export_issues', '--format', 'ndjson', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
@@ -0,0 +1,304 @@
+import io
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from issues.models import GazetteerAddress, GeocodeCacheEntry
+from issues.modules import geocode_store, geocoding
+
+
+class FakeNominatimHandler(BaseHTTPRequestHandler):
+    """Локальный фейковый Nominatim: /search и /reverse с фиксированными ответами."""
+
+    requests_seen = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        self.requests_seen.append((url.path, params))
+
+        if url.path == '/search':
+            if params['q'][0] == 'медленно':
+                time.sleep(0.3)
+            body = [{
+                "lat": "61.0066",
+                "lon": "69.0223",
+                "display_name": f"{params['q'][0]}, Ханты-Мансийск, Россия",
+                "address": {"road": "Ленина", "city": "Ханты-Мансийск"},
+                "osm_id": 1,
+                "osm_type": "way",
+            }]
+        elif url.path == '/reverse':
+            body = {"display_name": "ул. Мира, 5, Ханты-Мансийск, Россия"}
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeNominatimMixin:
+    """Поднимает фейковый Nominatim на свободном порту и направляет на него геокодер."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeNominatimHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        host, port = cls.server.server_address
+        cls.base_url = f"http://{host}:{port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        FakeNominatimHandler.requests_seen = []
+        self.settings_override = override_settings(NOMINATIM_BASE_URL=self.base_url)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+
+@override_settings(SERVER_INTERFACE='asgi')
+class AsyncGeocodingClientTest(FakeNominatimMixin, TestCase):
+    """Асинхронный клиент геокодирования против локального фейкового Nominatim."""
+
+    async def test_asearch_address(self):
+        results = await geocoding.asearch_address("ул. Ленина")
+        await geocoding.close_async_client()
+        self.assertEqual(results[0]["display_name"], "ул. Ленина, Ханты-Мансийск")
+        self.assertEqual(results[0]["lat"], 61.0066)
+
+    async def test_ageocode_address_is_cached(self):
+        first = await geocoding.ageocode_address("ул. Мира")
+        second = await geocoding.ageocode_address("ул. Мира")
+        await geocoding.close_async_client()
+        self.assertEqual(first[0], second[0])
+        self.assertAlmostEqual(first[1].x, 69.0223)
+        search_calls = [r for r in FakeNominatimHandler.requests_seen if r[0] == '/search']
+        self.assertEqual(len(search_calls), 1)
+
+    async def test_areverse_geocode(self):
+        address = await geocoding.areverse_geocode(61.0066, 69.0223)
+        await geocoding.close_async_client()
+        self.assertEqual(address, "ул. Мира, 5, Ханты-Мансийск")
+
+    def test_sync_client_uses_same_server(self):
+        address = geocoding.reverse_geocode(61.01, 69.03)
+        self.assertEqual(address, "ул. Мира, 5, Ханты-Мансийск")
+
+    async def test_client_is_reused_within_loop(self):
+        await geocoding.areverse_geocode(61.0066, 69.0223)
+        client = geocoding._async_client
+        await geocoding.asearch_address("ул. Ленина")
+        self.assertIs(geocoding._async_client, client)
+        await geocoding.close_async_client()
+
+    @override_settings(SERVER_INTERFACE='wsgi')
+    async def test_wsgi_uses_sync_session(self):
+        """Под WSGI каждый async_to_sync — новый цикл: httpx-клиент не создаётся."""
+        await geocoding.close_async_client()
+        address = await geocoding.areverse_geocode(61.0066, 69.0223)
+        results = await geocoding.asearch_address("ул. Ленина")
+        self.assertEqual(address, "ул. Мира, 5, Ханты-Мансийск")
+        self.assertEqual(results[0]["display_name"], "ул. Ленина, Ханты-Мансийск")
+        self.assertIsNone(geocoding._async_client)
+        self.assertTrue(FakeNominatimHandler.requests_seen)
+
+
+@override_settings(NOMINATIM_RATE_LIMIT=10, NOMINATIM_RATE_BURST=1)
+class NominatimThrottlingTest(FakeNominatimMixin, TransactionTestCase):
+    """Общий лимитер и объединение одинаковых запросов."""
+
+    def test_rate_limiter_spaces_requests(self):
+        from issues.modules import throttling
+        start = time.time()
+        waits = [throttling.acquire(timeout=2) for _ in range(3)]
+        elapsed = time.time() - start
+        self.assertGreaterEqual(elapsed, 0.15)
+        self.assertEqual(len(waits), 3)
+        metrics = throttling.get_metrics()
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertGreater(metrics['max_wait'], 0)
+
+    def test_rate_limiter_times_out(self):
+        from issues.modules import throttling
+        with override_settings(NOMINATIM_RATE_LIMIT=0.5):
+            throttling.acquire(timeout=0)
+            # Следующий слот начнётся только через 2с — без ожидания токен не выдаётся
+            with self.assertRaises(throttling.RateLimitTimeout):
+                throttling.acquire(timeout=0)
+
+    def test_identical_lookups_are_coalesced(self):
+        results = []
+
+        def lookup():
+            results.append(geocoding.search_address("медленно"))
+            connections.close_all()
+
+        threads = [threading.Thread(target=lookup) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 5)
+        bounded_calls = [
+            r for r in FakeNominatimHandler.requests_seen
+            if r[0] == '/search' and 'bounded' in r[1]
+        ]
+        self.assertEqual(len(bounded_calls), 1)
+
+    def test_follower_timeout_keeps_leader_flag(self):
+        """Ждавший дольше timeout выполняет запрос сам, но флаг чужого лидера не снимает."""
+        from issues.modules import throttling
+        lock_key = f"{throttling.FLIGHT_KEY_PREFIX}_slow"
+        throttling._cache().set(lock_key, 'leader', 30)
+        self.addCleanup(throttling._cache().delete, lock_key)
+
+        result = throttling.single_flight.do('slow', lambda: 'own', 'slow-result', timeout=0.2)
+        self.assertEqual(result, 'own')
+        self.assertEqual(throttling._cache().get(lock_key), 'leader')
+
+        result = async_to_sync(throttling.single_flight.ado)('slow', self._own, 'slow-result', 0.2)
+        self.assertEqual(result, 'own')
+        self.assertEqual(throttling._cache().get(lock_key), 'leader')
+
+        # Без чужого флага лидер снимает свой
+        throttling._cache().delete(lock_key)
+        throttling.single_flight.do('slow', lambda: 'own', 'slow-result', timeout=0.2)
+        self.assertIsNone(throttling._cache().get(lock_key))
+
+    @staticmethod
+    async def _own():
+        return 'own'
+
+
+class PersistentGeocodeCacheTest(FakeNominatimMixin, TestCase):
+    """Постоянный кэш в PostGIS переживает очистку Django cache."""
+
+    def test_search_survives_cache_clear(self):
+        geocoding.search_address("ул. Мира")
+        cache.clear()
+        results = geocoding.search_address("  УЛ. мира ")
+
+        self.assertEqual(results[0]["display_name"], "ул. Мира, Ханты-Мансийск")
+        search_calls = [r for r in FakeNominatimHandler.requests_seen if r[0] == '/search']
+        self.assertEqual(len(search_calls), 1)
+
+    def test_reverse_answered_by_nearest_entry(self):
+        geocoding.reverse_geocode(61.0066, 69.0223)
+        cache.clear()
+        # ~6 м от сохранённой точки — в пределах допуска
+        address = geocoding.reverse_geocode(61.00665, 69.02235)
+
+        self.assertEqual(address, "ул. Мира, 5, Ханты-Мансийск")
+        reverse_calls = [r for r in FakeNominatimHandler.requests_seen if r[0] == '/reverse']
+        self.assertEqual(len(reverse_calls), 1)
+
+    def test_reverse_outside_tolerance_goes_to_nominatim(self):
+        geocoding.reverse_geocode(61.0066, 69.0223)
+        cache.clear()
+        geocoding.reverse_geocode(61.0100, 69.0300)
+
+        reverse_calls = [r for r in FakeNominatimHandler.requests_seen if r[0] == '/reverse']
+        self.assertEqual(len(reverse_calls), 2)
+
+    def test_evict_expired_and_least_recently_used(self):
+        now = timezone.now()
+        for i, last_used in enumerate([now - timedelta(days=3), now - timedelta(days=1), now]):
+            GeocodeCacheEntry.objects.create(
+                kind=GeocodeCacheEntry.KIND_SEARCH, key=f"запрос {i}|5", payload=[],
+                last_used_at=last_used, expires_at=now + timedelta(days=1),
+            )
+        GeocodeCacheEntry.objects.create(
+            kind=GeocodeCacheEntry.KIND_SEARCH, key="старый|5", payload=[],
+            last_used_at=now, expires_at=now - timedelta(seconds=1),
+        )
+
+        deleted = geocode_store.evict(max_entries=2)
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(
+            sorted(GeocodeCacheEntry.objects.values_list('key', flat=True)),
+            ["запрос 1|5", "запрос 2|5"],
+        )
+
+
+class GazetteerTest(FakeNominatimMixin, TestCase):
+    """Автодополнение из локального справочника без обращения к Nominatim."""
+
+    EXTRACT = {
+        "elements": [
+            {"type": "node", "id": 1, "lat": 61.0066, "lon": 69.0223,
+             "tags": {"addr:street": "улица Ленина", "addr:housenumber": "5", "addr:city": "Ханты-Мансийск"}},
+            {"type": "way", "id": 2, "center": {"lat": 61.0070, "lon": 69.0230},
+             "tags": {"addr:street": "улица Ленина", "addr:housenumber": "52", "addr:city": "Ханты-Мансийск"}},
+            {"type": "way", "id": 3, "center": {"lat": 61.0050, "lon": 69.0200},
+             "tags": {"highway": "residential", "name": "улица Ленина"}},
+            {"type": "way", "id": 4, "center": {"lat": 61.0051, "lon": 69.0201},
+             "tags": {"highway": "residential", "name": "улица Ленина"}},
+            # Вне viewbox ХМАО
+            {"type": "node", "id": 5, "lat": 55.75, "lon": 37.61,
+             "tags": {"addr:street": "улица Ленина", "addr:housenumber": "1"}},
+        ]
+    }
+
+    def setUp(self):
+        super().setUp()
+        with tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8') as f:
+            json.dump(self.EXTRACT, f)
+            f.flush()
+            call_command('import_gazetteer', f.name, stdout=io.StringIO())
+
+    def test_import_skips_duplicates_and_outside_viewbox(self):
+        # Два отрезка одной улицы склеиваются, точка в Москве отбрасывается
+        self.assertEqual(GazetteerAddress.objects.count(), 3)
+
+    def test_search_answers_locally(self):
+        results = geocoding.search_address("ул. Ленина, 5")
+
+        self.assertEqual(results[0]["display_name"], "улица Ленина, 5, Ханты-Мансийск")
+        self.assertEqual(results[0]["osm_type"], "node")
+        self.assertEqual(FakeNominatimHandler.requests_seen, [])
+
+    def test_search_prefix_orders_shorter_first(self):
+        results = geocoding.search_address("Ленина")
+        self.assertEqual(
+            [r["display_name"] for r in results],
+            ["улица Ленина", "улица Ленина, 5, Ханты-Мансийск", "улица Ленина, 52, Ханты-Мансийск"],
+        )
+
+    def test_miss_falls_back_to_nominatim(self):
+        geocoding.search_address("ул. Мира")
+        self.assertTrue(any(r[0] == '/search' for r in FakeNominatimHandler.requests_seen))
+
+    async def test_asearch_answers_locally(self):
+        results = await geocoding.asearch_address("Ленина 52")
+        self.assertEqual(results[0]["display_name"], "улица Ленина, 52, Ханты-Мансийск")
+        self.assertEqual(FakeNominatimHandler.requests_seen, [])
@@ -0,0 +1,207 @@
+import csv
+import io
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from issues.models import Issue
+from issues.modules.bulk_import import RecordValidator
+from issues.modules.tiles import get_tile, tile_for_point
+from users.models import CustomUser
+
+
+class IssueImportTest(TestCase):
+    """Команда import_issues: COPY во временную таблицу, upsert по external_id, отклонённые записи."""
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def _write(self, name, text):
+        path = self.directory / name
+        path.write_text(text, encoding='utf-8')
+        return str(path)
+
+    def _import(self, path, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_issues', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    @patch('issues.modules.bulk_import.geocode_address', return_value=("ул. Мира, 1", Point(69.02, 61.0)))
+    def test_csv_upsert(self, geocode):
+        path = self._write('issues.csv', (
+            "external_id,title,description,category,status,address,lon,lat,created_at\n"
+            "A-1,Яма,Глубокая,roads,OPEN,,69.0223,61.0066,2024-05-01T10:00:00+05:00\n"
+            "A-2,Фонарь,,Освещение,resolved,ул. Мира 1,,,2024-05-02\n"
+            "A-3,,Без заголовка,roads,OPEN,,69.0,61.0,\n"
+            "A-4,Неизвестно,,spaceships,OPEN,,69.0,61.0,\n"
+        ))
+        rejects = self.directory / 'rejects.csv'
+        out, err = self._import(path, '--rejects', str(rejects))
+
+        self.assertIn("добавлено 2, обновлено 0, отклонено 2", out)
+        self.assertIn("Запись 4", err)
+        self.assertEqual(geocode.call_count, 1)
+        pothole = Issue.objects.get(external_id='A-1')
+        self.assertEqual((pothole.location.x, pothole.location.y), (69.0223, 61.0066))
+        self.assertEqual((pothole.upvotes, pothole.rating), (0, 0))
+        self.assertIsNone(pothole.reporter)
+        light = Issue.objects.get(external_id='A-2')
+        self.assertEqual(light.category, 'lighting')
+        self.assertEqual(light.status, Issue.STATUS_RESOLVED)
+        self.assertIsNotNone(light.resolved_at)
+        self.assertEqual(light.location.x, 69.02)
+        self.assertEqual(
+            [row['record'] for row in csv.DictReader(rejects.open(encoding='utf-8'))], ['4', '5']
+        )
+
+        # Повторная загрузка обновляет обращения, а не создаёт копии
+        Issue.objects.filter(pk=pothole.pk).update(upvotes=3)
+        self._write('issues.csv', (
+            "external_id,title,category,status,lon,lat\n"
+            "A-1,Яма отремонтирована,roads,IN_PROGRESS,69.03,61.01\n"
+        ))
+        out, _ = self._import(path)
+        self.assertIn("добавлено 0, обновлено 1", out)
+        pothole.refresh_from_db()
+        self.assertEqual(pothole.title, "Яма отремонтирована")
+        self.assertEqual(pothole.status, Issue.STATUS_IN_PROGRESS)
+        self.assertEqual(pothole.upvotes, 3)
+        self.assertEqual(Issue.objects.count(), 2)
+
+    def test_geojson_and_sequences(self):
+        geojson = self._write('issues.geojson', (
+            '{"type": "FeatureCollection", "features": ['
+            '{"type": "Feature", "geometry": {"type": "Point", "coordinates": [69.0, 61.0]},'
+            ' "properties": {"id": 7, "title": "Мусор", "category": "garbage"}}]}'
+        ))
+        sequence = self._write('issues.geojsons', (
+            '\x1e{"type": "Feature", "geometry": {"type": "Point", "coordinates": [69.1, 61.1]},'
+            ' "properties": {"id": 7, "title": "Мусор убран", "category": "garbage", "status": "RESOLVED"}}\n'
+            '\x1e{"type": "Feature", "geometry": {"type": "Point", "coordinates": [69.2, 61.2]},'
+            ' "properties": {"id": 8, "title": "Свалка", "category": "garbage"}}\n'
+        ))
+        self._import(geojson, '--batch-size', '1')
+        out, _ = self._import(sequence, '--batch-size', '1')
+
+        self.assertIn("добавлено 1, обновлено 1", out)
+        self.assertEqual(
+            sorted(Issue.objects.values_list('external_id', 'title')),
+            [('7', "Мусор убран"), ('8', "Свалка")],
+        )
+
+    def test_malformed_lines_are_rejected(self):
+        path = self._write('issues.ndjson', (
+            '{"id": "1", "title": "Яма", "category": "roads", "lon": 69.0, "lat": 61.0}\n'
+            '{"id": "2", "title": оборвано\n'
+            '[1, 2]\n'
+            '{"id": "3", "title": "Свалка", "category": "garbage", "lon": 69.1, "lat": 61.1}\n'
+        ))
+        out, err = self._import(path)
+
+        self.assertIn("добавлено 2, обновлено 0, отклонено 2", out)
+        self.assertIn("Запись 2: некорректный JSON", err)
+        self.assertEqual(sorted(Issue.objects.values_list('external_id', flat=True)), ['1', '3'])
+
+    def test_reimport_marks_previous_days_dirty(self):
+        """Перенос дат при повторной загрузке пересчитывает и прежние дни сводки."""
+        path = self._write('issues.csv', (
+            "external_id,title,category,status,lon,lat,created_at,resolved_at\n"
+            "D-1,Яма,roads,RESOLVED,69.0,61.0,2024-03-01T12:00:00+05:00,2024-03-05T12:00:00+05:00\n"
+        ))
+        self._import(path)
+        self._write('issues.csv', (
+            "external_id,title,category,status,lon,lat,created_at\n"
+            "D-1,Яма,roads,OPEN,69.0,61.0,2024-06-10T12:00:00+05:00\n"
+        ))
+        with patch('issues.modules.bulk_import.mark_range_dirty', return_value=0) as mark:
+            self._import(path)
+
+        first_day, last_day = mark.call_args.args
+        self.assertEqual((first_day.isoformat(), last_day.isoformat()), ('2024-03-01', '2024-06-10'))
+
+    def test_reimport_keeps_dates_missing_from_file(self):
+        """Повторная загрузка без created_at/resolved_at не сдвигает даты обращения."""
+        path = self._write('issues.csv', (
+            "external_id,title,category,status,lon,lat,created_at,resolved_at\n"
+            "K-1,Яма,roads,RESOLVED,69.0,61.0,2024-03-01T12:00:00+05:00,2024-03-05T12:00:00+05:00\n"
+        ))
+        self._import(path)
+        issue = Issue.objects.get(external_id='K-1')
+
+        self._write('issues.csv', (
+            "external_id,title,category,status,lon,lat\n"
+            "K-1,Яма засыпана,roads,RESOLVED,69.0,61.0\n"
+            "K-2,Фонарь,lighting,RESOLVED,69.1,61.1\n"
+        ))
+        with patch('issues.modules.bulk_import.mark_range_dirty', return_value=0) as mark:
+            out, _ = self._import(path)
+
+        self.assertIn("добавлено 1, обновлено 1", out)
+        reimported = Issue.objects.get(external_id='K-1')
+        self.assertEqual(reimported.title, "Яма засыпана")
+        self.assertEqual(
+            (reimported.created_at, reimported.resolved_at), (issue.created_at, issue.resolved_at)
+        )
+        # Новому обращению без дат — время загрузки
+        added = Issue.objects.get(external_id='K-2')
+        self.assertEqual(added.created_at.date(), added.updated_at.date())
+        self.assertEqual(added.resolved_at, added.created_at)
+        first_day, last_day = mark.call_args.args
+        self.assertEqual(first_day.isoformat(), '2024-03-01')
+        self.assertEqual(last_day, timezone.localdate(added.created_at))
+
+    def test_import_resets_cached_tiles(self):
+        cache.clear()
+        path = self._write('issues.csv', "external_id,title,category,lon,lat\nT-1,Яма,roads,69.0,61.0\n")
+        x, y = tile_for_point(69.0, 61.0, 14)
+        self.assertEqual(get_tile(14, x, y), b"")
+
+        with patch('issues.modules.tiles.TILE_CACHE.delete_many') as delete_many:
+            self._import(path)
+
+        delete_many.assert_not_called()
+        self.assertNotEqual(get_tile(14, x, y), b"")
+
+    def test_export_round_trip(self):
+        user = CustomUser.objects.create_user(email="import@test.com", password="pass", role="citizen")
+        Issue.objects.create(title="Фонарь", description="...", location=Point(69.03, 61.01),
+                             reporter=user, category="lighting")
+        exported = self.directory / 'export.ndjson'
+        call_command('export_issues', '--format', 'ndjson', '--output', str(exported), stderr=io.StringIO())
+
+        self._import(str(exported), '--reporter', "import@test.com")
+        imported = Issue.objects.get(external_id__isnull=False)
+        self.assertEqual((imported.title, imported.category, imported.reporter), ("Фонарь", "lighting", user))
+        self.assertEqual((imported.location.x, imported.location.y), (69.03, 61.01))
+
+    def test_no_geocode_rejects_addresses(self):
+        path = self._write('issues.csv', "title,category,address\nЯма,roads,ул. Мира 1\n")
+        with patch('issues.modules.bulk_import.geocode_address') as geocode:
+            out, err = self._import(path, '--no-geocode')
+        geocode.assert_not_called()
+        self.assertIn("отклонено 1", out)
+        self.assertFalse(Issue.objects.exists())
+
+    def test_unknown_reporter_and_format(self):
+        path = self._write('issues.csv', "title,category,lon,lat\n")
+        with self.assertRaises(CommandError):
+            self._import(path, '--reporter', "nobody@test.com")
+        with self.assertRaises(CommandError):
+            self._import(self._write('issues.txt', ""))
+
+    def test_validator(self):
+        validator = RecordValidator()
+        with self.assertRaises(ValueError):
+            validator.clean({'title': "Яма", 'category': 'roads', 'lon': '200', 'lat': '61'})
+        with self.assertRaises(ValueError):
+            validator.clean({'title': "Яма", 'category': 'roads'})
+        record = validator.clean({'id': 5, 'title': " Яма ", 'category': 'ДОРОГИ', 'lon': '69', 'lat': '61'})
+        self.assertEqual((record['external_id'], record['title'], record['status']), ('5', "Яма", Issue.STATUS_OPEN))
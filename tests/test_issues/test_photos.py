@@ -0,0 +1,109 @@
+import io
+import shutil
+import tempfile
+
+from django.contrib.gis.geos import Point
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from issues.models import Issue, IssuePhoto
+from issues.modules.photos import MEDIUM_SIZE, THUMBNAIL_SIZE, process_photo
+from jobs.queue import run_pending
+from users.models import CustomUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_jpeg(size=(2000, 1500), exif=True):
+    image = Image.new('RGB', size, color='green')
+    buffer = io.BytesIO()
+    options = {}
+    if exif:
+        data = Image.Exif()
+        data[0x0110] = "Телефон автора"  # Model
+        data[0x0112] = 1  # Orientation
+        options['exif'] = data.tobytes()
+    image.save(buffer, format='JPEG', **options)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PhotoPipelineTest(TestCase):
+    """Миниатюры, средние копии и удаление EXIF у фото обращений."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.citizen = CustomUser.objects.create_user(
+            email="citizen@test.com", password="pass123", role="citizen", email_verified=True
+        )
+        self.issue = Issue.objects.create(
+            title="Яма", description="...", location=Point(69.0223, 61.0066), reporter=self.citizen
+        )
+
+    def _photo(self, content, name="photo.jpg"):
+        return IssuePhoto.objects.create(issue=self.issue, image=ContentFile(content, name=name))
+
+    def test_variants_and_dimensions(self):
+        photo = self._photo(make_jpeg())
+        self.assertTrue(process_photo(photo))
+
+        photo.refresh_from_db()
+        self.assertEqual((photo.width, photo.height), (2000, 1500))
+        self.assertEqual((photo.thumbnail_width, photo.thumbnail_height), THUMBNAIL_SIZE)
+        self.assertEqual(photo.medium_width, MEDIUM_SIZE[0])
+        self.assertEqual(photo.medium_height, 960)
+        with photo.thumbnail.open('rb') as f:
+            self.assertEqual(Image.open(f).size, THUMBNAIL_SIZE)
+        self.assertEqual(photo.small_url, photo.thumbnail.url)
+
+    def test_exif_is_stripped_from_original(self):
+        photo = self._photo(make_jpeg())
+        process_photo(photo)
+
+        photo.refresh_from_db()
+        with photo.image.open('rb') as f:
+            self.assertFalse(Image.open(f).getexif())
+
+    def test_unreadable_file_is_skipped(self):
+        photo = self._photo(b"not an image")
+        self.assertFalse(process_photo(photo))
+        self.assertEqual(photo.small_url, photo.image.url)
+
+    def test_create_issue_processes_uploads(self):
+        self.client.login(email="citizen@test.com", password="pass123")
+        data = {
+            'title': 'Фото-обращение',
+            'description': 'С приложением изображений',
+            'category': 'garbage',
+            'lat': '61.0100',
+            'lon': '69.0300',
+            'images': [SimpleUploadedFile('p.jpg', make_jpeg((400, 300)), content_type='image/jpeg')],
+        }
+        self.client.post(reverse('issues:create_issue'), data, format='multipart')
+
+        # Обработка поставлена в очередь и выполняется воркером
+        photo = IssuePhoto.objects.get(issue__title='Фото-обращение')
+        self.assertFalse(photo.thumbnail)
+        self.assertEqual(run_pending(), 1)
+
+        photo.refresh_from_db()
+        self.assertTrue(photo.thumbnail)
+        self.assertEqual((photo.width, photo.height), (400, 300))
+
+    def test_backfill_command(self):
+        photo = self._photo(make_jpeg(exif=False))
+        out = io.StringIO()
+        call_command('process_photos', stdout=out, stderr=io.StringIO())
+
+        photo.refresh_from_db()
+        self.assertTrue(photo.thumbnail)
+        self.assertTrue(photo.medium)
+        self.assertIn("Обработано фото: 1", out.getvalue())
@@ -1,5 +1,8 @@
+import shutil
+import tempfile
 from datetime import timedelta
-from django.test import TestCase, override_settings
+from unittest.mock import patch
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.gis.geos import Point
@@ -10,6 +13,9 @@ import io
 
 from users.models import CustomUser
 from issues.models import Issue, IssuePhoto, Vote
+from issues.modules.votes import apply_vote, attach_user_votes, rebuild_vote_counters
+
+MEDIA_ROOT = tempfile.mkdtemp()
 
 
 class IssueCreationTest(TestCase):
@@ -111,6 +117,76 @@ class IssueCreationTest(TestCase):
         issue = Issue.objects.get(title='Много фото')
         self.assertEqual(issue.photos.count(), 5)
 
+    def _post_with_files(self, title, files):
+        self.client.login(email="citizen@test.com", password="pass123")
+        data = {
+            'title': title,
+            'description': 'Проверка загрузки',
+            'category': 'roads',
+            'lat': '61.0',
+            'lon': '69.0',
+            'images': files,
+        }
+        return self.client.post(reverse('issues:create_issue'), data, format='multipart', follow=True)
+
+    def test_create_issue_sniffs_image_type(self):
+        """Content-Type клиента не учитывается: решает сигнатура файла."""
+        fake = SimpleUploadedFile('virus.jpg', b'MZ\x90\x00' * 100, content_type='image/jpeg')
+        response = self._post_with_files('Подделка', [fake, self._create_test_image('ok.jpg')])
+
+        issue = Issue.objects.get(title='Подделка')
+        self.assertEqual(issue.photos.count(), 1)
+        messages = [str(m) for m in response.context['messages']]
+        self.assertTrue(any("virus.jpg не изображение" in m for m in messages))
+
+    def test_create_issue_rejects_oversized_photo_while_streaming(self):
+        big = SimpleUploadedFile(
+            'big.jpg', b'\xff\xd8\xff\xe0' + b'\x00' * (5 * 1024 * 1024), content_type='image/jpeg'
+        )
+        response = self._post_with_files('Большое фото', [big])
+
+        issue = Issue.objects.get(title='Большое фото')
+        self.assertEqual(issue.photos.count(), 0)
+        messages = [str(m) for m in response.context['messages']]
+        self.assertTrue(any("big.jpg слишком большой" in m for m in messages))
+
+    def test_upload_handler_aborts_oversized_request(self):
+        from django.test import RequestFactory
+        from issues.modules.uploads import MAX_REQUEST_SIZE, IssuePhotoUploadHandler
+
+        handler = IssuePhotoUploadHandler(RequestFactory().post('/'))
+        result = handler.handle_raw_input(None, {}, MAX_REQUEST_SIZE + 1, b'boundary')
+
+        self.assertTrue(handler.aborted)
+        post, files = result
+        self.assertEqual(len(post), 0)
+        self.assertEqual(len(files), 0)
+
+    def test_create_issue_oversized_request_rerenders_form(self):
+        """Слишком большой запрос с CSRF-токеном формы → форма с ошибкой, а не 403 CSRF."""
+        from django.test import Client
+
+        client = Client(enforce_csrf_checks=True)
+        client.login(email="citizen@test.com", password="pass123")
+        client.get(reverse('issues:create_issue'))
+        data = {
+            'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+            'title': 'Огромное фото',
+            'description': 'Проверка загрузки',
+            'category': 'roads',
+            'lat': '61.0',
+            'lon': '69.0',
+            'images': [self._create_test_image('big.jpg')],
+        }
+        with patch('issues.modules.uploads.MAX_REQUEST_SIZE', 256):
+            response = client.post(reverse('issues:create_issue'), data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'issues/create_issue.html')
+        messages = [str(m) for m in response.context['messages']]
+        self.assertTrue(any("Слишком большой запрос" in m for m in messages))
+        self.assertFalse(Issue.objects.filter(title='Огромное фото').exists())
+
 
 
 class IssueVoteTest(TestCase):
@@ -150,6 +226,7 @@ class IssueVoteTest(TestCase):
     def test_vote_cancel(self):
         """POST с vote=0 → удаляет голос."""
         Vote.objects.create(user=self.citizen, issue=self.issue, value=1)
+        rebuild_vote_counters()
         self.client.login(email="voter@test.com", password="pass")
         response = self.client.post(
             reverse('issues:vote_issue', args=[self.issue.id]),
@@ -164,6 +241,51 @@ class IssueVoteTest(TestCase):
         # Голос удалён
         self.assertFalse(Vote.objects.filter(user=self.citizen, issue=self.issue).exists())
 
+    def test_vote_change_updates_counters(self):
+        """Смена голоса +1 → -1 атомарно обновляет upvotes/downvotes/rating."""
+        self.client.login(email="voter@test.com", password="pass")
+        url = reverse('issues:vote_issue', args=[self.issue.id])
+        self.client.post(url, {'vote': '1'})
+        response = self.client.post(url, {'vote': '-1'})
+        self.assertEqual(response.json()['rating'], -1)
+
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.upvotes, 0)
+        self.assertEqual(self.issue.downvotes, 1)
+        self.assertEqual(self.issue.rating, -1)
+
+    def test_rebuild_vote_counters(self):
+        """Команда rebuild_vote_counters восстанавливает счётчики по таблице Vote."""
+        from django.core.management import call_command
+        Vote.objects.create(user=self.citizen, issue=self.issue, value=1)
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.rating, 0)
+
+        call_command('rebuild_vote_counters', stdout=io.StringIO())
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.upvotes, 1)
+        self.assertEqual(self.issue.rating, 1)
+
+    def test_votes_deleted_outside_apply_vote_update_counters(self):
+        """Удаление голоса каскадом с пользователем или в админке сдвигает счётчики."""
+        voters = [
+            CustomUser.objects.create_user(email=f"v{n}@test.com", password="pass", role="citizen")
+            for n in range(3)
+        ]
+        for voter, value in zip(voters, (1, 1, -1)):
+            apply_vote(voter, self.issue, value)
+
+        voters[0].delete()
+        Vote.objects.get(user=voters[2]).delete()
+
+        self.issue.refresh_from_db()
+        self.assertEqual((self.issue.upvotes, self.issue.downvotes, self.issue.rating), (1, 0, 1))
+
+        # Отмена через apply_vote не вычитается второй раз
+        apply_vote(voters[1], self.issue, None)
+        self.issue.refresh_from_db()
+        self.assertEqual((self.issue.upvotes, self.issue.rating), (0, 0))
+
     def test_vote_official_forbidden(self):
         """Голосование от official → 403 JSON."""
         self.client.login(email="admin@test.com", password="pass")
@@ -176,6 +298,71 @@ class IssueVoteTest(TestCase):
         self.assertFalse(data['success'])
         self.assertIn("Только граждане", data['error'])
 
+    def test_attach_user_votes(self):
+        """Голоса пользователя для списка обращений читаются одним запросом."""
+        other = Issue.objects.create(
+            title="Без голоса", description="Тест", location=Point(69.1, 61.1), reporter=self.citizen
+        )
+        Vote.objects.create(user=self.citizen, issue=self.issue, value=-1)
+        Vote.objects.create(user=self.official, issue=other, value=1)
+
+        with self.assertNumQueries(2):
+            issues = attach_user_votes(self.citizen, Issue.objects.order_by('pk'))
+        self.assertEqual([issue.user_vote for issue in issues], [-1, None])
+        self.assertEqual([issue.user_has_downvoted for issue in issues], [True, False])
+        self.assertFalse(any(issue.user_has_upvoted for issue in issues))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(attach_user_votes(self.citizen, []), [])
+
+    def test_vote_state_rendered(self):
+        """Карта, страница обращения и «Мои обращения» отмечают голос пользователя."""
+        Vote.objects.create(user=self.citizen, issue=self.issue, value=1)
+        self.client.login(email="voter@test.com", password="pass")
+
+        responses = {
+            'issues:map': self.client.get(reverse('issues:map')).context['issues'],
+            'issues:issue_detail': [self.client.get(reverse('issues:issue_detail', args=[self.issue.pk])).context['issue']],
+            'users:my_issues': self.client.get(reverse('users:my_issues')).context['issues'],
+        }
+        for name, issues in responses.items():
+            issue = issues[0]
+            self.assertTrue(issue.user_has_upvoted, name)
+            self.assertFalse(issue.user_has_downvoted, name)
+
+
+class ConcurrentVoteTest(TransactionTestCase):
+    """Одновременные первые голоса одного пользователя не приводят к IntegrityError."""
+
+    def test_concurrent_first_votes(self):
+        import threading
+        from django.db import connections
+
+        voter = CustomUser.objects.create_user(email="race@test.com", password="pass", role="citizen")
+        issue = Issue.objects.create(title="Гонка", description="...", location=Point(69.0, 61.0))
+        barrier = threading.Barrier(4)
+        errors = []
+
+        def vote():
+            try:
+                barrier.wait()
+                apply_vote(voter, issue, 1)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=vote) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        issue.refresh_from_db()
+        self.assertEqual((issue.upvotes, issue.rating), (1, 1))
+        self.assertEqual(Vote.objects.filter(user=voter).count(), 1)
+
 
 class IssueStatusUpdateTest(TestCase):
     """Тесты изменения статуса (только для official)."""
@@ -296,4 +483,491 @@ class MapAndGeoJSONTest(TestCase):
 
         # Проверим, что URL ведёт на деталь
         detail_url = reverse('issues:issue_detail', args=[props['id']])
-        self.assertEqual(props['url'], detail_url)
\ No newline at end of file
+        self.assertEqual(props['url'], detail_url)
+
+    def test_map_geojson_bbox_filters_viewport(self):
+        """GET /issues/map/geojson/?bbox=... → только обращения в видимой области."""
+        self.client.login(email="mapuser@test.com", password="pass")
+        response = self.client.get(reverse('issues:map_geojson'), {'bbox': '69.02,61.00,69.025,61.008'})
+        self.assertEqual(response.status_code, 200)
+        features = response.json()['features']
+        self.assertEqual(len(features), 1)
+        self.assertEqual(features[0]['properties']['title'], "Яма 1")
+
+    def test_map_geojson_clusters_on_low_zoom(self):
+        """На мелком масштабе возвращаются кластеры с разбивкой по статусам."""
+        self.client.login(email="mapuser@test.com", password="pass")
+        response = self.client.get(reverse('issues:map_geojson'), {'bbox': '68.75,60.75,69.30,61.15', 'zoom': '5'})
+        self.assertEqual(response.status_code, 200)
+        features = response.json()['features']
+        self.assertEqual(len(features), 1)
+        props = features[0]['properties']
+        self.assertTrue(props['cluster'])
+        self.assertEqual(props['count'], 2)
+        self.assertEqual(props['statuses'][Issue.STATUS_OPEN], 1)
+        self.assertEqual(props['statuses'][Issue.STATUS_IN_PROGRESS], 1)
+
+    def test_search_uses_russian_stemming(self):
+        """Поиск по словоформе («ямы») находит обращение «Яма 1» и в списке, и на карте."""
+        self.client.login(email="mapuser@test.com", password="pass")
+        response = self.client.get(reverse('issues:map'), {'search': 'ямы'})
+        titles = [issue.title for issue in response.context['issues']]
+        self.assertEqual(titles, ["Яма 1"])
+        self.assertEqual(response.context['selected_sort'], '-relevance')
+
+        response = self.client.get(reverse('issues:map_geojson'), {'search': 'ямы'})
+        features = response.json()['features']
+        self.assertEqual([f['properties']['title'] for f in features], ["Яма 1"])
+
+    def test_search_matches_substrings_and_reporters(self):
+        """Части слов в описании и адресе, часть email или фамилии автора находят обращение."""
+        reporter = CustomUser.objects.create_user(
+            email="petrova.anna@test.com", password="pass", last_name="Петровская", email_verified=True
+        )
+        Issue.objects.create(
+            title="Течь", description="Протечка водопровода", address="ул. Комсомольская, 5",
+            location=Point(69.0250, 61.0050), reporter=reporter, category="roads",
+        )
+        self.client.login(email="mapuser@test.com", password="pass")
+        for search in ["водопро", "омсомол", "petrova", "Петров"]:
+            with self.subTest(search=search):
+                response = self.client.get(reverse('issues:map'), {'search': search})
+                self.assertEqual([issue.title for issue in response.context['issues']], ["Течь"])
+
+    def test_map_geojson_invalid_bbox(self):
+        """Некорректный bbox → 400."""
+        self.client.login(email="mapuser@test.com", password="pass")
+        response = self.client.get(reverse('issues:map_geojson'), {'bbox': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        for zoom in ('inf', '-inf', 'nan', 'abc'):
+            with self.subTest(zoom=zoom):
+                response = self.client.get(reverse('issues:map_geojson'), {'zoom': zoom})
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MapDeltaSyncTest(TestCase):
+    """Инкрементальная синхронизация карты: ?since= и надгробия удалённых обращений."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.citizen = CustomUser.objects.create_user(
+            email="synccitizen@test.com", password="pass", role="citizen", email_verified=True
+        )
+        self.official = CustomUser.objects.create_user(
+            email="syncofficial@test.com", password="pass", role="official", email_verified=True
+        )
+        self.pothole = Issue.objects.create(
+            title="Яма", description="...", location=Point(69.0223, 61.0066), reporter=self.citizen,
+        )
+        self.light = Issue.objects.create(
+            title="Фонарь", description="...", location=Point(69.0300, 61.0100), reporter=self.citizen,
+            category="lighting",
+        )
+        # Обращения изменены задолго до выдачи токена
+        Issue.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.client.login(email="synccitizen@test.com", password="pass")
+
+    def _sync(self, token=None, **params):
+        if token:
+            params['since'] = token
+        response = self.client.get(reverse('issues:map_geojson'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _ids(self, data):
+        return [feature['properties']['id'] for feature in data['features']]
+
+    def test_full_response_issues_token(self):
+        data = self._sync()
+        self.assertTrue(data['full'])
+        self.assertEqual(data['deleted'], [])
+        self.assertEqual(len(data['features']), 2)
+        self.assertTrue(data['sync_token'])
+
+    def test_delta_contains_only_changed_issues(self):
+        token = self._sync()['sync_token']
+        data = self._sync(token)
+        self.assertFalse(data['full'])
+        self.assertEqual((data['features'], data['deleted']), ([], []))
+
+        self.pothole.status = Issue.STATUS_IN_PROGRESS
+        self.pothole.save()
+        data = self._sync(token)
+        self.assertEqual(self._ids(data), [self.pothole.pk])
+        self.assertEqual(data['features'][0]['properties']['status'], Issue.STATUS_IN_PROGRESS)
+
+    def test_votes_and_photos_are_changes(self):
+        token = self._sync()['sync_token']
+        apply_vote(self.citizen, self.light, 1)
+        data = self._sync(token)
+        self.assertEqual(self._ids(data), [self.light.pk])
+        self.assertEqual(data['features'][0]['properties']['vote_rating'], 1)
+
+        token = data['sync_token']
+        Issue.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        IssuePhoto.objects.create(issue=self.pothole, image=SimpleUploadedFile("p.jpg", b"img"))
+        self.assertEqual(self._ids(self._sync(token)), [self.pothole.pk])
+
+    def test_deleted_issue_is_tombstoned(self):
+        token = self._sync()['sync_token']
+        self.client.login(email="syncofficial@test.com", password="pass")
+        self.client.post(reverse('issues:delete_issue', args=[self.pothole.pk]))
+
+        data = self._sync(token)
+        self.assertEqual(data['features'], [])
+        self.assertEqual(data['deleted'], [self.pothole.pk])
+
+    def test_issue_leaving_filter_is_removed(self):
+        token = self._sync(category='roads')['sync_token']
+        self.pothole.category = 'lighting'
+        self.pothole.save()
+
+        data = self._sync(token, category='roads')
+        self.assertEqual((data['features'], data['deleted']), ([], [self.pothole.pk]))
+        self.assertEqual(self._ids(self._sync(token, category='lighting')), [self.pothole.pk])
+
+    def test_expired_token_returns_full_collection(self):
+        from issues.modules.sync import TOMBSTONE_RETENTION, issue_token
+        stale = issue_token(timezone.now() - TOMBSTONE_RETENTION - timedelta(days=1))
+        data = self._sync(stale)
+        self.assertTrue(data['full'])
+        self.assertEqual(len(data['features']), 2)
+
+    def test_invalid_token(self):
+        response = self.client.get(reverse('issues:map_geojson'), {'since': 'не токен'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ConditionalMapResponseTest(TestCase):
+    """Условные GET карты: ETag по версии набора данных и 304 Not Modified."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="etaguser@test.com", password="pass", role="citizen", email_verified=True
+        )
+        self.issue = Issue.objects.create(
+            title="Яма", description="...", location=Point(69.0223, 61.0066), reporter=self.user,
+        )
+        self.client.login(email="etaguser@test.com", password="pass")
+
+    def _get(self, url, params=None, **headers):
+        return self.client.get(url, params or {}, **headers)
+
+    def test_geojson_not_modified_without_touching_issues(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = reverse('issues:map_geojson')
+        response = self._get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self._get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertFalse([q for q in queries.captured_queries if 'issues_issue' in q['sql']])
+
+    def test_writes_in_the_same_second_are_not_hidden(self):
+        """If-Modified-Since с точностью до секунды не даёт 304 после записи в ту же секунду."""
+        from django.utils.http import http_date
+
+        url = reverse('issues:map_geojson')
+        since = http_date()
+        self._get(url)
+        apply_vote(self.user, self.issue, 1)
+        apply_vote(self.user, self.issue, -1)
+
+        response = self._get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['features'][0]['properties']['vote_rating'], -1)
+
+    def test_local_cache_version_expires(self):
+        """Без общего кэша версия живёт LOCAL_VERSION_TTL: записи других процессов видны через него."""
+        from issues.modules import conditional
+
+        with patch.object(conditional.DATASET_CACHE, 'add', wraps=conditional.DATASET_CACHE.add) as add:
+            conditional.DATASET_CACHE.delete(conditional.VERSION_KEY)
+            conditional.get_dataset_version()
+        self.assertEqual(add.call_args.args[2], conditional.LOCAL_VERSION_TTL)
+
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(CACHES=redis):
+            self.assertIsNone(conditional._version_timeout())
+
+    def test_validator_depends_on_filters(self):
+        url = reverse('issues:map_geojson')
+        etag = self._get(url)['ETag']
+        self.assertNotEqual(self._get(url, {'category': 'roads'})['ETag'], etag)
+        self.assertEqual(self._get(url, {'category': 'roads'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_writes_change_validator(self):
+        url = reverse('issues:map_geojson')
+        etag = self._get(url)['ETag']
+
+        apply_vote(self.user, self.issue, 1)
+        response = self._get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['features'][0]['properties']['vote_rating'], 1)
+
+        etag = response['ETag']
+        IssuePhoto.objects.create(issue=self.issue, image=SimpleUploadedFile("e.jpg", b"img"))
+        self.assertEqual(self._get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self._get(url)['ETag']
+        self.issue.status = Issue.STATUS_IN_PROGRESS
+        self.issue.save()
+        self.assertEqual(self._get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_map_list_partial_is_conditional_per_user(self):
+        url = reverse('issues:map')
+        xhr = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+        response = self._get(url, **xhr)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Requested-With', response['Vary'])
+        self.assertEqual(self._get(url, HTTP_IF_NONE_MATCH=response['ETag'], **xhr).status_code, 304)
+
+        # Полная страница отдаётся как обычно
+        page = self._get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(page.status_code, 200)
+        self.assertFalse(page.has_header('ETag'))
+
+        # Карточки содержат голоса пользователя — у другого пользователя свой ETag
+        CustomUser.objects.create_user(
+            email="other@test.com", password="pass", role="citizen", email_verified=True
+        )
+        self.client.login(email="other@test.com", password="pass")
+        self.assertEqual(self._get(url, HTTP_IF_NONE_MATCH=response['ETag'], **xhr).status_code, 200)
+
+
+class IssueTileTest(TestCase):
+    """Тесты векторных тайлов (MVT)."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email="tileuser@test.com", password="pass", email_verified=True
+        )
+        self.issue = Issue.objects.create(
+            title="Тайл",
+            description="...",
+            location=Point(69.0223, 61.0066),
+            reporter=self.user,
+        )
+        self.client.login(email="tileuser@test.com", password="pass")
+
+    def _tile_url(self, z):
+        from issues.modules.tiles import tile_for_point
+        x, y = tile_for_point(69.0223, 61.0066, z)
+        return reverse('issues:issue_tile', args=[z, x, y])
+
+    def test_tile_contains_issue(self):
+        response = self.client.get(self._tile_url(12))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertIn(b'issues', response.content)
+
+    def test_empty_tile(self):
+        response = self.client.get(reverse('issues:issue_tile', args=[12, 0, 0]))
+        self.assertEqual(response.status_code, 204)
+
+    def test_invalid_tile(self):
+        response = self.client.get(reverse('issues:issue_tile', args=[2, 10, 10]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_tile_cache_invalidated_on_delete(self):
+        url = self._tile_url(12)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.issue.delete()
+        self.assertEqual(self.client.get(url).status_code, 204)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class GeoJSONQueryCountTest(TestCase):
+    """Регрессия N+1: число SQL-запросов GeoJSON не зависит от числа обращений."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="n1user@test.com", password="pass", role="citizen", email_verified=True
+        )
+        self.client.login(email="n1user@test.com", password="pass")
+
+    def _create_issues(self, count):
+        from django.core.files.base import ContentFile
+        for i in range(count):
+            issue = Issue.objects.create(
+                title=f"Обращение {i}",
+                description="...",
+                location=Point(69.0 + i * 0.001, 61.0),
+                reporter=self.user,
+            )
+            apply_vote(self.user, issue, 1)
+            IssuePhoto.objects.create(issue=issue, image=ContentFile(b"img", name=f"n1_{i}.jpg"))
+
+    def _count_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('issues:map_geojson'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_constant_query_count(self):
+        self._create_issues(2)
+        small_count, _ = self._count_queries()
+
+        self._create_issues(10)
+        large_count, data = self._count_queries()
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(data['features']), 12)
+        props = data['features'][0]['properties']
+        self.assertEqual(props['photos_count'], 1)
+        self.assertEqual(props['vote_rating'], 1)
+
+
+class GeoJSONEngineTest(TestCase):
+    """FeatureCollection из PostgreSQL (json_agg) совпадает с собранным в Python."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="engine@test.com", password="pass", role="citizen", email_verified=True
+        )
+        for i, status in enumerate([Issue.STATUS_OPEN, Issue.STATUS_IN_PROGRESS, Issue.STATUS_RESOLVED]):
+            issue = Issue.objects.create(
+                title=f"Обращение «{i}»", description="...", location=Point(69.01 + i / 100, 61.0 + i / 100),
+                reporter=self.user, status=status, category="lighting" if i else "roads",
+            )
+            apply_vote(self.user, issue, 1 if i else -1)
+        IssuePhoto.objects.create(
+            issue=issue, image="issue_photos/e.jpg", thumbnail="issue_photos/variants/e_thumb.webp"
+        )
+        IssuePhoto.objects.create(issue=issue, image="issue_photos/f.jpg")
+        self.client.login(email="engine@test.com", password="pass")
+
+    def _collection(self, engine, **params):
+        with self.settings(MAP_GEOJSON_ENGINE=engine):
+            response = self.client.get(reverse('issues:map_geojson'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        for feature in data['features']:
+            feature['geometry']['coordinates'] = [round(c, 6) for c in feature['geometry']['coordinates']]
+        data['features'].sort(key=lambda feature: feature['properties']['id'])
+        data.pop('sync_token')
+        return data
+
+    def test_engines_produce_same_collection(self):
+        database = self._collection('database')
+        self.assertEqual(database, self._collection('python'))
+        self.assertEqual(len(database['features']), 3)
+
+        props = database['features'][-1]['properties']
+        self.assertEqual(props['thumbnail'], '/media/issue_photos/variants/e_thumb.webp')
+        self.assertEqual(props['photos_count'], 2)
+        self.assertEqual(props['status_display'], str(dict(Issue.STATUS_CHOICES)[Issue.STATUS_RESOLVED]))
+        self.assertEqual(props['url'], reverse('issues:issue_detail', args=[props['id']]))
+        self.assertIsNone(database['features'][0]['properties']['thumbnail'])
+
+    def test_filters_and_empty_result(self):
+        self.assertEqual(self._collection('database', category='lighting'), self._collection('python', category='lighting'))
+        empty = self._collection('database', bbox='60.0,50.0,60.1,50.1')
+        self.assertEqual(empty['features'], [])
+        self.assertTrue(empty['full'])
+
+    def test_search_filter(self):
+        self.assertEqual(
+            self._collection('database', search='обращение'),
+            self._collection('python', search='обращение'),
+        )
+
+
+@patch('issues.modules.pagination.PAGE_SIZE', 3)
+class MapPaginationTest(TestCase):
+    """Keyset-пагинация списка обращений на карте."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="pageuser@test.com", password="pass", email_verified=True
+        )
+        for i in range(7):
+            issue = Issue.objects.create(
+                title=f"Обращение {i:02d}",
+                description="...",
+                location=Point(69.0, 61.0),
+                reporter=self.user,
+            )
+            Issue.objects.filter(pk=issue.pk).update(rating=i % 3)
+        self.client.login(email="pageuser@test.com", password="pass")
+
+    def _collect_pages(self, sort, **params):
+        seen = []
+        response = self.client.get(reverse('issues:map'), {'sort': sort, **params})
+        seen.extend(i.id for i in response.context['issues'])
+        cursor = response.context['next_cursor']
+        while cursor:
+            response = self.client.get(
+                reverse('issues:map'), {'sort': sort, 'cursor': cursor, **params},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+            )
+            self.assertTemplateUsed(response, 'issues/partials/issue_cards.html')
+            seen.extend(i.id for i in response.context['issues'])
+            cursor = response.context['next_cursor']
+        return seen
+
+    def test_pages_cover_all_issues_without_duplicates(self):
+        for sort in ['-created_at', 'created_at', '-vote_rating', 'vote_rating', 'title']:
+            with self.subTest(sort=sort):
+                seen = self._collect_pages(sort)
+                self.assertEqual(len(seen), 7)
+                self.assertEqual(len(set(seen)), 7)
+
+    def test_relevance_pages_with_equal_ranks(self):
+        """Одинаковый search_rank у нескольких обращений: страницы без повторов и пропусков."""
+        ids = [
+            Issue.objects.create(
+                title="Яма на дороге", description="Глубокая яма", location=Point(69.0, 61.0), reporter=self.user
+            ).pk
+            for _ in range(7)
+        ]
+        ids.append(Issue.objects.create(
+            title="Яма на дороге у школы", description="Яма", location=Point(69.0, 61.0), reporter=self.user
+        ).pk)
+
+        seen = self._collect_pages('-relevance', search='яма на дороге')
+        self.assertEqual(sorted(seen), sorted(ids))
+
+    def test_first_page_size_and_total(self):
+        response = self.client.get(reverse('issues:map'))
+        self.assertEqual(len(response.context['issues']), 3)
+        self.assertEqual(response.context['issues_count'], 7)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+    def test_tampered_cursor_returns_first_page(self):
+        first = self.client.get(reverse('issues:map'))
+        response = self.client.get(
+            reverse('issues:map'), {'cursor': 'garbage'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(
+            [i.id for i in response.context['issues']],
+            [i.id for i in first.context['issues']]
+        )
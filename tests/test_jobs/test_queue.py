@@ -0,0 +1,130 @@
+import io
+from datetime import timedelta
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import claim, requeue_stale, run_job, run_pending, task
+
+calls = []
+
+
+@task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('tests.flaky', max_attempts=2)
+def flaky():
+    raise ConnectionError("SMTP недоступен")
+
+
+@override_settings(JOBS_BACKOFF_BASE=10)
+class JobQueueTest(TestCase):
+    """Очередь задач: выполнение, повторы с задержкой, зависшие задачи."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_and_run(self):
+        job = record.delay("привет")
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertEqual(calls, [])
+
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(calls, ["привет"])
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = flaky.delay()
+        run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("SMTP недоступен", job.last_error)
+        self.assertGreaterEqual(job.run_at, timezone.now() + timedelta(seconds=9))
+        # До наступления run_at воркер задачу не берёт
+        self.assertEqual(run_pending(), 0)
+
+    def test_job_fails_after_max_attempts(self):
+        job = flaky.delay()
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+
+        out = io.StringIO()
+        call_command('jobs_status', stdout=out)
+        self.assertIn("с ошибкой: 1", out.getvalue())
+        self.assertIn("tests.flaky", out.getvalue())
+
+    def test_unknown_task_fails_immediately(self):
+        job = Job.objects.create(name='tests.missing')
+        run_job(claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+
+    def test_stale_running_job_is_requeued(self):
+        job = record.delay(1)
+        claim()
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [1])
+
+    def test_stale_job_fails_after_max_attempts(self):
+        """Задача, каждый раз роняющая воркер, не возвращается в очередь бесконечно."""
+        job = flaky.delay()
+        for attempt in range(1, 3):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            claim()
+            Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(requeue_stale(), 1 if attempt < 2 else 0)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn("JOBS_LOCK_TIMEOUT", job.last_error)
+
+
+class QueuedEmailTest(TestCase):
+    """Письма уходят из воркера, а не из запроса."""
+
+    def test_registration_email_is_queued(self):
+        response = self.client.post(reverse('users:register'), {
+            'email': 'new@test.com',
+            'first_name': 'Иван',
+            'last_name': 'Иванов',
+            'role': 'citizen',
+            'password1': 'Сложный-пароль-123',
+            'password2': 'Сложный-пароль-123',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertTrue(Job.objects.filter(name='users.send_email').exists())
+
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['new@test.com'])
+
+    def test_password_reset_email_is_queued(self):
+        from django.contrib.auth import get_user_model
+        get_user_model().objects.create_user(email="reset@test.com", password="pass123", email_verified=True)
+
+        self.client.post(reverse('users:password_reset'), {'email': 'reset@test.com'})
+        self.assertEqual(len(mail.outbox), 0)
+
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reset@test.com'])
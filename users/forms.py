@@ -1,7 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import SetPasswordForm
+from django.contrib.auth.forms import PasswordResetForm, SetPasswordForm
+from django.template import loader
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.password_validation import (
     validate_password,
@@ -143,4 +144,19 @@ class CustomSetPasswordForm(SetPasswordForm):
         except ValidationError as e:
             raise forms.ValidationError(e.messages)
 
-        return password
\ No newline at end of file
+        return password
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Письмо для сброса пароля рендерится в запросе, а отправляется воркером."""
+
+    def send_mail(self, subject_template_name, email_template_name, context,
+                  from_email, to_email, html_email_template_name=None):
+        from .tasks import send_email
+
+        subject = "".join(loader.render_to_string(subject_template_name, context).splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html_body = None
+        if html_email_template_name is not None:
+            html_body = loader.render_to_string(html_email_template_name, context)
+        send_email.delay(subject, body, [to_email], html_body)
@@ -0,0 +1,12 @@
+from django.core.mail import EmailMultiAlternatives
+
+from jobs.queue import task
+
+
+@task('users.send_email', max_attempts=6)
+def send_email(subject, body, recipient_list, html_body=None):
+    """Отправка письма воркером: медленный или недоступный SMTP не задерживает ответ."""
+    message = EmailMultiAlternatives(subject, body, to=recipient_list)
+    if html_body:
+        message.attach_alternative(html_body, 'text/html')
+    message.send(fail_silently=False)
@@ -1,7 +1,7 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
-from .forms import CustomSetPasswordForm
+from .forms import CustomSetPasswordForm, QueuedPasswordResetForm
 from django.utils.translation import gettext_lazy as _
 
 app_name = 'users'
@@ -18,6 +18,7 @@ urlpatterns = [
         email_template_name='emails/password_reset_email.txt',
         subject_template_name='emails/password_reset_subject.txt',
         success_url='/users/password-reset/done/',
+        form_class=QueuedPasswordResetForm,
     ), name='password_reset'),
 
     path('password-reset/done/', auth_views.PasswordResetDoneView.as_view(
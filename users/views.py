@@ -4,9 +4,7 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Sum, Subquery, OuterRef, Case, When, Value, \
-    BooleanField  # ← добавил Case, When, Value, BooleanField
+from django.db.models import F, Prefetch
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template.loader import render_to_string
 from django.urls import reverse
@@ -14,8 +12,10 @@ from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.translation import gettext_lazy as _
 
-from issues.models import Issue, Vote
+from issues.models import Issue, IssuePhoto
+from issues.modules.votes import attach_user_votes
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, CustomSetPasswordForm
+from .tasks import send_email
 
 User = get_user_model()
 
@@ -35,34 +35,24 @@ def profile_view(request):
 def user_issues_view(request):
     user = request.user
 
-    # Подзапрос для текущего голоса пользователя по обращению
-    user_vote_subq = Vote.objects.filter(
-        issue=OuterRef('pk'),
-        user=user
-    ).values('value')[:1]
-
-    # Базовый queryset со всеми нужными аннотациями
-    base_qs = Issue.objects.annotate(
-        vote_rating=Sum('votes__value', default=0),
-        user_vote=Subquery(user_vote_subq),
-        user_has_upvoted=Case(
-            When(user_vote=1, then=Value(True)),
-            default=Value(False),
-            output_field=BooleanField()
-        ),
-        user_has_downvoted=Case(
-            When(user_vote=-1, then=Value(True)),
-            default=Value(False),
-            output_field=BooleanField()
-        )
+    # Автор и фото карточек загружаются заранее, а не отдельным запросом на
+    # каждую карточку; голос пользователя — одним запросом на список
+    base_qs = Issue.objects.select_related('reporter').prefetch_related(
+        Prefetch('photos', queryset=IssuePhoto.objects.order_by('id'))
+    ).annotate(
+        vote_rating=F('rating')
     )
 
     if user.role == 'citizen':
-        issues = base_qs.filter(reporter=user).order_by('-created_at')
+        issues = attach_user_votes(user, base_qs.filter(reporter=user).order_by('-created_at'))
         context = {'issues': issues, 'is_citizen': True}
     else:  # official
-        issues_in_progress = base_qs.filter(assigned_to=user, status='IN_PROGRESS').order_by('-updated_at')
-        issues_resolved = base_qs.filter(assigned_to=user, status='RESOLVED').order_by('-resolved_at')
+        issues_in_progress = attach_user_votes(
+            user, base_qs.filter(assigned_to=user, status='IN_PROGRESS').order_by('-updated_at')
+        )
+        issues_resolved = attach_user_votes(
+            user, base_qs.filter(assigned_to=user, status='RESOLVED').order_by('-resolved_at')
+        )
         context = {
             'issues_in_progress': issues_in_progress,
             'issues_resolved': issues_resolved,
@@ -100,13 +90,7 @@ def register_view(request):
                     'verify_url': verify_url,
                 })
 
-                send_mail(
-                    subject,
-                    message,
-                    from_email=None,
-                    recipient_list=[existing_user.email],
-                    fail_silently=False,
-                )
+                send_email.delay(str(subject), message, [existing_user.email])
 
                 messages.info(
                     request,
@@ -144,13 +128,7 @@ def register_view(request):
                 'verify_url': verify_url,
             })
 
-            send_mail(
-                subject,
-                message,
-                from_email=None,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
+            send_email.delay(str(subject), message, [user.email])
 
             messages.success(
                 request,